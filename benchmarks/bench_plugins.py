@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmarks of rendering the article plugins.
+
+Run with ``py.test -s benchmarks/bench_plugins.py``, see ``benchmarks/conftest.py``
+for the options.
+"""
+import copy
+
+import pytest
+from cms.api import add_plugin
+from cms.models import Placeholder
+from cms.plugin_rendering import ContentRenderer
+from cmsplugin_articles_ai.cms_plugins import ArticleList, CategoryLiftPlugin, TagFilterArticleList, TagList
+from cmsplugin_articles_ai.models import Category, TagFilterMode
+
+pytestmark = [pytest.mark.django_db, pytest.mark.urls("cmsplugin_articles_ai.article_urls")]
+
+
+def render_plugin(plugin_type, **plugin_data):
+    """
+    Return a function rendering a new plugin. Every render gets a fresh
+    copy of the plugin, like plugins loaded for a request.
+    """
+    placeholder = Placeholder.objects.create(slot="bench")
+    tags = plugin_data.pop("tags", [])
+    plugin = add_plugin(placeholder, plugin_type, "en", **plugin_data)
+    if tags:
+        plugin.tags = tags
+    renderer = ContentRenderer(None)
+
+    def func():
+        renderer.render_plugin(instance=copy.copy(plugin), context={}, placeholder=placeholder)
+    return func
+
+
+def test_article_list_plugin(benchmark, bench_data):
+    benchmark("ArticleList render", render_plugin(ArticleList, article_amount=10))
+
+
+def test_category_lift_plugin(benchmark, bench_data):
+    category = Category.objects.get(slug=bench_data.category_slug)
+    benchmark("CategoryLiftPlugin render", render_plugin(CategoryLiftPlugin, article_amount=10, category=category))
+
+
+@pytest.mark.parametrize("filter_mode", list(TagFilterMode))
+def test_tag_filter_article_list_plugin(benchmark, bench_data, filter_mode):
+    benchmark("TagFilterArticleList %s render" % filter_mode.name, render_plugin(
+        TagFilterArticleList, article_amount=10, filter_mode=filter_mode, tags=bench_data.tag_pks[:2],
+    ))
+
+
+def test_tag_list_plugin(benchmark, bench_data):
+    benchmark("TagList render", render_plugin(TagList))
@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of tag filtering with a growing amount of filter tags.
+
+Benchmarks are not collected by the default test run. Run this one with
+``py.test -s benchmarks/bench_tag_filter.py``, see ``benchmarks/conftest.py``
+for the options.
+"""
+import pytest
+from cmsplugin_articles_ai.models import Article, TagFilterMode
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("filter_mode", list(TagFilterMode))
+def test_tag_filter_scaling(benchmark, bench_data, filter_mode):
+    for tag_count in (1, 2, 5, 10):
+        # The most common tags first
+        articles = Article.objects.public().tag_filter(filter_mode, bench_data.tag_pks[:tag_count])
+        result = benchmark(
+            "tag_filter %s %s tags" % (filter_mode.name, tag_count),
+            lambda: list(articles.values_list("pk", flat=True)),
+        )
+        print(" (%s joins, %s matches)" % (str(articles.query).count("JOIN"), articles.count()))
+        assert result["queries"] == 1
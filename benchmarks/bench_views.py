@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmarks of the article views.
+
+Run with ``py.test -s benchmarks/bench_views.py``, see ``benchmarks/conftest.py``
+for the options.
+"""
+import pytest
+from cmsplugin_articles_ai.models import TagFilterMode
+from cmsplugin_articles_ai.sitemaps import get_sitemap_articles
+
+pytestmark = [pytest.mark.django_db, pytest.mark.urls("cmsplugin_articles_ai.article_urls")]
+
+
+def get_view(client, url):
+    def func():
+        response = client.get(url)
+        assert response.status_code == 200
+    return func
+
+
+def test_article_list_view(benchmark, bench_data, client):
+    benchmark("ArticleListView", get_view(client, "/"))
+    benchmark("ArticleListView last page", get_view(client, "/?page=last"))
+    benchmark("ArticleListView tag", get_view(client, "/tag/%s/" % bench_data.tag_slug))
+
+
+def test_category_view(benchmark, bench_data, client):
+    benchmark("CategoryView", get_view(client, "/category/%s/" % bench_data.category_slug))
+
+
+@pytest.mark.parametrize("filter_mode", list(TagFilterMode))
+def test_tag_filtered_article_view(benchmark, bench_data, client, filter_mode):
+    url = "/tagged/?filter_mode=%s&filter_tags=%s" % (
+        filter_mode.value, ",".join(str(pk) for pk in bench_data.tag_pks[:2]),
+    )
+    benchmark("TagFilteredArticleView %s" % filter_mode.name, get_view(client, url))
+
+
+def test_article_search_view(benchmark, bench_data, client):
+    benchmark("ArticleSearchView", get_view(client, "/search/?q=%s" % bench_data.tag_slug.split("-")[0]))
+
+
+def test_article_view(benchmark, bench_data, client):
+    benchmark("ArticleView", get_view(client, "/%s/" % bench_data.article_slug))
+
+
+def get_streaming_view(client, url):
+    def func():
+        response = client.get(url)
+        assert response.status_code == 200
+        for _ in response.streaming_content:
+            pass
+    return func
+
+
+def test_feeds_and_sitemaps(benchmark, bench_data, client):
+    benchmark("ArticleFeedView rss", get_streaming_view(client, "/feed/rss/"))
+    benchmark("ArticleFeedView atom tag", get_streaming_view(client, "/tag/%s/feed/atom/" % bench_data.tag_slug))
+    benchmark("ArticleSitemapIndexView", get_streaming_view(client, "/sitemap.xml"))
+    first_pk = get_sitemap_articles().order_by("pk").values_list("pk", flat=True).first()
+    benchmark("ArticleSitemapView", get_streaming_view(client, "/sitemap-%s.xml" % first_pk))
+
+
+def test_api_views(benchmark, bench_data, client):
+    benchmark("ArticleListAPIView", get_streaming_view(client, "/api/"))
+    benchmark("ArticleListAPIView fields", get_streaming_view(client, "/api/?fields=id,title,url"))
+    benchmark("TagAPIView", get_streaming_view(client, "/api/tag/%s/" % bench_data.tag_slug))
+    benchmark("ArticleDetailAPIView", get_streaming_view(client, "/api/%s/" % bench_data.article_slug))
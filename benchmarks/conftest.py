@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+"""
+Shared setup of the benchmarks.
+
+The benchmarks run against a test database seeded once per session with
+``publish_test_articles --bulk``. Each benchmark measures the query count,
+wall time and peak memory of a callable. Results can be written as JSON
+with ``--bench-json`` and compared against an earlier result file with
+``--bench-baseline``; a benchmark fails if it got slower than the baseline
+allows.
+"""
+import json
+import platform
+import sys
+from collections import namedtuple, OrderedDict
+from timeit import default_timer
+
+import django
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+from django.utils.six import StringIO
+
+try:
+    import tracemalloc
+except ImportError:  # Python 2
+    tracemalloc = None
+
+
+BenchData = namedtuple("BenchData", ["article_slug", "category_slug", "tag_pks", "tag_slug"])
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("benchmarks")
+    group.addoption(
+        "--bench-articles", type=int, default=2000,
+        help="Number of articles seeded for the benchmarks.",
+    )
+    group.addoption(
+        "--bench-repeat", type=int, default=5,
+        help="Number of timed runs per benchmark.",
+    )
+    group.addoption(
+        "--bench-json", default=None,
+        help="Write the benchmark results as JSON into this file.",
+    )
+    group.addoption(
+        "--bench-baseline", default=None,
+        help="Compare the results against a JSON file written earlier with --bench-json.",
+    )
+    group.addoption(
+        "--bench-tolerance", type=float, default=0.5,
+        help="Allowed relative increase of wall time and memory compared to the baseline.",
+    )
+
+
+class BenchmarkRecorder(object):
+    """
+    Measures callables and collects their results.
+    """
+
+    def __init__(self, config):
+        self.articles = config.getoption("bench_articles")
+        self.repeat = config.getoption("bench_repeat")
+        self.tolerance = config.getoption("bench_tolerance")
+        self.results = OrderedDict()
+        self.baseline = {}
+        baseline_path = config.getoption("bench_baseline")
+        if baseline_path:
+            with open(baseline_path) as baseline_file:
+                baseline = json.load(baseline_file)
+            if baseline["meta"]["articles"] != self.articles:
+                raise pytest.UsageError(
+                    "Baseline was measured with %s articles, use --bench-articles=%s" % (
+                        baseline["meta"]["articles"], baseline["meta"]["articles"],
+                    )
+                )
+            self.baseline = baseline["results"]
+
+    def get_meta(self):
+        return OrderedDict([
+            ("articles", self.articles),
+            ("repeat", self.repeat),
+            ("python", platform.python_version()),
+            ("django", django.get_version()),
+            ("database", connection.vendor),
+        ])
+
+    def measure(self, func):
+        """
+        Run `func` once to warm up caches and then measure it.
+
+        :param func: Callable to be measured
+        :return: Dictionary of the measurements
+        """
+        func()
+        with CaptureQueriesContext(connection) as queries:
+            func()
+        # Later requests reset the query log
+        query_count = len(queries)
+        timings = []
+        for _ in range(self.repeat):
+            start = default_timer()
+            func()
+            timings.append((default_timer() - start) * 1000)
+        timings.sort()
+        peak_memory = None
+        if tracemalloc:
+            tracemalloc.start()
+            try:
+                func()
+                peak_memory = tracemalloc.get_traced_memory()[1] // 1024
+            finally:
+                tracemalloc.stop()
+        return OrderedDict([
+            ("queries", query_count),
+            ("time_ms", round(timings[len(timings) // 2], 3)),
+            ("min_time_ms", round(timings[0], 3)),
+            ("peak_memory_kb", peak_memory),
+        ])
+
+    def compare(self, name, result):
+        """
+        Return a list of regressions of `result` compared to the baseline.
+        """
+        baseline = self.baseline.get(name)
+        if not baseline:
+            return []
+        regressions = []
+        if result["queries"] > baseline["queries"]:
+            regressions.append("queries %s -> %s" % (baseline["queries"], result["queries"]))
+        for key in ("time_ms", "peak_memory_kb"):
+            if result[key] is None or baseline[key] is None:
+                continue
+            if result[key] > baseline[key] * (1 + self.tolerance):
+                regressions.append("%s %s -> %s" % (key, baseline[key], result[key]))
+        return regressions
+
+    def __call__(self, name, func):
+        result = self.measure(func)
+        self.results[name] = result
+        sys.stdout.write("\n%-40s %4s queries %10.2f ms %10s KiB" % (
+            name, result["queries"], result["time_ms"], result["peak_memory_kb"],
+        ))
+        regressions = self.compare(name, result)
+        if regressions:
+            pytest.fail("%s regressed: %s" % (name, ", ".join(regressions)))
+        return result
+
+    def write(self, path):
+        with open(path, "w") as output:
+            json.dump(
+                OrderedDict([("meta", self.get_meta()), ("results", self.results)]),
+                output, indent=2,
+            )
+
+
+def pytest_sessionfinish(session, exitstatus):
+    recorder = getattr(session.config, "_benchmark_recorder", None)
+    path = session.config.getoption("bench_json", None)
+    if recorder and recorder.results and path:
+        recorder.write(path)
+
+
+@pytest.fixture(scope="session")
+def benchmark(request):
+    """
+    Measure a callable: ``benchmark("name", func)``.
+    """
+    recorder = BenchmarkRecorder(request.config)
+    request.config._benchmark_recorder = recorder
+    return recorder
+
+
+@pytest.fixture(scope="session")
+def bench_data(request, django_db_setup, django_db_blocker):
+    """
+    Seed the test database with articles once per session.
+    """
+    from cmsplugin_articles_ai.models import Article, Category, Tag
+
+    with django_db_blocker.unblock():
+        call_command(
+            "publish_test_articles",
+            bulk=True,
+            number_of_articles=request.config.getoption("bench_articles"),
+            languages="en,fi,",
+            seed=0,
+            stdout=StringIO(),
+        )
+        public = Article.objects.public().filter(publisher_is_draft=False)
+        tags = Tag.objects.annotate(num_articles=Count("articles")).order_by("-num_articles", "pk")
+        article = public.filter(tag_count__gt=1, category__isnull=False).order_by("pk").first()
+        category = Category.objects.annotate(num_articles=Count("articles")).order_by("-num_articles").first()
+        return BenchData(
+            article_slug=article.slug,
+            category_slug=category.slug,
+            tag_pks=list(tags.values_list("pk", flat=True)),
+            tag_slug=tags.first().slug,
+        )
@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+"""
+Read-only JSON API of the public articles.
+
+List responses are built from `values()` rows of the requested fields
+only and serialized one article at a time, without model instances.
+"""
+import json
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.paginator import InvalidPage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.urlresolvers import reverse
+from django.http import Http404, JsonResponse
+from django.utils.translation import ugettext_lazy as _
+
+from .models import Article, TagFilterMode
+from .pagination import CursorPaginator
+from .purging import get_article_key, get_category_key, get_list_keys, get_tag_key
+from .slugs import get_category_pk, get_tag_pk
+from .views import ConditionalGetMixin, get_last_modified, get_list_validators, make_etag, StreamingView
+
+# Fields of the API and the columns selected for them
+API_FIELDS = OrderedDict([
+    ("id", ("pk",)),
+    ("slug", ("slug",)),
+    ("url", ("slug",)),
+    ("title", ("title",)),
+    ("language", ("language",)),
+    ("published_from", ("published_from",)),
+    ("published_until", ("published_until",)),
+    ("modified_at", ("modified_at",)),
+    ("author", ("author__first_name", "author__last_name")),
+    ("category", ("category__slug",)),
+    ("tags", ()),
+    ("excerpt", ("excerpt",)),
+    ("lead_paragraph", ("lead_paragraph",)),
+    ("main_content", ("main_content",)),
+])
+
+# The content is left out of lists unless asked for
+DEFAULT_LIST_FIELDS = [field for field in API_FIELDS if field not in ("lead_paragraph", "main_content")]
+
+# Columns needed for paginating by cursors
+CURSOR_COLUMNS = ("pk", "published_from")
+
+
+def get_tag_slugs(article_pks):
+    """
+    Return a dictionary of the tag slugs of each article.
+    :params article_pks: Ids of the articles
+    """
+    tag_slugs = {}
+    tagged = Article.tags.through.objects.filter(
+        article_id__in=article_pks,
+    ).order_by("tag__name").values_list("article_id", "tag__slug")
+    for article_pk, tag_slug in tagged:
+        tag_slugs.setdefault(article_pk, []).append(tag_slug)
+    return tag_slugs
+
+
+class ArticleAPIMixin(object):
+    """
+    Common parts of the API views: parsing `fields` get parameter and
+    serializing `values()` rows of articles.
+    """
+    default_fields = list(API_FIELDS)
+    # Columns the view needs besides the ones of the fields
+    extra_columns = ()
+
+    def get(self, request, *args, **kwargs):
+        try:
+            self.parse_parameters()
+        except ValueError as e:
+            return JsonResponse({"error": str(e)}, status=400)
+        return super(ArticleAPIMixin, self).get(request, *args, **kwargs)
+
+    def parse_parameters(self):
+        """
+        Read the get parameters. Raises ValueError if they are invalid.
+        """
+        fields = self.request.GET.get("fields")
+        if not fields:
+            self.fields = self.default_fields
+            return
+        self.fields = [field.strip() for field in fields.split(",") if field.strip()]
+        unknown = [field for field in self.fields if field not in API_FIELDS]
+        if unknown or not self.fields:
+            raise ValueError("Unknown fields: %s" % ", ".join(unknown))
+
+    def get_columns(self):
+        columns = set(CURSOR_COLUMNS) | set(self.extra_columns)
+        for field in self.fields:
+            columns.update(API_FIELDS[field])
+        return sorted(columns)
+
+    def serialize(self, row, tag_slugs):
+        """
+        Return the requested fields of an article.
+        :params row: `values()` dictionary of the article
+        :params tag_slugs: Dictionary of the tag slugs of the articles
+        """
+        data = OrderedDict()
+        for field in self.fields:
+            if field == "id":
+                data[field] = row["pk"]
+            elif field == "url":
+                data[field] = self.request.build_absolute_uri(reverse("article", kwargs={"slug": row["slug"]}))
+            elif field == "author":
+                data[field] = " ".join((row["author__first_name"], row["author__last_name"])).strip()
+            elif field == "category":
+                data[field] = row["category__slug"]
+            elif field == "tags":
+                data[field] = tag_slugs.get(row["pk"], [])
+            else:
+                data[field] = row[field]
+        return data
+
+    def get_articles(self):
+        return Article.objects.public(language=self.lang_filter).filter(publisher_is_draft=False)
+
+
+class ArticleListAPIView(ArticleAPIMixin, ConditionalGetMixin, StreamingView):
+    """
+    List of public articles, paginated by cursors. Optional get parameters
+    are `lang` for filtering by language, `fields` for choosing the fields,
+    `page_size` and `cursor`.
+    """
+    content_type = "application/json"
+    default_fields = DEFAULT_LIST_FIELDS
+
+    def parse_parameters(self):
+        super(ArticleListAPIView, self).parse_parameters()
+        self.lang_filter = self.request.GET.get("lang", "")
+        max_page_size = getattr(settings, "ARTICLES_API_MAX_PAGE_SIZE", 100)
+        page_size = self.request.GET.get("page_size") or getattr(settings, "ARTICLES_PER_PAGE", 10)
+        self.page_size = min(int(page_size), max_page_size)
+        if self.page_size < 1:
+            raise ValueError("Invalid page size: %s" % page_size)
+        self.paginator = CursorPaginator(
+            self.get_queryset().values(*self.get_columns()),
+            self.page_size,
+            get_key=lambda row: (row["published_from"], row["pk"]),
+        )
+        self.cursor = self.request.GET.get("cursor")
+        if self.cursor:
+            try:
+                self.paginator.decode_cursor(self.cursor)
+            except InvalidPage as e:
+                raise Http404(_("Invalid page (%(cursor)s): %(message)s") % {
+                    "cursor": self.cursor,
+                    "message": str(e),
+                })
+
+    def get_queryset(self):
+        return self.get_articles()
+
+    def get_validators(self):
+        return get_list_validators(self.get_queryset(), self.lang_filter)
+
+    def get_surrogate_keys(self):
+        return get_list_keys(self.lang_filter)
+
+    def get_page_url(self, cursor):
+        if not cursor:
+            return None
+        params = self.request.GET.copy()
+        params["cursor"] = cursor
+        return self.request.build_absolute_uri("?%s" % params.urlencode())
+
+    def stream(self):
+        page = self.paginator.page(self.cursor)
+        tag_slugs = get_tag_slugs([row["pk"] for row in page]) if "tags" in self.fields else {}
+        encoder = DjangoJSONEncoder()
+        yield '{"results": ['
+        for index, row in enumerate(page):
+            yield ("," if index else "") + encoder.encode(self.serialize(row, tag_slugs))
+        yield '], "next": %s, "previous": %s}' % (
+            json.dumps(self.get_page_url(page.next_cursor)),
+            json.dumps(self.get_page_url(page.previous_cursor)),
+        )
+
+
+class TagAPIView(ArticleListAPIView):
+    """
+    List of public articles with a tag.
+    """
+
+    def parse_parameters(self):
+        self.tag_pk = get_tag_pk(self.kwargs["tag"])
+        if self.tag_pk is None:
+            raise Http404(_("No tag found matching the query"))
+        super(TagAPIView, self).parse_parameters()
+
+    def get_queryset(self):
+        return self.get_articles().with_any_of_tags([self.tag_pk])
+
+    def get_surrogate_keys(self):
+        return super(TagAPIView, self).get_surrogate_keys() + [get_tag_key(self.tag_pk)]
+
+
+class CategoryAPIView(ArticleListAPIView):
+    """
+    List of public articles in a category.
+    """
+
+    def parse_parameters(self):
+        self.category_pk = get_category_pk(self.kwargs["category"])
+        if self.category_pk is None:
+            raise Http404(_("No category found matching the query"))
+        super(CategoryAPIView, self).parse_parameters()
+
+    def get_queryset(self):
+        return self.get_articles().filter(category_id=self.category_pk)
+
+    def get_surrogate_keys(self):
+        return super(CategoryAPIView, self).get_surrogate_keys() + [get_category_key(self.category_pk)]
+
+
+class TagFilteredAPIView(ArticleListAPIView):
+    """
+    List of public articles filtered by tags with `filter_tags` and
+    `filter_mode` get parameters like in `TagFilteredArticleView`.
+    """
+
+    def parse_parameters(self):
+        filter_tags = self.request.GET.get("filter_tags", "")
+        self.filter_tags = [int(pk, 10) for pk in filter_tags.split(",")] if filter_tags else []
+        self.filter_mode = TagFilterMode(int(self.request.GET.get("filter_mode", TagFilterMode.ALL.value)))
+        super(TagFilteredAPIView, self).parse_parameters()
+
+    def get_queryset(self):
+        return self.get_articles().tag_filter(self.filter_mode, self.filter_tags)
+
+    def get_surrogate_keys(self):
+        keys = super(TagFilteredAPIView, self).get_surrogate_keys()
+        return keys + [get_tag_key(tag_pk) for tag_pk in self.filter_tags]
+
+
+class ArticleDetailAPIView(ArticleAPIMixin, ConditionalGetMixin, StreamingView):
+    """
+    A single public article. All fields are included unless chosen with
+    `fields` get parameter.
+    """
+    content_type = "application/json"
+    extra_columns = ("modified_at", "slug")
+
+    def parse_parameters(self):
+        super(ArticleDetailAPIView, self).parse_parameters()
+        self.lang_filter = ""
+        row = self.get_articles().filter(slug=self.kwargs["slug"]).values(*self.get_columns()).first()
+        if row is None:
+            raise Http404(_("No article found matching the query"))
+        tag_slugs = get_tag_slugs([row["pk"]]) if "tags" in self.fields else {}
+        self.data = self.serialize(row, tag_slugs)
+        self.modified_at = row["modified_at"], row["published_from"]
+        self.slug = row["slug"]
+
+    def get_validators(self):
+        # The data includes the tag slugs, which change with the version
+        return make_etag(self.data), get_last_modified(*self.modified_at)
+
+    def get_surrogate_keys(self):
+        tag_pks = Article.tags.through.objects.filter(
+            article__slug=self.slug, article__publisher_is_draft=False,
+        ).values_list("tag_id", flat=True)
+        return [get_article_key(self.slug)] + [get_tag_key(tag_pk) for tag_pk in tag_pks]
+
+    def stream(self):
+        yield DjangoJSONEncoder().encode(self.data)
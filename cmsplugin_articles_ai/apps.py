@@ -4,3 +4,6 @@ from django.apps import AppConfig
 
 class ArticlesAppConfig(AppConfig):
     name = "cmsplugin_articles_ai"
+
+    def ready(self):
+        from . import signals  # noqa
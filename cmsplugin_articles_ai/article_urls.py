@@ -2,9 +2,27 @@
 from django.conf.urls import url
 
 from cmsplugin_articles_ai.views import CategoryView
-from .views import ArticleListView, ArticleView, TagFilteredArticleView
+from .api import ArticleDetailAPIView, ArticleListAPIView, CategoryAPIView, TagAPIView, TagFilteredAPIView
+from .feeds import ArticleFeedView
+from .instrumentation import InstrumentationStatsView
+from .sitemaps import ArticleSitemapIndexView, ArticleSitemapView
+from .views import ArticleListView, ArticleSearchView, ArticleView, TagFilteredArticleView
 
 urlpatterns = [
+    url(r'^api/$', ArticleListAPIView.as_view(), name="api_articles"),
+    url(r'^api/tag/(?P<tag>[-_\w]+)/$', TagAPIView.as_view(), name="api_tagged_articles"),
+    url(r'^api/tagged/$', TagFilteredAPIView.as_view(), name="api_tag_filtered_articles"),
+    url(r'^api/category/(?P<category>[-_\w]+)/$', CategoryAPIView.as_view(), name="api_articles_in_category"),
+    url(r'^api/(?P<slug>[-_\w]+)/$', ArticleDetailAPIView.as_view(), name="api_article"),
+    url(r'^feed/(?P<feed_type>rss|atom)/$', ArticleFeedView.as_view(), name="article_feed"),
+    url(r'^tag/(?P<tag>[-_\w]+)/feed/(?P<feed_type>rss|atom)/$', ArticleFeedView.as_view(), name="tag_feed"),
+    url(
+        r'^category/(?P<category>[-_\w]+)/feed/(?P<feed_type>rss|atom)/$',
+        ArticleFeedView.as_view(),
+        name="category_feed"
+    ),
+    url(r'^sitemap\.xml$', ArticleSitemapIndexView.as_view(), name="article_sitemap_index"),
+    url(r'^sitemap-(?P<sitemap>\d+)\.xml$', ArticleSitemapView.as_view(), name="article_sitemap"),
     url(r'^tag/(?P<tag>[-_\w]+)/', TagFilteredArticleView.as_view(), name="tagged_articles"),
     url(r'^tagged/', TagFilteredArticleView.as_view(), name="tag_filtered_articles"),
     url(
@@ -13,6 +31,9 @@ urlpatterns = [
         name="tagged_articles_in_category"
     ),
     url(r'^category/(?P<category>[-_\w]+)/', CategoryView.as_view(), name="articles_in_category"),
+    url(r'^search/$', ArticleSearchView.as_view(), name="article_search"),
+    # Slugs can't contain dots, so the path doesn't hide any article
+    url(r'^instrumentation\.json$', InstrumentationStatsView.as_view(), name="article_instrumentation_stats"),
     url(r'^(?P<slug>[-_\w]+)/', ArticleView.as_view(), name="article"),
     url(r'^$', ArticleListView.as_view(), name="articles"),
 ]
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""
+Fetching the articles of all article list plugins of a page at once.
+
+The first article list plugin rendered during a request collects the
+article list plugins of the same page (or placeholder) and scans the
+public articles in the default ordering, assigning each article to the
+plugins it matches until every plugin has its articles. The matched
+articles are then fetched with their relations in one go, so a page
+costs the same amount of queries regardless of the amount of plugins.
+
+Plugins take part by implementing `matches`, the counterpart of their
+`get_articles` in Python. Plugins that aren't found within the scanned
+articles fall back to their own query.
+"""
+from collections import namedtuple
+
+from cms.plugin_pool import plugin_pool
+from django.db.models import Q
+
+from .models import Article, ArticleListPlugin
+
+# Amount of articles scanned per query, and the maximum amount of queries
+CHUNK_SIZE = 200
+MAX_CHUNKS = 5
+
+# Cached properties of ArticleListPlugin set by the batch
+RELATED_PK_ATTRIBUTES = ["tag_pks", "exclude_tag_pks", "exclude_category_pks"]
+
+BatchArticle = namedtuple("BatchArticle", ["pk", "language", "category_id", "tag_pks"])
+
+
+def supports_batching(plugin_class):
+    """
+    Return whether the plugin class implements `matches` for the same
+    filtering as its `get_articles`.
+    """
+    for klass in plugin_class.__mro__:
+        defined = vars(klass)
+        if "get_articles" in defined or "matches" in defined:
+            return "get_articles" in defined and "matches" in defined
+    return False
+
+
+def _get_related_pks(relation, field_name, plugin_pks):
+    related_pks = {}
+    rows = relation.through.objects.filter(
+        articlelistplugin_id__in=plugin_pks,
+    ).values_list("articlelistplugin_id", field_name)
+    for plugin_pk, related_pk in rows:
+        related_pks.setdefault(plugin_pk, []).append(related_pk)
+    return related_pks
+
+
+class ArticleListBatch(object):
+    """
+    The articles of a set of article list plugins.
+    """
+
+    def __init__(self, plugins, draft_status):
+        """
+        :params plugins: List of (plugin class instance, ArticleListPlugin) tuples
+        :params draft_status: Whether draft articles are listed
+        """
+        self.plugins = plugins
+        self.draft_status = draft_status
+        self.articles = None
+
+    def get_articles(self, plugin_conf):
+        """
+        Return the articles listed by the plugin, or None if the plugin
+        isn't part of the batch or its articles weren't found. The related
+        ids fetched for the batch are set to the given plugin instance.
+        """
+        if self.articles is None:
+            self.articles = self.fetch_articles()
+        for plugin, conf in self.plugins:
+            if conf.pk == plugin_conf.pk:
+                for name in RELATED_PK_ATTRIBUTES:
+                    setattr(plugin_conf, name, getattr(conf, name))
+        return self.articles.get(plugin_conf.pk)
+
+    def fetch_articles(self):
+        plugin_pks = [plugin_conf.pk for plugin, plugin_conf in self.plugins]
+        tag_pks = _get_related_pks(ArticleListPlugin.tags, "tag_id", plugin_pks)
+        exclude_tag_pks = _get_related_pks(ArticleListPlugin.exclude_tags, "tag_id", plugin_pks)
+        exclude_category_pks = _get_related_pks(ArticleListPlugin.exclude_categories, "category_id", plugin_pks)
+        for plugin, plugin_conf in self.plugins:
+            # Set the cached properties used by the plugins
+            plugin_conf.tag_pks = sorted(tag_pks.get(plugin_conf.pk, []))
+            plugin_conf.exclude_tag_pks = sorted(exclude_tag_pks.get(plugin_conf.pk, []))
+            plugin_conf.exclude_category_pks = sorted(exclude_category_pks.get(plugin_conf.pk, []))
+
+        article_pks = self.match_articles()
+        all_pks = set(pk for pks in article_pks.values() for pk in pks)
+        articles = {article.pk: article for article in Article.objects.filter(pk__in=all_pks).for_listing()}
+        return {
+            plugin_pk: [articles[pk] for pk in pks if pk in articles]
+            for plugin_pk, pks in article_pks.items()
+        }
+
+    def match_articles(self):
+        """
+        Return the ids of the articles of each plugin whose articles were
+        found within the scanned articles.
+        """
+        matched = {plugin_conf.pk: [] for plugin, plugin_conf in self.plugins}
+        pending = [
+            (plugin, plugin_conf) for plugin, plugin_conf in self.plugins
+            if plugin_conf.article_amount > 0
+        ]
+        candidates = Article.objects.public().filter(
+            publisher_is_draft=self.draft_status,
+        ).order_by("-published_from", "-pk").values_list("pk", "published_from", "language", "category_id")
+
+        last = None
+        for _ in range(MAX_CHUNKS):
+            chunk = candidates
+            if last:
+                chunk = chunk.filter(Q(published_from__lt=last[1]) | Q(published_from=last[1], pk__lt=last[0]))
+            chunk = list(chunk[:CHUNK_SIZE])
+            tag_pks = {}
+            tagged = Article.tags.through.objects.filter(
+                article_id__in=[row[0] for row in chunk],
+            ).values_list("article_id", "tag_id")
+            for article_pk, tag_pk in tagged:
+                tag_pks.setdefault(article_pk, set()).add(tag_pk)
+
+            for pk, published_from, language, category_id in chunk:
+                article = BatchArticle(pk, language, category_id, tag_pks.get(pk, set()))
+                for plugin, plugin_conf in list(pending):
+                    if plugin.matches(plugin_conf, article):
+                        matched[plugin_conf.pk].append(pk)
+                        if len(matched[plugin_conf.pk]) >= plugin_conf.article_amount:
+                            pending.remove((plugin, plugin_conf))
+                if not pending:
+                    break
+
+            if not pending or len(chunk) < CHUNK_SIZE:
+                # Every plugin has all of its articles
+                return matched
+            last = chunk[-1]
+
+        for plugin, plugin_conf in pending:
+            del matched[plugin_conf.pk]
+        return matched
+
+
+def get_plugin_batch(request, plugin_conf, draft_status):
+    """
+    Return the batch of the article list plugins on the same page as
+    the given plugin, creating it on first use during the request.
+    :params request: Current request
+    :params plugin_conf: ArticleListPlugin being rendered
+    :params draft_status: Whether draft articles are listed
+    """
+    page = getattr(request, "current_page", None)
+    key = (
+        getattr(page, "pk", None) or ("placeholder", plugin_conf.placeholder_id),
+        plugin_conf.language,
+        draft_status,
+    )
+    batches = request.__dict__.setdefault("_article_list_batches", {})
+    if key not in batches:
+        placeholders = Q(placeholder=plugin_conf.placeholder_id)
+        if getattr(page, "pk", None):
+            placeholders |= Q(placeholder__page=page)
+        plugin_classes = {
+            plugin_class.__name__: plugin_class for plugin_class in plugin_pool.get_all_plugins()
+            if plugin_class.model is ArticleListPlugin and supports_batching(plugin_class)
+        }
+        plugin_confs = ArticleListPlugin.objects.filter(
+            placeholders, language=plugin_conf.language, plugin_type__in=list(plugin_classes),
+        ).distinct()
+        batches[key] = ArticleListBatch(
+            [(plugin_classes[conf.plugin_type](), conf) for conf in plugin_confs],
+            draft_status,
+        )
+    return batches[key]
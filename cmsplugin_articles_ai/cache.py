@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import math
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+from django.utils.encoding import force_bytes
+
+VERSION_KEY = "cmsplugin_articles_ai:version"
+VERSION_CHANGED_KEY = "cmsplugin_articles_ai:version_changed_at"
+
+
+def get_cache():
+    """
+    Return the cache used for caching articles. The cache alias can be
+    changed with `ARTICLES_CACHE` setting.
+    """
+    return caches[getattr(settings, "ARTICLES_CACHE", "default")]
+
+
+def get_version():
+    """
+    Return the current version of the cached article data. All cache keys
+    include the version, so bumping it invalidates everything at once.
+    """
+    cache = get_cache()
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        version = _new_version()
+        if cache.add(VERSION_KEY, version, None):
+            cache.set(VERSION_CHANGED_KEY, timezone.now(), None)
+        version = cache.get(VERSION_KEY, version)
+    return version
+
+
+def get_version_changed_at():
+    """
+    Return the time the version last changed, or None if it isn't known.
+    The time covers changes that the modification times of the articles
+    don't, e.g. renamed tags and deleted articles.
+    """
+    return get_cache().get(VERSION_CHANGED_KEY)
+
+
+def bump_version():
+    """
+    Invalidate all cached article data.
+    """
+    cache = get_cache()
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        # The version has been evicted, start over from a random version
+        # that won't clash with the keys created before the eviction.
+        cache.set(VERSION_KEY, _new_version(), None)
+    cache.set(VERSION_CHANGED_KEY, timezone.now(), None)
+
+
+def _new_version():
+    return uuid.uuid4().int >> 66
+
+
+def make_key(*parts):
+    """
+    Return a versioned cache key for the given key parts.
+    """
+    digest = hashlib.sha1(force_bytes(repr(parts))).hexdigest()
+    return "cmsplugin_articles_ai:%s:%s" % (get_version(), digest)
+
+
+def get_timeout(boundary, max_timeout):
+    """
+    Return a cache timeout in seconds that expires the cached data when
+    the given publication boundary is crossed, but at latest after
+    `max_timeout` seconds. With `ARTICLES_PUBLICATION_SCHEDULER` enabled
+    the boundary is ignored, as the scheduler invalidates the cache.
+    :params boundary: Datetime or None
+    """
+    if boundary is None or getattr(settings, "ARTICLES_PUBLICATION_SCHEDULER", False):
+        return max_timeout
+    seconds = (boundary - timezone.now()).total_seconds()
+    return int(max(1, min(max_timeout, math.ceil(seconds))))
@@ -2,14 +2,20 @@
 from cms.models import CMSPlugin
 from cms.plugin_base import CMSPluginBase
 from cms.plugin_pool import plugin_pool
-from django.db.models import Q
+from django.conf import settings
 from django.utils.translation import ugettext_lazy as _
 from publisher.middleware import get_draft_status
 
-from .models import Article, ArticleListPlugin, Tag
+from .batching import get_plugin_batch
+from .cache import get_cache, get_timeout, make_key
+from .counts import get_tag_counts
+from .instrumentation import InstrumentedPluginMixin, instrumented_render, record_cache_lookup
+from .models import Article, ArticleListPlugin, TagFilterMode
+from .purging import ARTICLE_LISTS_KEY, add_surrogate_keys, get_category_key, get_list_keys, get_tag_key
+from .routers import primary_reads
 
 
-class ArticleList(CMSPluginBase):
+class ArticleList(InstrumentedPluginMixin, CMSPluginBase):
     model = ArticleListPlugin
     module = _("Articles")
     name = _("List of latest articles")
@@ -17,21 +23,89 @@ class ArticleList(CMSPluginBase):
     fields = ["article_amount", "language_filter", "exclude_categories", "exclude_tags"]
 
     def get_articles(self, plugin_conf):
-        return Article.objects.public(
+        articles = Article.objects.public(
             language=plugin_conf.language_filter,
         ).filter(
             publisher_is_draft=get_draft_status()
-        ).exclude(
-            Q(category__in=plugin_conf.exclude_categories.all()) |
-            Q(tags__in=plugin_conf.exclude_tags.all())
+        )
+        # The exclusions are evaluated once instead of nesting them as subqueries
+        if plugin_conf.exclude_category_pks:
+            articles = articles.exclude(category__in=plugin_conf.exclude_category_pks)
+        return articles.without_any_of_tags(plugin_conf.exclude_tag_pks).for_listing()
+
+    def matches(self, plugin_conf, article):
+        """
+        Return whether the article is listed by `get_articles`. Used for
+        fetching the articles of several plugins at once.
+        :params article: `BatchArticle` of a public article
+        """
+        if plugin_conf.language_filter and article.language not in (plugin_conf.language_filter, ""):
+            return False
+        if article.category_id in plugin_conf.exclude_category_pks:
+            return False
+        return not article.tag_pks.intersection(plugin_conf.exclude_tag_pks)
+
+    def get_cache_key_parts(self, plugin_conf):
+        """
+        Return the plugin configuration that affects the listed articles.
+        """
+        return (
+            plugin_conf.language_filter,
+            plugin_conf.exclude_category_pks,
+            plugin_conf.exclude_tag_pks,
+            plugin_conf.article_amount,
         )
 
+    def fetch_articles(self, plugin_conf, request=None):
+        """
+        Return the articles listed by the plugin, fetched together with the
+        articles of the other article list plugins on the page if possible.
+        """
+        if request is not None and getattr(settings, "ARTICLES_BATCH_PLUGIN_QUERIES", True):
+            articles = get_plugin_batch(request, plugin_conf, get_draft_status()).get_articles(plugin_conf)
+            if articles is not None:
+                return articles
+        return self.get_articles(plugin_conf)[:plugin_conf.article_amount]
+
+    def get_listed_articles(self, plugin_conf, request=None):
+        """
+        Return the articles listed by the plugin. The articles are cached
+        for at most `ARTICLES_PLUGIN_CACHE_TIMEOUT` seconds if the setting
+        is set, and until some of the articles gets published or expires.
+        """
+        max_timeout = getattr(settings, "ARTICLES_PLUGIN_CACHE_TIMEOUT", 0)
+        if not max_timeout:
+            return self.fetch_articles(plugin_conf, request)
+
+        draft_status = get_draft_status()
+        cache = get_cache()
+        key = make_key("plugin", type(self).__name__, draft_status, self.get_cache_key_parts(plugin_conf))
+        articles = cache.get(key)
+        record_cache_lookup(articles is not None)
+        if articles is None:
+            with primary_reads():
+                articles = list(self.fetch_articles(plugin_conf, request))
+                boundary = Article.objects.filter(
+                    publisher_is_draft=draft_status,
+                ).in_language(plugin_conf.language_filter).next_publication_boundary()
+            cache.set(key, articles, get_timeout(boundary, max_timeout))
+        return articles
+
+    def get_surrogate_keys(self, plugin_conf):
+        """
+        Return the surrogate keys of the listed articles.
+        """
+        return get_list_keys(plugin_conf.language_filter)
+
+    @instrumented_render
     def render(self, context, instance, placeholder):
+        request = context.get("request")
         context.update({
             "instance": instance,
-            "articles": self.get_articles(instance)[:instance.article_amount],
+            "articles": self.get_listed_articles(instance, request),
             "placeholder": placeholder,
         })
+        add_surrogate_keys(request, self.get_surrogate_keys(instance))
         return context
 
 
@@ -43,6 +117,19 @@ class CategoryLiftPlugin(ArticleList):
         articles = super(CategoryLiftPlugin, self).get_articles(plugin_conf)
         return articles.filter(category=plugin_conf.category)
 
+    def matches(self, plugin_conf, article):
+        if article.category_id != plugin_conf.category_id:
+            return False
+        return super(CategoryLiftPlugin, self).matches(plugin_conf, article)
+
+    def get_cache_key_parts(self, plugin_conf):
+        parts = super(CategoryLiftPlugin, self).get_cache_key_parts(plugin_conf)
+        return parts + (plugin_conf.category_id,)
+
+    def get_surrogate_keys(self, plugin_conf):
+        keys = super(CategoryLiftPlugin, self).get_surrogate_keys(plugin_conf)
+        return keys + [get_category_key(plugin_conf.category_id)]
+
 
 class TagFilterArticleList(ArticleList):
     model = ArticleListPlugin
@@ -52,17 +139,37 @@ class TagFilterArticleList(ArticleList):
 
     def get_articles(self, plugin_conf):
         articles = super(TagFilterArticleList, self).get_articles(plugin_conf)
-        return articles.tag_filter(plugin_conf.filter_mode, plugin_conf.tags)
+        return articles.tag_filter(plugin_conf.filter_mode, plugin_conf.tag_pks)
 
+    def matches(self, plugin_conf, article):
+        tag_pks = set(plugin_conf.tag_pks)
+        if plugin_conf.filter_mode == TagFilterMode.ANY:
+            matches_tags = bool(article.tag_pks & tag_pks)
+        elif plugin_conf.filter_mode == TagFilterMode.ALL:
+            matches_tags = tag_pks <= article.tag_pks
+        else:
+            matches_tags = tag_pks == article.tag_pks
+        return matches_tags and super(TagFilterArticleList, self).matches(plugin_conf, article)
 
-class TagList(CMSPluginBase):
+    def get_cache_key_parts(self, plugin_conf):
+        parts = super(TagFilterArticleList, self).get_cache_key_parts(plugin_conf)
+        return parts + (plugin_conf.filter_mode.value, plugin_conf.tag_pks)
+
+    def get_surrogate_keys(self, plugin_conf):
+        keys = super(TagFilterArticleList, self).get_surrogate_keys(plugin_conf)
+        return keys + [get_tag_key(tag_pk) for tag_pk in plugin_conf.tag_pks]
+
+
+class TagList(InstrumentedPluginMixin, CMSPluginBase):
     model = CMSPlugin
     module = _("Articles")
     name = _("List of tags")
     render_template = "cmsplugin_articles_ai/tag_list.html"
 
-    def render(self, context, *args, **kwargs):
-        context["tags"] = Tag.objects.all()
+    @instrumented_render
+    def render(self, context, instance, placeholder):
+        add_surrogate_keys(context.get("request"), [ARTICLE_LISTS_KEY])
+        context["tags"] = get_tag_counts()
         return context
 
 
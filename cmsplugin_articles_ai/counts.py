@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+from django.conf import settings
+from django.db.models import Count, Q
+from django.utils import timezone
+from publisher.middleware import get_draft_status
+
+from .cache import get_cache, get_timeout, make_key
+from .instrumentation import record_cache_lookup
+from .models import Article, Category, Tag
+from .routers import primary_reads
+
+
+def _count_public_articles(model, language):
+    """
+    Return the objects of the model that have public articles, annotated
+    with the amount of them as `article_count`.
+    """
+    now = timezone.now()
+    # The conditions are given in one filter so that they and the count
+    # use the same join.
+    public = Q(
+        articles__publisher_is_draft=get_draft_status(),
+        articles__published_from__lte=now,
+    ) & (Q(articles__published_until__gte=now) | Q(articles__published_until=None))
+    if language:
+        public &= Q(articles__language=language) | Q(articles__language="")
+    return model.objects.filter(public).annotate(article_count=Count("articles"))
+
+
+def _get_cached_counts(model, language):
+    max_timeout = getattr(settings, "ARTICLES_COUNTS_CACHE_TIMEOUT", 3600)
+    if not max_timeout:
+        return list(_count_public_articles(model, language))
+
+    draft_status = get_draft_status()
+    cache = get_cache()
+    key = make_key("counts", model.__name__, draft_status, language)
+    objects = cache.get(key)
+    record_cache_lookup(objects is not None)
+    if objects is None:
+        with primary_reads():
+            objects = list(_count_public_articles(model, language))
+            # The counts change when articles get published or expire
+            boundary = Article.objects.filter(
+                publisher_is_draft=draft_status,
+            ).in_language(language).next_publication_boundary()
+        cache.set(key, objects, get_timeout(boundary, max_timeout))
+    return objects
+
+
+def get_tag_counts(language=""):
+    """
+    Return the tags that have public articles, each with the amount of
+    them in `article_count` attribute. The tags are cached until articles,
+    tags or categories change, or some article gets published or expires,
+    but at most `ARTICLES_COUNTS_CACHE_TIMEOUT` seconds.
+    :params language: Language code to count only articles in the language
+    """
+    return _get_cached_counts(Tag, language)
+
+
+def get_category_counts(language=""):
+    """
+    Return the categories that have public articles, each with the amount
+    of them in `article_count` attribute. Cached like `get_tag_counts`.
+    :params language: Language code to count only articles in the language
+    """
+    return _get_cached_counts(Category, language)
@@ -8,6 +8,7 @@ from django.contrib.auth import get_user_model
 from django.utils import timezone
 from django.utils.text import slugify
 from factory import fuzzy
+from filer.models import File, Image
 
 from .models import Article, Category, Tag
 
@@ -47,6 +48,22 @@ class TagFactory(factory.django.DjangoModelFactory):
         model = Tag
 
 
+class FileFactory(factory.django.DjangoModelFactory):
+    original_filename = factory.Faker("file_name", extension="pdf")
+    file = factory.django.FileField(data=b"%PDF-1.4", filename="document.pdf")
+
+    class Meta:
+        model = File
+
+
+class ImageFactory(factory.django.DjangoModelFactory):
+    original_filename = factory.Faker("file_name", extension="jpg")
+    file = factory.django.ImageField(width=400, height=300, filename="image.jpg")
+
+    class Meta:
+        model = Image
+
+
 class ArticleFactory(factory.django.DjangoModelFactory):
 
     class Meta:
@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+import uuid
+
+from django.conf import settings
+from django.core.urlresolvers import reverse
+from django.http import Http404
+from django.utils import timezone
+from django.utils.feedgenerator import Atom1Feed, Rss201rev2Feed
+from django.utils.six import StringIO
+from django.utils.translation import ugettext as _
+from django.utils.xmlutils import SimplerXMLGenerator
+
+from .models import Article
+from .purging import get_category_key, get_list_keys, get_tag_key
+from .slugs import get_category, get_tag
+from .views import ConditionalGetMixin, get_list_validators, StreamingView
+
+
+class StreamingFeedMixin(object):
+    """
+    Writes a syndication feed piece by piece instead of collecting all of
+    its items into memory first. Pass the time of the latest change as
+    `last_modified` keyword argument, the items aren't available for
+    finding it out.
+    """
+
+    def stream(self, items, encoding="utf-8"):
+        """
+        Generate the feed as strings.
+        :params items: Iterable of dictionaries of `add_item` arguments
+        """
+        marker = uuid.uuid4().hex
+        self.items = []
+        # Write the feed without items to get the parts before and after them
+        self.write_items = lambda handler: handler.characters(marker)
+        try:
+            head, tail = self.writeString(encoding).split(marker)
+        finally:
+            del self.write_items
+        yield head
+        for item in items:
+            self.items = []
+            self.add_item(**item)
+            output = StringIO()
+            self.write_items(SimplerXMLGenerator(output, encoding))
+            yield output.getvalue()
+        self.items = []
+        yield tail
+
+    def latest_post_date(self):
+        return self.feed.get("last_modified") or timezone.now()
+
+
+class StreamingRssFeed(StreamingFeedMixin, Rss201rev2Feed):
+    pass
+
+
+class StreamingAtomFeed(StreamingFeedMixin, Atom1Feed):
+    pass
+
+
+class ArticleFeedView(ConditionalGetMixin, StreamingView):
+    """
+    RSS or Atom feed of the latest public articles, optionally limited to
+    a category or a tag. By default the feed is language agnostic, but you
+    can pass optional language parameter to get a filtered feed.
+    The amount of articles is limited by `ARTICLES_FEED_SIZE` setting.
+    """
+    feed_classes = {
+        "rss": StreamingRssFeed,
+        "atom": StreamingAtomFeed,
+    }
+
+    def get(self, request, *args, **kwargs):
+        self.feed_class = self.feed_classes[self.kwargs["feed_type"]]
+        self.content_type = self.feed_class.content_type
+        self.lang_filter = request.GET.get("lang", "")
+        self.category = None
+        self.tag = None
+        if "category" in self.kwargs:
+            self.category = get_category(self.kwargs["category"])
+            if self.category is None:
+                raise Http404(_("No category found matching the query"))
+        if "tag" in self.kwargs:
+            self.tag = get_tag(self.kwargs["tag"])
+            if self.tag is None:
+                raise Http404(_("No tag found matching the query"))
+        return super(ArticleFeedView, self).get(request, *args, **kwargs)
+
+    def get_queryset(self):
+        articles = Article.objects.public(language=self.lang_filter).filter(publisher_is_draft=False)
+        if self.category:
+            articles = articles.filter(category=self.category)
+        if self.tag:
+            articles = articles.with_any_of_tags([self.tag])
+        return articles
+
+    def get_validators(self):
+        self.validators = get_list_validators(self.get_queryset(), self.lang_filter)
+        return self.validators
+
+    def get_surrogate_keys(self):
+        keys = get_list_keys(self.lang_filter)
+        if self.category:
+            keys.append(get_category_key(self.category.pk))
+        if self.tag:
+            keys.append(get_tag_key(self.tag.pk))
+        return keys
+
+    def get_title(self):
+        if self.category:
+            return self.category.title
+        if self.tag:
+            return self.tag.name
+        return _("All articles")
+
+    def get_link(self):
+        if self.category:
+            return self.category.get_absolute_url()
+        if self.tag:
+            return reverse("tagged_articles", kwargs={"tag": self.tag.slug})
+        return reverse("articles")
+
+    def get_items(self):
+        """
+        Generate the feed items of the latest articles. Only the columns
+        shown in the feed are fetched.
+        """
+        articles = self.get_queryset().select_related("author").only(
+            "slug", "title", "excerpt", "published_from", "modified_at", "author",
+        )[:getattr(settings, "ARTICLES_FEED_SIZE", 50)]
+        for article in articles.iterator():
+            link = self.request.build_absolute_uri(article.get_absolute_url())
+            yield {
+                "title": article.title,
+                "link": link,
+                "description": article.excerpt,
+                "author_name": article.author.get_full_name(),
+                "pubdate": article.published_from,
+                "updateddate": article.modified_at,
+                "unique_id": link,
+            }
+
+    def stream(self):
+        validators = getattr(self, "validators", None)
+        feed = self.feed_class(
+            title=self.get_title(),
+            link=self.request.build_absolute_uri(self.get_link()),
+            description=self.get_title(),
+            language=self.lang_filter or None,
+            feed_url=self.request.build_absolute_uri(),
+            last_modified=validators[1] if validators else None,
+        )
+        return feed.stream(self.get_items())
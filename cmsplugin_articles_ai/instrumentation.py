@@ -0,0 +1,316 @@
+# -*- coding: utf-8 -*-
+"""
+Per-request instrumentation of the article views and plugins.
+
+With `ARTICLES_INSTRUMENTATION` enabled, the views and plugins record
+their duration, queries, template rendering time and cache hits and
+misses as components of the request. `InstrumentationMiddleware` reports
+them in a `Server-Timing` header and a JSON log line, and collects them
+into in-process statistics shown by `InstrumentationStatsView`.
+"""
+import json
+import logging
+import math
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.db import connections
+from django.http import JsonResponse
+from django.template.loader import get_template
+from django.views.generic import View
+
+logger = logging.getLogger(__name__)
+
+PERCENTILES = (50, 95, 99)
+
+_state = threading.local()
+
+
+def is_enabled():
+    return getattr(settings, "ARTICLES_INSTRUMENTATION", False)
+
+
+class Component(object):
+    """
+    Measurements of a view or a plugin during a request. Times are in
+    seconds.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.duration = 0.0
+        self.query_count = 0
+        self.query_time = 0.0
+        self.template_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    @contextmanager
+    def measure(self, template=False):
+        """
+        Add the time and the queries of the block to the component. The
+        queries of every database are counted, e.g. of read replicas.
+        :params template: Whether the block renders the template
+        """
+        databases = []
+        for connection in connections.all():
+            queries_log = connection.queries_log
+            databases.append((connection, connection.force_debug_cursor, queries_log[-1] if queries_log else None))
+            connection.force_debug_cursor = True
+        stack = _state.__dict__.setdefault("components", [])
+        stack.append(self)
+        start = time.time()
+        try:
+            yield self
+        finally:
+            duration = time.time() - start
+            stack.pop()
+            queries = []
+            for connection, force_debug_cursor, last_query in databases:
+                queries.extend(_get_queries_after(connection.queries_log, last_query))
+                connection.force_debug_cursor = force_debug_cursor
+            self.duration += duration
+            if template:
+                self.template_time += duration
+            self.query_count += len(queries)
+            self.query_time += sum(float(query["time"]) for query in queries)
+
+    def as_dict(self):
+        """
+        Return the measurements with the times in milliseconds.
+        """
+        return {
+            "name": self.name,
+            "duration": _ms(self.duration),
+            "query_count": self.query_count,
+            "query_time": _ms(self.query_time),
+            "template_time": _ms(self.template_time),
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+        }
+
+
+def _get_queries_after(queries_log, last_query):
+    """
+    Return the queries logged after the given query. The log drops its
+    oldest queries when it is full, so positions in it can't be used.
+    """
+    queries = []
+    for query in reversed(queries_log):
+        if query is last_query:
+            break
+        queries.append(query)
+    queries.reverse()
+    return queries
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 1)
+
+
+def get_components(request):
+    """
+    Return the components recorded during the request.
+    """
+    return request.__dict__.setdefault("_article_components", [])
+
+
+@contextmanager
+def instrument(request, name):
+    """
+    Record the block as a component of the request. Yields the component,
+    or None if instrumentation is disabled.
+    :params request: Current request, or None
+    :params name: Name of the component, e.g. the view or plugin class name
+    """
+    if request is None or not is_enabled():
+        yield None
+        return
+    component = Component(name)
+    get_components(request).append(component)
+    with component.measure():
+        yield component
+
+
+def record_cache_lookup(hit):
+    """
+    Count a cache hit or miss for the component being measured.
+    """
+    stack = getattr(_state, "components", None)
+    if stack:
+        if hit:
+            stack[-1].cache_hits += 1
+        else:
+            stack[-1].cache_misses += 1
+
+
+class InstrumentedTemplate(object):
+    """
+    Template that adds its rendering to a component.
+    """
+
+    def __init__(self, template, component):
+        self.template = template
+        self.component = component
+
+    def render(self, *args, **kwargs):
+        with self.component.measure(template=True):
+            return self.template.render(*args, **kwargs)
+
+
+def instrumented_render(render):
+    """
+    Decorate the `render` method of a plugin to record the plugin as a
+    component of the request. The template is measured when the plugin
+    gets it from `InstrumentedPluginMixin.get_render_template`.
+    """
+    @wraps(render)
+    def wrapper(self, context, instance, placeholder):
+        with instrument(context.get("request"), type(self).__name__) as component:
+            context = render(self, context, instance, placeholder)
+        if component is not None:
+            context["_instrumentation_component"] = component
+        return context
+    return wrapper
+
+
+class InstrumentedPluginMixin(object):
+    """
+    Adds rendering the template of a plugin to its component.
+    """
+
+    def get_render_template(self, context, instance, placeholder):
+        component = context.get("_instrumentation_component")
+        if component is None:
+            return self.render_template
+        return InstrumentedTemplate(get_template(self.render_template), component)
+
+
+class InstrumentedViewMixin(object):
+    """
+    Records the view, including rendering its template, as a component of
+    the request. Template responses are rendered after the middleware has
+    processed them, so their template is measured when it is rendered.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        with instrument(request, type(self).__name__) as component:
+            response = super(InstrumentedViewMixin, self).dispatch(request, *args, **kwargs)
+        if component is not None and hasattr(response, "resolve_template") and not response.is_rendered:
+            resolve_template = response.resolve_template
+
+            def resolve_instrumented_template(template):
+                return InstrumentedTemplate(resolve_template(template), component)
+
+            response.resolve_template = resolve_instrumented_template
+        return response
+
+
+def get_server_timing(components):
+    """
+    Return the value of a `Server-Timing` header for the components.
+    """
+    metrics = []
+    for component in components:
+        name = re.sub(r"[^\w-]", "-", component.name)
+        metrics.append('%s;dur=%s;desc="queries=%s cache_hits=%s cache_misses=%s"' % (
+            name, _ms(component.duration), component.query_count, component.cache_hits, component.cache_misses,
+        ))
+        metrics.append("%s-db;dur=%s" % (name, _ms(component.query_time)))
+        if component.template_time:
+            metrics.append("%s-template;dur=%s" % (name, _ms(component.template_time)))
+    return ", ".join(metrics)
+
+
+def _percentiles(values):
+    values = sorted(values)
+    return {
+        "p%s" % percentile: values[max(0, int(math.ceil(percentile / 100.0 * len(values))) - 1)]
+        for percentile in PERCENTILES
+    }
+
+
+class Stats(object):
+    """
+    In-process statistics of the latest `max_samples` measurements of
+    each component.
+    """
+    fields = ("duration", "query_count", "query_time", "template_time")
+
+    def __init__(self, max_samples):
+        self.max_samples = max_samples
+        self.samples = {}
+        self.cache_lookups = {}
+        self.lock = threading.Lock()
+
+    def add(self, component):
+        data = component.as_dict()
+        with self.lock:
+            samples = self.samples.setdefault(component.name, deque(maxlen=self.max_samples))
+            samples.append(tuple(data[field] for field in self.fields))
+            hits, misses = self.cache_lookups.get(component.name, (0, 0))
+            self.cache_lookups[component.name] = (hits + component.cache_hits, misses + component.cache_misses)
+
+    def summary(self):
+        """
+        Return the amount of samples and the percentiles of the fields of
+        each component, and the total cache hits and misses.
+        """
+        with self.lock:
+            samples = {name: list(component_samples) for name, component_samples in self.samples.items()}
+            cache_lookups = dict(self.cache_lookups)
+        summary = {}
+        for name, component_samples in samples.items():
+            summary[name] = {
+                field: _percentiles(values) for field, values in zip(self.fields, zip(*component_samples))
+            }
+            summary[name]["count"] = len(component_samples)
+            summary[name]["cache_hits"], summary[name]["cache_misses"] = cache_lookups[name]
+        return summary
+
+    def clear(self):
+        with self.lock:
+            self.samples.clear()
+            self.cache_lookups.clear()
+
+
+stats = Stats(getattr(settings, "ARTICLES_INSTRUMENTATION_SAMPLES", 1000))
+
+
+def report(request, response):
+    """
+    Report the components of the request in the response's `Server-Timing`
+    header, a log line and the statistics.
+    """
+    components = getattr(request, "_article_components", None)
+    if not components:
+        return
+    server_timing = get_server_timing(components)
+    if response.has_header("Server-Timing"):
+        server_timing = "%s, %s" % (response["Server-Timing"], server_timing)
+    response["Server-Timing"] = server_timing
+    for component in components:
+        stats.add(component)
+    logger.info(json.dumps({
+        "method": request.method,
+        "path": request.path,
+        "status": response.status_code,
+        "components": [component.as_dict() for component in components],
+    }, sort_keys=True))
+
+
+class InstrumentationStatsView(View):
+    """
+    Show the statistics of the components to staff members as JSON.
+    """
+
+    def get(self, request, *args, **kwargs):
+        if not request.user.is_staff:
+            raise PermissionDenied
+        return JsonResponse({"enabled": is_enabled(), "components": stats.summary()})
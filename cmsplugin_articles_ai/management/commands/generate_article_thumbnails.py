@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+import multiprocessing
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from cmsplugin_articles_ai.models import Article
+from cmsplugin_articles_ai.thumbnails import generate_thumbnails, get_article_image_pks, get_thumbnail_options
+
+
+class Command(BaseCommand):
+
+    help = "Generates the missing thumbnails of article images."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            action="store",
+            dest="workers",
+            default=1,
+            type=int,
+            help="Number of worker processes generating the thumbnails."
+        )
+        parser.add_argument(
+            "--chunk-size",
+            action="store",
+            dest="chunk_size",
+            default=50,
+            type=int,
+            help="Number of images handled by a worker at a time."
+        )
+
+    def handle(self, *args, **options):
+        image_pks = get_article_image_pks(Article.objects.all())
+        chunk_size = max(1, options["chunk_size"])
+        chunks = [image_pks[start:start + chunk_size] for start in range(0, len(image_pks), chunk_size)]
+        self.stdout.write("Generating %s thumbnail sizes for %s images with %s workers" % (
+            len(get_thumbnail_options()), len(image_pks), options["workers"],
+        ))
+
+        if options["workers"] > 1:
+            # Worker processes must not share the parent's database connections
+            for connection in connections.all():
+                connection.close()
+            pool = multiprocessing.Pool(options["workers"], initializer=_close_connections)
+            results = pool.imap_unordered(_generate_chunk, chunks)
+        else:
+            pool = None
+            results = (_generate_chunk(chunk) for chunk in chunks)
+
+        handled = generated = 0
+        try:
+            for chunk_images, chunk_generated in results:
+                handled += chunk_images
+                generated += chunk_generated
+                self.stdout.write("  %s/%s images, %s thumbnails generated" % (handled, len(image_pks), generated))
+        finally:
+            if pool:
+                pool.close()
+                pool.join()
+        self.stdout.write("Generated %s thumbnails." % generated)
+
+
+def _close_connections():
+    for connection in connections.all():
+        connection.close()
+
+
+def _generate_chunk(image_pks):
+    return len(image_pks), generate_thumbnails(image_pks)
@@ -1,9 +1,16 @@
 # -*- coding: utf-8 -*-
+import multiprocessing
 import random
+import time
+import uuid
+from datetime import timedelta
 
 from django.conf import settings
+from django.contrib.auth import get_user_model
 from django.core.management.base import BaseCommand
-from django.utils import translation
+from django.db import connections, transaction
+from django.utils import timezone, translation
+from django.utils.text import slugify
 
 
 class Command(BaseCommand):
@@ -27,8 +34,114 @@ class Command(BaseCommand):
             default=15,
             help="Number of articles to be created."
         )
+        parser.add_argument(
+            "--bulk",
+            action="store_true",
+            dest="bulk",
+            default=False,
+            help="Create the data with bulk inserts. Use this for creating large data sets."
+        )
+        parser.add_argument(
+            "--batch-size",
+            action="store",
+            dest="batch_size",
+            default=1000,
+            type=int,
+            help="Number of articles created per bulk insert."
+        )
+        parser.add_argument(
+            "--workers",
+            action="store",
+            dest="workers",
+            default=1,
+            type=int,
+            help="Number of worker processes creating the articles in bulk mode."
+        )
+        parser.add_argument(
+            "--languages",
+            action="store",
+            dest="languages",
+            default="",
+            help="Comma separated list of languages to mix in bulk mode. Defaults to --lang."
+        )
+        parser.add_argument(
+            "--authors",
+            action="store",
+            dest="authors",
+            default=20,
+            type=int,
+            help="Number of authors created in bulk mode."
+        )
+        parser.add_argument(
+            "--categories",
+            action="store",
+            dest="categories",
+            default=10,
+            type=int,
+            help="Number of categories created in bulk mode."
+        )
+        parser.add_argument(
+            "--tags",
+            action="store",
+            dest="tags",
+            default=50,
+            type=int,
+            help="Number of tags created in bulk mode. Some tags are much more common than others."
+        )
+        parser.add_argument(
+            "--max-tags-per-article",
+            action="store",
+            dest="max_tags_per_article",
+            default=5,
+            type=int,
+            help="Maximum number of tags per article in bulk mode."
+        )
+        parser.add_argument(
+            "--days",
+            action="store",
+            dest="days",
+            default=365,
+            type=int,
+            help="Number of past days the publication dates are spread over in bulk mode."
+        )
+        parser.add_argument(
+            "--future-ratio",
+            action="store",
+            dest="future_ratio",
+            default=0.05,
+            type=float,
+            help="Share of articles to be published in the future in bulk mode."
+        )
+        parser.add_argument(
+            "--expired-ratio",
+            action="store",
+            dest="expired_ratio",
+            default=0.05,
+            type=float,
+            help="Share of articles whose publication has ended in bulk mode."
+        )
+        parser.add_argument(
+            "--draft-only-ratio",
+            action="store",
+            dest="draft_only_ratio",
+            default=0.1,
+            type=float,
+            help="Share of articles having only a draft version in bulk mode. "
+                 "Other articles get both a draft and a published version."
+        )
+        parser.add_argument(
+            "--seed",
+            action="store",
+            dest="seed",
+            default=None,
+            type=int,
+            help="Random seed for reproducible data in bulk mode."
+        )
 
     def handle(self, *args, **options):
+        if options["bulk"]:
+            return self.handle_bulk(**options)
+
         try:
             from cmsplugin_articles_ai.factories import CategoryFactory, TaggedArticleFactory
         except ImportError as e:
@@ -54,3 +167,230 @@ class Command(BaseCommand):
             print("  %s. article: %s" % (number + 1, article.title))
 
         translation.deactivate()
+
+    def handle_bulk(self, **options):
+        try:
+            import faker  # noqa
+        except ImportError:
+            self.stderr.write("Faker could not be imported. Please see README.")
+            raise
+
+        number_of_articles = int(options["number_of_articles"])
+        batch_size = max(1, options["batch_size"])
+        seed = options["seed"] if options["seed"] is not None else random.randrange(2 ** 32)
+        # Unique prefix for the slugs and usernames of this run
+        prefix = uuid.uuid4().hex[:8]
+        random.seed(seed)
+
+        self.stdout.write("Creating %s authors, %s categories and %s tags" % (
+            options["authors"], options["categories"], options["tags"],
+        ))
+        config = {
+            "prefix": prefix,
+            "seed": seed,
+            "author_pks": _create_authors(prefix, options["authors"]),
+            "category_pks": _create_categories(prefix, options["categories"]),
+            "tag_names": _create_tags(prefix, options["tags"]),
+            "languages": [
+                language.strip() for language in (options["languages"] or options["language"]).split(",")
+            ],
+            "max_tags_per_article": options["max_tags_per_article"],
+            "days": options["days"],
+            "future_ratio": options["future_ratio"],
+            "expired_ratio": options["expired_ratio"],
+            "draft_only_ratio": options["draft_only_ratio"],
+        }
+        batches = [
+            (start, min(batch_size, number_of_articles - start), config)
+            for start in range(0, number_of_articles, batch_size)
+        ]
+
+        self.stdout.write("Creating %s articles in %s batches with %s workers (seed %s)" % (
+            number_of_articles, len(batches), options["workers"], seed,
+        ))
+        started = time.time()
+        created = 0
+        if options["workers"] > 1:
+            # Worker processes must not share the parent's database connections
+            for connection in connections.all():
+                connection.close()
+            pool = multiprocessing.Pool(options["workers"], initializer=_close_connections)
+            results = pool.imap_unordered(_create_article_batch, batches)
+        else:
+            pool = None
+            results = (_create_article_batch(batch) for batch in batches)
+
+        try:
+            for count in results:
+                created += count
+                elapsed = time.time() - started
+                self.stdout.write("  %s/%s articles (%.0f articles/s)" % (
+                    created, number_of_articles, created / elapsed if elapsed else 0,
+                ))
+        finally:
+            if pool:
+                pool.close()
+                pool.join()
+        self.stdout.write("Created %s articles in %.1f seconds" % (created, time.time() - started))
+
+
+def _close_connections():
+    for connection in connections.all():
+        connection.close()
+
+
+def _create_authors(prefix, amount):
+    from faker import Faker
+    fake = Faker()
+    User = get_user_model()
+    users = []
+    for number in range(amount):
+        first_name, last_name = fake.first_name(), fake.last_name()
+        users.append(User(
+            username="%s-%s" % (prefix, number),
+            first_name=first_name,
+            last_name=last_name,
+            email="%s.%s@example.com" % (first_name.lower(), last_name.lower()),
+        ))
+    User.objects.bulk_create(users)
+    return list(User.objects.filter(username__startswith="%s-" % prefix).values_list("pk", flat=True))
+
+
+def _create_categories(prefix, amount):
+    from faker import Faker
+    from cmsplugin_articles_ai.models import Category
+    fake = Faker()
+    categories = []
+    for number in range(amount):
+        title = fake.word().capitalize()
+        categories.append(Category(title=title, slug="%s-%s-%s" % (slugify(title), prefix, number)))
+    Category.objects.bulk_create(categories)
+    return list(Category.objects.filter(slug__contains="-%s-" % prefix).values_list("pk", flat=True))
+
+
+def _create_tags(prefix, amount):
+    from faker import Faker
+    from cmsplugin_articles_ai.models import Tag
+    fake = Faker()
+    tags = []
+    for number in range(amount):
+        name = "%s %s" % (fake.word(), number)
+        tags.append(Tag(name="%s %s" % (name, prefix), slug="%s-%s" % (slugify(name), prefix)))
+    Tag.objects.bulk_create(tags)
+    return dict(Tag.objects.filter(slug__endswith="-%s" % prefix).values_list("pk", "name"))
+
+
+def _pick_tags(rnd, tag_pks, max_tags):
+    """
+    Pick tags so that their popularity follows Zipf's law, i.e. the most
+    common tag is twice as common as the second most common one, etc.
+    """
+    if not tag_pks:
+        return []
+    weights = [1.0 / rank for rank in range(1, len(tag_pks) + 1)]
+    picked = set()
+    for _ in range(rnd.randint(0, max_tags)):
+        picked.add(_weighted_choice(rnd, tag_pks, weights))
+    return sorted(picked)
+
+
+def _weighted_choice(rnd, items, weights):
+    threshold = rnd.uniform(0, sum(weights))
+    for item, weight in zip(items, weights):
+        threshold -= weight
+        if threshold <= 0:
+            return item
+    return items[-1]
+
+
+def _pick_publication_window(rnd, now, config):
+    roll = rnd.random()
+    if roll < config["future_ratio"]:
+        return now + timedelta(days=rnd.uniform(0, 30)), None
+    published_from = now - timedelta(days=rnd.uniform(0, config["days"]))
+    if roll < config["future_ratio"] + config["expired_ratio"]:
+        return published_from, published_from + timedelta(days=rnd.uniform(0, (now - published_from).days))
+    if rnd.random() < 0.1:
+        # Public article with its publication ending in the future
+        return published_from, now + timedelta(days=rnd.uniform(1, 90))
+    return published_from, None
+
+
+@transaction.atomic
+def _create_article_batch(batch):
+    """
+    Create articles of one batch with their drafts and tags. Returns the
+    amount of articles (not counting the separate drafts) created.
+    """
+    from faker import Faker
+    from cmsplugin_articles_ai.models import Article, ArticleSearchDocument
+    from cmsplugin_articles_ai.utils import get_tag_signature, make_excerpt, make_search_text
+
+    start, size, config = batch
+    rnd = random.Random(config["seed"] + start)
+    fake = Faker()
+    fake.seed(config["seed"] + start)
+    now = timezone.now()
+    all_tag_pks = sorted(config["tag_names"])
+
+    articles = []
+    article_tags = {}
+    for number in range(start, start + size):
+        title = fake.catch_phrase()
+        slug = "%s-%s-%s" % (slugify(title)[:180], config["prefix"], number)
+        tag_pks = _pick_tags(rnd, all_tag_pks, config["max_tags_per_article"])
+        published_from, published_until = _pick_publication_window(rnd, now, config)
+        main_content = "".join("<p>%s</p>" % paragraph for paragraph in fake.paragraphs(nb=3))
+        article_tags[slug] = tag_pks
+        articles.append(Article(
+            title=title,
+            slug=slug,
+            language=rnd.choice(config["languages"]),
+            published_from=published_from,
+            published_until=published_until,
+            highlight=rnd.random() < 0.05,
+            author_id=rnd.choice(config["author_pks"]),
+            category_id=rnd.choice(config["category_pks"] + [None]) if config["category_pks"] else None,
+            main_content=main_content,
+            excerpt=make_excerpt(main_content),
+            tag_count=len(tag_pks),
+            tag_signature=get_tag_signature(tag_pks),
+            publisher_is_draft=rnd.random() < config["draft_only_ratio"],
+            publisher_published_at=now,
+        ))
+
+    # Create published versions first so that the drafts can link to them
+    Article.objects.bulk_create(article for article in articles if not article.publisher_is_draft)
+    slugs = [article.slug for article in articles]
+    published_pks = dict(
+        Article.objects.filter(slug__in=slugs, publisher_is_draft=False).values_list("slug", "pk")
+    )
+    drafts = []
+    for article in articles:
+        if not article.publisher_is_draft:
+            article.pk = None
+            article.publisher_is_draft = True
+            article.publisher_linked_id = published_pks[article.slug]
+        else:
+            article.publisher_published_at = None
+        drafts.append(article)
+    Article.objects.bulk_create(drafts)
+
+    article_pks = list(Article.objects.filter(slug__in=slugs).values_list("slug", "pk"))
+    ArticleTag = Article.tags.through
+    ArticleTag.objects.bulk_create(
+        ArticleTag(article_id=article_pk, tag_id=tag_pk)
+        for slug, article_pk in article_pks
+        for tag_pk in article_tags[slug]
+    )
+    search_texts = {
+        article.slug: make_search_text(
+            article.title, article.lead_paragraph, article.main_content,
+            [config["tag_names"][tag_pk] for tag_pk in article_tags[article.slug]],
+        )
+        for article in drafts
+    }
+    ArticleSearchDocument.objects.bulk_create(
+        ArticleSearchDocument(article_id=article_pk, text=search_texts[slug]) for slug, article_pk in article_pks
+    )
+    return size
@@ -0,0 +1,13 @@
+# -*- coding: utf-8 -*-
+from django.core.management.base import BaseCommand
+
+from cmsplugin_articles_ai.models import Article
+
+
+class Command(BaseCommand):
+
+    help = "Rebuilds the excerpts shown in article lists from the article content."
+
+    def handle(self, *args, **options):
+        updated = Article.objects.all().update_excerpts()
+        self.stdout.write("Updated excerpts of %s articles." % updated)
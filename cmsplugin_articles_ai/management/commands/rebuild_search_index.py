@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from cmsplugin_articles_ai.models import Article
+from cmsplugin_articles_ai.models.search import FTS_TABLE, has_fts_table
+
+
+class Command(BaseCommand):
+
+    help = "Rebuilds the search index of articles."
+
+    def handle(self, *args, **options):
+        updated = Article.objects.all().update_search_documents()
+        if connection.vendor == "sqlite" and has_fts_table(connection):
+            # Rebuild the full-text index from the documents in case it has
+            # got out of sync, e.g. by changes bypassing the triggers
+            with connection.cursor() as cursor:
+                cursor.execute("INSERT INTO %s (%s) VALUES ('rebuild')" % (FTS_TABLE, FTS_TABLE))
+        self.stdout.write("Rebuilt search documents of %s articles." % updated)
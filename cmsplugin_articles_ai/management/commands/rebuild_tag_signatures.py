@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+from django.core.management.base import BaseCommand, CommandError
+
+from cmsplugin_articles_ai.models import Article
+
+
+class Command(BaseCommand):
+
+    help = "Rebuilds or checks the tag signatures used for filtering articles by tags."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            dest="check",
+            default=False,
+            help="Only report articles with outdated tag signatures."
+        )
+
+    def handle(self, *args, **options):
+        if not options["check"]:
+            updated = Article.objects.all().update_tag_signatures()
+            self.stdout.write("Updated tag signatures of %s articles." % updated)
+            return
+
+        stale = 0
+        for pk, stored_count, stored_signature, tag_count, tag_signature in \
+                Article.objects.all().iter_tag_signatures(stale_only=True):
+            stale += 1
+            self.stdout.write(
+                "Article %s: stored %s tags (%s), has %s tags (%s)" % (
+                    pk, stored_count, stored_signature or "-", tag_count, tag_signature or "-",
+                )
+            )
+        if stale:
+            raise CommandError(
+                "%s articles have outdated tag signatures. Run rebuild_tag_signatures to fix them." % stale
+            )
+        self.stdout.write("All tag signatures are up to date.")
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+import time
+
+from django.core.management.base import BaseCommand
+
+from cmsplugin_articles_ai.scheduler import get_wait_time, run_scheduler
+
+
+class Command(BaseCommand):
+
+    help = "Sends the signals of articles that became public or expired since the previous run."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            dest="loop",
+            default=False,
+            help="Keep running, waking up when articles become public or expire."
+        )
+        parser.add_argument(
+            "--interval",
+            action="store",
+            dest="interval",
+            default=5,
+            type=float,
+            help="Maximum number of seconds between runs with --loop."
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            became_public, expired = run_scheduler()
+            if became_public or expired or options["verbosity"] > 1:
+                self.stdout.write("%s articles became public, %s expired." % (len(became_public), len(expired)))
+            if not options["loop"]:
+                break
+            time.sleep(get_wait_time(options["interval"]))
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+try:
+    from django.utils.deprecation import MiddlewareMixin
+except ImportError:  # Django < 1.10
+    MiddlewareMixin = object
+
+from .instrumentation import report
+from .purging import end_purge_batch, patch_surrogate_keys, start_purge_batch
+
+
+class SurrogateKeyMiddleware(MiddlewareMixin):
+    """
+    Adds the surrogate keys of the plugins rendered on a page to the
+    response, and purges the keys of the objects changed during a request
+    with one batch at the end of the request.
+    """
+
+    def process_request(self, request):
+        request._purge_batch_started = start_purge_batch()
+
+    def process_response(self, request, response):
+        keys = getattr(request, "_surrogate_keys", None)
+        if keys:
+            patch_surrogate_keys(response, keys)
+        if getattr(request, "_purge_batch_started", False):
+            request._purge_batch_started = False
+            end_purge_batch()
+        return response
+
+
+class InstrumentationMiddleware(MiddlewareMixin):
+    """
+    Reports the measurements of the article views and plugins rendered
+    during a request, see `cmsplugin_articles_ai.instrumentation`.
+    """
+
+    def process_response(self, request, response):
+        report(request, response)
+        return response
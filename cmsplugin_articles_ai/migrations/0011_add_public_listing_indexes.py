@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cmsplugin_articles_ai', '0010_do_not_require_exclude_tags'),
+    ]
+
+    operations = [
+        migrations.AlterIndexTogether(
+            name='article',
+            index_together=set([
+                ('publisher_is_draft', 'published_from', 'id'),
+                ('publisher_is_draft', 'category', 'published_from', 'id'),
+            ]),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import hashlib
+
+from django.db import migrations, models
+from django.utils.encoding import force_bytes
+
+
+# Copy of cmsplugin_articles_ai.utils.get_tag_signature at the time of
+# this migration
+def get_tag_signature(tag_pks):
+    tag_pks = sorted(set(int(pk) for pk in tag_pks))
+    if not tag_pks:
+        return ""
+    return hashlib.sha1(force_bytes(",".join(str(pk) for pk in tag_pks))).hexdigest()
+
+
+def assign_tag_signatures(apps, schema_editor):
+    Article = apps.get_model("cmsplugin_articles_ai", "Article")
+    tag_pks = {}
+    for article_pk, tag_pk in Article.tags.through.objects.values_list("article_id", "tag_id"):
+        tag_pks.setdefault(article_pk, []).append(tag_pk)
+    for article_pk, article_tag_pks in tag_pks.items():
+        Article.objects.filter(pk=article_pk).update(
+            tag_count=len(article_tag_pks),
+            tag_signature=get_tag_signature(article_tag_pks),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cmsplugin_articles_ai', '0011_add_public_listing_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='tag_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='tag count'),
+        ),
+        migrations.AddField(
+            model_name='article',
+            name='tag_signature',
+            field=models.CharField(max_length=40, blank=True, editable=False, db_index=True, verbose_name='tag signature'),
+        ),
+        migrations.RunPython(assign_tag_signatures, migrations.RunPython.noop),
+    ]
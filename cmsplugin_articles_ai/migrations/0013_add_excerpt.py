@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import re
+
+from django.db import migrations, models
+from django.utils.html import strip_tags
+from django.utils.text import Truncator
+
+try:
+    from html import unescape
+except ImportError:  # Python 2
+    from HTMLParser import HTMLParser
+    unescape = HTMLParser().unescape
+
+# Copies of the helpers of cmsplugin_articles_ai.utils at the time of this
+# migration
+_BLOCK_TAG_RE = re.compile(r"<(/?(p|div|li|ul|ol|h[1-6]|blockquote|table|tr|td|th)\b[^>]*|br\s*/?)>", re.IGNORECASE)
+
+
+def html_to_text(html):
+    text = unescape(strip_tags(_BLOCK_TAG_RE.sub(r" \g<0> ", html or "")))
+    return " ".join(text.split())
+
+
+def make_excerpt(html, length=300):
+    return Truncator(html_to_text(html)).chars(length)
+
+
+def assign_excerpts(apps, schema_editor):
+    Article = apps.get_model("cmsplugin_articles_ai", "Article")
+    articles = Article.objects.values_list("pk", "lead_paragraph", "main_content")
+    for article_pk, lead_paragraph, main_content in articles.iterator():
+        Article.objects.filter(pk=article_pk).update(excerpt=make_excerpt(lead_paragraph or main_content))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cmsplugin_articles_ai', '0012_add_tag_signature'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='excerpt',
+            field=models.TextField(blank=True, editable=False, verbose_name='excerpt'),
+        ),
+        migrations.RunPython(assign_excerpts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import re
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.utils import OperationalError
+from django.utils.html import strip_tags
+
+try:
+    from html import unescape
+except ImportError:  # Python 2
+    from HTMLParser import HTMLParser
+    unescape = HTMLParser().unescape
+
+# Copies of the helpers of cmsplugin_articles_ai.utils at the time of this
+# migration
+_BLOCK_TAG_RE = re.compile(r"<(/?(p|div|li|ul|ol|h[1-6]|blockquote|table|tr|td|th)\b[^>]*|br\s*/?)>", re.IGNORECASE)
+
+
+def html_to_text(html):
+    text = unescape(strip_tags(_BLOCK_TAG_RE.sub(r" \g<0> ", html or "")))
+    return " ".join(text.split())
+
+
+def make_search_text(title, lead_paragraph, main_content, tag_names):
+    parts = [title, html_to_text(lead_paragraph), html_to_text(main_content)]
+    return " ".join(part for part in parts + sorted(tag_names) if part)
+
+
+DOCUMENT_TABLE = "cmsplugin_articles_ai_articlesearchdocument"
+FTS_TABLE = "cmsplugin_articles_ai_articlesearchdocument_fts"
+SEARCH_INDEX = "cmsplugin_articles_ai_articlesearchdocument_text_idx"
+SEARCH_CONFIG = "simple"
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        schema_editor.execute(
+            "CREATE INDEX %s ON %s USING gin (to_tsvector('%s', text))" % (
+                SEARCH_INDEX, DOCUMENT_TABLE, SEARCH_CONFIG,
+            )
+        )
+    elif vendor == "sqlite":
+        try:
+            schema_editor.execute(
+                "CREATE VIRTUAL TABLE %s USING fts5(text, content='%s', content_rowid='article_id')" % (
+                    FTS_TABLE, DOCUMENT_TABLE,
+                )
+            )
+        except OperationalError:
+            # SQLite without FTS5, searching falls back to substring matching
+            return
+        # Keep the full-text index in sync with the documents
+        schema_editor.execute(
+            "CREATE TRIGGER %(fts)s_insert AFTER INSERT ON %(table)s BEGIN "
+            "INSERT INTO %(fts)s (rowid, text) VALUES (new.article_id, new.text); END" % {
+                "fts": FTS_TABLE, "table": DOCUMENT_TABLE,
+            }
+        )
+        schema_editor.execute(
+            "CREATE TRIGGER %(fts)s_delete AFTER DELETE ON %(table)s BEGIN "
+            "INSERT INTO %(fts)s (%(fts)s, rowid, text) VALUES ('delete', old.article_id, old.text); END" % {
+                "fts": FTS_TABLE, "table": DOCUMENT_TABLE,
+            }
+        )
+        schema_editor.execute(
+            "CREATE TRIGGER %(fts)s_update AFTER UPDATE ON %(table)s BEGIN "
+            "INSERT INTO %(fts)s (%(fts)s, rowid, text) VALUES ('delete', old.article_id, old.text); "
+            "INSERT INTO %(fts)s (rowid, text) VALUES (new.article_id, new.text); END" % {
+                "fts": FTS_TABLE, "table": DOCUMENT_TABLE,
+            }
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        schema_editor.execute("DROP INDEX %s" % SEARCH_INDEX)
+    elif vendor == "sqlite":
+        for trigger in ("insert", "delete", "update"):
+            schema_editor.execute("DROP TRIGGER IF EXISTS %s_%s" % (FTS_TABLE, trigger))
+        schema_editor.execute("DROP TABLE IF EXISTS %s" % FTS_TABLE)
+
+
+def create_search_documents(apps, schema_editor):
+    Article = apps.get_model("cmsplugin_articles_ai", "Article")
+    ArticleSearchDocument = apps.get_model("cmsplugin_articles_ai", "ArticleSearchDocument")
+    tag_names = {}
+    for article_pk, tag_name in Article.tags.through.objects.values_list("article_id", "tag__name"):
+        tag_names.setdefault(article_pk, []).append(tag_name)
+    articles = Article.objects.values_list("pk", "title", "lead_paragraph", "main_content")
+    for article_pk, title, lead_paragraph, main_content in articles.iterator():
+        ArticleSearchDocument.objects.create(
+            article_id=article_pk,
+            text=make_search_text(title, lead_paragraph, main_content, tag_names.get(article_pk, [])),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cmsplugin_articles_ai', '0013_add_excerpt'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArticleSearchDocument',
+            fields=[
+                ('article', models.OneToOneField(
+                    on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document',
+                    serialize=False, to='cmsplugin_articles_ai.Article', verbose_name='article',
+                )),
+                ('text', models.TextField(verbose_name='text')),
+            ],
+            options={
+                'verbose_name': 'article search document',
+                'verbose_name_plural': 'article search documents',
+            },
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+        migrations.RunPython(create_search_documents, migrations.RunPython.noop),
+    ]
@@ -2,4 +2,5 @@
 from .articles import *
 from .categories import *
 from .plugin_models import *
+from .search import *
 from .tags import *
@@ -1,19 +1,23 @@
 # -*- coding: utf-8 -*-
 from django.conf import settings
 from django.core.urlresolvers import reverse
-from django.db import models
-from django.db.models import Count, Q
+from django.db import models, router, transaction
+from django.db.models import Case, Count, Max, Min, Q, When
+from django.db.models.sql.where import AND
 from django.utils import timezone
 from django.utils.encoding import python_2_unicode_compatible
 from django.utils.translation import ugettext_lazy as _
 from djangocms_text_ckeditor.fields import HTMLField
 from filer.fields.file import FilerFileField
 from filer.fields.image import FilerImageField
+from filer.models import File
 from publisher.models import PublisherModel
 from softchoice.fields.language import LanguageField
 
+from ..utils import get_tag_signature, make_excerpt, make_search_text
 from .categories import Category
 from .plugin_models import TagFilterMode
+from .search import ArticleSearchDocument, FTS_TABLE, has_fts_table, SEARCH_CONFIG
 from .tags import Tag
 
 __all__ = (
@@ -29,7 +33,7 @@ def _get_tag_pks(tags):
     the passed in iterable already contains ids.
     """
     if hasattr(tags, "values_list"):
-        return tags.values_list("pk", flat=True)
+        return list(tags.values_list("pk", flat=True))
     elif all(isinstance(item, int) for item in tags):
         # Looks like list already contains just ids
         return tags
@@ -37,6 +41,95 @@ def _get_tag_pks(tags):
         return [tag.pk for tag in tags]
 
 
+class _TagExistsCondition(object):
+    """
+    Correlated EXISTS (or NOT EXISTS when negated) condition on the
+    article-tag table, matching articles that have any of the given tags.
+    Unlike filtering through the `tags` relation this neither joins the
+    article rows with their tags nor requires DISTINCT.
+    """
+    contains_aggregate = False
+
+    def __init__(self, model, alias, tag_pks, negated=False):
+        self.model = model
+        self.alias = alias
+        self.tag_pks = tag_pks
+        self.negated = negated
+
+    def relabeled_clone(self, change_map):
+        return self.__class__(
+            self.model, change_map.get(self.alias, self.alias), self.tag_pks, self.negated,
+        )
+
+    def as_sql(self, compiler, connection):
+        qn = connection.ops.quote_name
+        field = self.model._meta.get_field("tags")
+        sql = "%sEXISTS (SELECT 1 FROM %s %s WHERE %s.%s = %s.%s AND %s.%s IN (%s))" % (
+            "NOT " if self.negated else "",
+            qn(self.model.tags.through._meta.db_table),
+            qn("article_tag"),
+            qn("article_tag"),
+            qn(field.m2m_column_name()),
+            compiler.quote_name_unless_alias(self.alias),
+            qn(self.model._meta.pk.column),
+            qn("article_tag"),
+            qn(field.m2m_reverse_name()),
+            ", ".join(["%s"] * len(self.tag_pks)),
+        )
+        return sql, list(self.tag_pks)
+
+
+class _SearchCondition(object):
+    """
+    Condition matching articles whose search document contains all of the
+    given terms. Uses the full-text index of the database when there is
+    one, and falls back to case-insensitive substring matching.
+    """
+    contains_aggregate = False
+
+    def __init__(self, model, alias, terms):
+        self.model = model
+        self.alias = alias
+        self.terms = terms
+
+    def relabeled_clone(self, change_map):
+        return self.__class__(self.model, change_map.get(self.alias, self.alias), self.terms)
+
+    def as_sql(self, compiler, connection):
+        qn = connection.ops.quote_name
+        pk_column = "%s.%s" % (compiler.quote_name_unless_alias(self.alias), qn(self.model._meta.pk.column))
+        document_table = qn(ArticleSearchDocument._meta.db_table)
+        if connection.vendor == "postgresql":
+            # The expression must match the one of the full-text index
+            sql = "%s IN (SELECT %s FROM %s WHERE to_tsvector('%s', %s) @@ plainto_tsquery('%s', %%s))" % (
+                pk_column, qn("article_id"), document_table, SEARCH_CONFIG, qn("text"), SEARCH_CONFIG,
+            )
+            return sql, [" ".join(self.terms)]
+        if connection.vendor == "sqlite" and has_fts_table(connection):
+            sql = "%s IN (SELECT rowid FROM %s WHERE %s MATCH %%s)" % (pk_column, qn(FTS_TABLE), qn(FTS_TABLE))
+            # Quote the terms so that they aren't interpreted as FTS5 query syntax
+            return sql, [" ".join('"%s"' % term.replace('"', '""') for term in self.terms)]
+        lhs = connection.ops.lookup_cast("icontains") % qn("text")
+        conditions = " AND ".join("%s %s" % (lhs, connection.operators["icontains"] % "%s") for _ in self.terms)
+        sql = "%s IN (SELECT %s FROM %s WHERE %s)" % (pk_column, qn("article_id"), document_table, conditions)
+        return sql, ["%%%s%%" % connection.ops.prep_for_like_query(term) for term in self.terms]
+
+
+def _get_tag_match_subquery(model, tag_pks):
+    """
+    Return a subquery of ids of articles that have all of the given tags.
+    Matching tags are counted per article from the article-tag table, so
+    the query has no joins regardless of the amount of given tags.
+    """
+    return model.tags.through.objects.filter(
+        tag_id__in=tag_pks,
+    ).values("article_id").annotate(
+        num_matching_tags=Count("tag_id"),
+    ).filter(
+        num_matching_tags=len(tag_pks),
+    ).values("article_id")
+
+
 class ArticleQuerySet(models.QuerySet):
 
     def public(self, language=None):
@@ -48,10 +141,57 @@ class ArticleQuerySet(models.QuerySet):
         """
         now = timezone.now()
         articles = self.filter(Q(published_from__lte=now) & Q(Q(published_until__gte=now) | Q(published_until=None)))
+        return articles.in_language(language)
+
+    def in_language(self, language=None):
+        """
+        Returns articles with given language or all articles if language
+        isn't given.
+        :params language: Language code
+        :language type: Str
+        """
         if language:
             # Articles with blank language should be considered language agnostic.
-            return articles.filter(Q(language=language) | Q(language=""))
-        return articles
+            return self.filter(Q(language=language) | Q(language=""))
+        return self.all()
+
+    def next_publication_boundary(self):
+        """
+        Returns the nearest future moment when some of the articles becomes
+        public or stops being public, or None if there is no such moment.
+        """
+        now = timezone.now()
+        boundaries = self.aggregate(
+            next_published_from=Min(Case(When(published_from__gt=now, then="published_from"))),
+            next_published_until=Min(Case(When(published_until__gte=now, then="published_until"))),
+        )
+        boundaries = [boundary for boundary in boundaries.values() if boundary]
+        return min(boundaries) if boundaries else None
+
+    def last_publication_boundary(self):
+        """
+        Returns the latest past moment when some of the articles became
+        public or stopped being public, or None if there is no such moment.
+        """
+        now = timezone.now()
+        # Separate filtered aggregates can use the indexes on the dates
+        boundaries = [
+            self.filter(published_from__lte=now).order_by().aggregate(boundary=Max("published_from"))["boundary"],
+            self.filter(published_until__lt=now).order_by().aggregate(boundary=Max("published_until"))["boundary"],
+        ]
+        boundaries = [boundary for boundary in boundaries if boundary]
+        return max(boundaries) if boundaries else None
+
+    def for_listing(self):
+        """
+        Returns articles with the relations shown in article lists (author,
+        category, main image and tags) fetched up front, so that rendering
+        a list costs a fixed amount of queries regardless of its length.
+        The content isn't loaded, lists show the stored excerpt instead.
+        """
+        return self.select_related(
+            "author", "category", "main_image",
+        ).prefetch_related("tags").defer("lead_paragraph", "main_content")
 
     def tag_filter(self, filter_mode, tags):
         """
@@ -71,13 +211,8 @@ class ArticleQuerySet(models.QuerySet):
         Find articles that have exactly (no more, no less) the given tags.
         :params tags: Iterable of Tags or tag ids
         """
-        # Reduce the query to only articles with correct amount of tags
-        tag_pks = _get_tag_pks(tags)
-        articles = self.annotate(count=Count('tags')).filter(count=len(tag_pks))
-
-        for pk in tag_pks:
-            articles = articles.filter(tags__pk=pk)
-        return articles
+        tag_pks = set(_get_tag_pks(tags))
+        return self.filter(tag_count=len(tag_pks), tag_signature=get_tag_signature(tag_pks))
 
     def with_all_tags(self, tags):
         """
@@ -86,13 +221,13 @@ class ArticleQuerySet(models.QuerySet):
         :params:
             :tags: Iterable of Tags or tag ids
         """
-        # Reduce the query to only articles with correct amount of tags
-        tag_pks = _get_tag_pks(tags)
-        articles = self.all()
-
-        for pk in tag_pks:
-            articles = articles.filter(tags__pk=pk)
-        return articles
+        tag_pks = set(_get_tag_pks(tags))
+        if not tag_pks:
+            return self.all()
+        return self.filter(
+            tag_count__gte=len(tag_pks),
+            pk__in=_get_tag_match_subquery(self.model, tag_pks),
+        )
 
     def with_any_of_tags(self, tags):
         """
@@ -102,8 +237,122 @@ class ArticleQuerySet(models.QuerySet):
         :params:
             :tags: Iterable of Tags or tag ids
         """
-        tag_pks = _get_tag_pks(tags)
-        return self.filter(tags__in=tag_pks).distinct()
+        tag_pks = list(_get_tag_pks(tags))
+        if not tag_pks:
+            return self.none()
+        return self._filter_tag_exists(tag_pks)
+
+    def without_any_of_tags(self, tags):
+        """
+        Exclude articles that have any of the given tags.
+        :params:
+            :tags: Iterable of Tags or tag ids
+        """
+        tag_pks = list(_get_tag_pks(tags))
+        if not tag_pks:
+            return self.all()
+        return self._filter_tag_exists(tag_pks, negated=True)
+
+    def update_tag_signatures(self):
+        """
+        Recalculate the tag signatures of the articles from their tags.
+        Returns the amount of articles whose signature was changed.
+        """
+        updated = 0
+        for signatures in self.iter_tag_signatures(stale_only=True):
+            pk, tag_count, tag_signature = signatures[0], signatures[3], signatures[4]
+            self.model.objects.filter(pk=pk).update(tag_count=tag_count, tag_signature=tag_signature)
+            updated += 1
+        return updated
+
+    def iter_tag_signatures(self, stale_only=False, chunk_size=1000):
+        """
+        Iterate tuples of article id, stored tag count and signature, and
+        tag count and signature calculated from the article's tags.
+        :params stale_only: Only yield articles with outdated signatures
+        """
+        articles = self.order_by("pk").values_list("pk", "tag_count", "tag_signature")
+        last_pk = None
+        while True:
+            chunk = articles if last_pk is None else articles.filter(pk__gt=last_pk)
+            chunk = list(chunk[:chunk_size])
+            if not chunk:
+                return
+            last_pk = chunk[-1][0]
+            tag_pks = {}
+            article_tags = self.model.tags.through.objects.filter(
+                article_id__in=[row[0] for row in chunk],
+            ).values_list("article_id", "tag_id")
+            for article_pk, tag_pk in article_tags:
+                tag_pks.setdefault(article_pk, []).append(tag_pk)
+            for pk, stored_count, stored_signature in chunk:
+                tag_count = len(tag_pks.get(pk, []))
+                tag_signature = get_tag_signature(tag_pks.get(pk, []))
+                if stale_only and (stored_count, stored_signature) == (tag_count, tag_signature):
+                    continue
+                yield pk, stored_count, stored_signature, tag_count, tag_signature
+
+    def search(self, query):
+        """
+        Find articles that contain all words of the given search query in
+        their title, lead paragraph, content or tag names.
+        :params query: Search query
+        """
+        terms = query.split()
+        if not terms:
+            return self.none()
+        articles = self.all()
+        alias = articles.query.get_initial_alias()
+        articles.query.where.add(_SearchCondition(self.model, alias, terms), AND)
+        return articles
+
+    def update_search_documents(self, chunk_size=500):
+        """
+        Recalculate the search documents of the articles. Returns the
+        amount of articles processed.
+        """
+        articles = self.order_by("pk").only(
+            "pk", "title", "lead_paragraph", "main_content",
+        ).prefetch_related("tags")
+        updated = 0
+        last_pk = None
+        while True:
+            chunk = articles if last_pk is None else articles.filter(pk__gt=last_pk)
+            chunk = list(chunk[:chunk_size])
+            if not chunk:
+                return updated
+            last_pk = chunk[-1].pk
+            ArticleSearchDocument.objects.filter(article__in=chunk).delete()
+            ArticleSearchDocument.objects.bulk_create(
+                ArticleSearchDocument(article=article, text=article.get_search_text()) for article in chunk
+            )
+            updated += len(chunk)
+
+    def update_excerpts(self, chunk_size=1000):
+        """
+        Recalculate the stored excerpts of the articles from their content.
+        Returns the amount of articles whose excerpt was changed.
+        """
+        articles = self.order_by("pk").only("pk", "lead_paragraph", "main_content", "excerpt")
+        updated = 0
+        last_pk = None
+        while True:
+            chunk = articles if last_pk is None else articles.filter(pk__gt=last_pk)
+            chunk = list(chunk[:chunk_size])
+            if not chunk:
+                return updated
+            last_pk = chunk[-1].pk
+            for article in chunk:
+                excerpt = article.get_excerpt()
+                if excerpt != article.excerpt:
+                    self.model.objects.filter(pk=article.pk).update(excerpt=excerpt)
+                    updated += 1
+
+    def _filter_tag_exists(self, tag_pks, negated=False):
+        articles = self.all()
+        alias = articles.query.get_initial_alias()
+        articles.query.where.add(_TagExistsCondition(self.model, alias, tag_pks, negated), AND)
+        return articles
 
 
 @python_2_unicode_compatible
@@ -155,6 +404,11 @@ class Article(PublisherModel):
     )
     lead_paragraph = HTMLField(verbose_name=_("lead paragraph"), blank=True)
     main_content = HTMLField(verbose_name=_("content"))
+    excerpt = models.TextField(_("excerpt"), blank=True, editable=False)
+    tag_count = models.PositiveIntegerField(_("tag count"), default=0, editable=False)
+    tag_signature = models.CharField(
+        _("tag signature"), max_length=40, blank=True, editable=False, db_index=True,
+    )
     created_at = models.DateTimeField(
         _("creation time"), auto_now_add=True, editable=False,
     )
@@ -168,6 +422,11 @@ class Article(PublisherModel):
         verbose_name = _("article")
         verbose_name_plural = _("articles")
         ordering = ('-published_from', '-pk')
+        # Indexes for listing public articles in the default ordering
+        index_together = [
+            ("publisher_is_draft", "published_from", "id"),
+            ("publisher_is_draft", "category", "published_from", "id"),
+        ]
 
     def __str__(self):
         return self.title
@@ -187,6 +446,62 @@ class Article(PublisherModel):
             return False
         return True
 
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or {"lead_paragraph", "main_content"} & set(update_fields):
+            self.excerpt = self.get_excerpt()
+            if update_fields is not None:
+                kwargs["update_fields"] = set(update_fields) | {"excerpt"}
+        if update_fields is None and self.pk is not None:
+            # The tags may have changed after the instance was loaded, e.g.
+            # when an admin form or publishing saves all fields
+            self.set_tag_signature(using=kwargs.get("using"))
+        super(Article, self).save(*args, **kwargs)
+
+    def get_excerpt(self):
+        """
+        Return a plain text excerpt of the lead paragraph, or of the main
+        content if the article has no lead paragraph. The excerpt is stored
+        so that article lists don't need to load the content.
+        """
+        return make_excerpt(self.lead_paragraph or self.main_content)
+
+    def get_search_text(self):
+        """
+        Return the plain text indexed for searching the article.
+        """
+        return make_search_text(
+            self.title, self.lead_paragraph, self.main_content, [tag.name for tag in self.tags.all()],
+        )
+
+    def update_search_document(self):
+        """
+        Update the article's search document from its current content.
+        """
+        ArticleSearchDocument.objects.update_or_create(article=self, defaults={"text": self.get_search_text()})
+
+    def set_tag_signature(self, using=None):
+        """
+        Recalculate the tag count and signature from the article's tags
+        without saving them. The tags are read from the database the
+        article is written to.
+        :params using: Database alias, defaults to the one of the router
+        """
+        using = using or router.db_for_write(Article, instance=self)
+        tag_pks = list(Article.tags.through.objects.using(using).filter(
+            article_id=self.pk,
+        ).values_list("tag_id", flat=True))
+        self.tag_count = len(tag_pks)
+        self.tag_signature = get_tag_signature(tag_pks)
+
+    def update_tag_signature(self):
+        """
+        Recalculate the tag count and signature from the article's tags.
+        These are maintained for fast filtering by tags.
+        """
+        self.set_tag_signature()
+        Article.objects.filter(pk=self.pk).update(tag_count=self.tag_count, tag_signature=self.tag_signature)
+
     def get_absolute_url(self):
         """
         Return the URL to the article's detail view.
@@ -202,12 +517,27 @@ class Article(PublisherModel):
         :param src_obj: Article object where the relations are copied from
         :param dst_obj: Article object where the relations are copied to
         """
-        dst_obj.tags = src_obj.tags.all()
-
-        for attachment in src_obj.attachments.all():
-            attachment.pk = None
-            attachment.article = dst_obj
-            attachment.save()
+        # The relations are copied with bulk inserts, which don't send
+        # m2m_changed signals. The tag count and signature are already
+        # copied with the other fields, but the search document needs
+        # the tags.
+        with transaction.atomic():
+            tag_through = Article.tags.through
+            tag_through.objects.filter(article=dst_obj).delete()
+            tag_through.objects.bulk_create([
+                tag_through(article_id=dst_obj.pk, tag_id=tag_pk)
+                for tag_pk in src_obj.tags.values_list("pk", flat=True)
+            ])
+            ArticleAttachment.objects.bulk_create([
+                ArticleAttachment(
+                    article=dst_obj,
+                    name=attachment.name,
+                    attachment_file_id=attachment.attachment_file_id,
+                    is_image=attachment.is_image,
+                )
+                for attachment in src_obj.attachments.all()
+            ])
+            dst_obj.update_search_document()
 
 
 class ArticleAttachmentQuerySet(models.QuerySet):
@@ -245,6 +575,20 @@ class ArticleAttachment(models.Model):
     def __str__(self):
         return "%s (%s)" % (self.name, self.filename)
 
+    @classmethod
+    def load_real_files(cls, attachments):
+        """
+        Replace the files of the attachments with their real instances,
+        e.g. images, fetching them with a query per file type instead of
+        a query per attachment.
+        :params attachments: List of attachments
+        """
+        file_pks = [attachment.attachment_file_id for attachment in attachments if attachment.attachment_file_id]
+        files = {file.pk: file for file in File.objects.filter(pk__in=file_pks)}
+        for attachment in attachments:
+            if attachment.attachment_file_id in files:
+                attachment.attachment_file = files[attachment.attachment_file_id]
+
     @property
     def icon_url(self):
         obj = self.attachment_file.get_real_instance()
@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 from cms.models import CMSPlugin
 from django.db import models
+from django.utils.functional import cached_property
 from django.utils.http import urlencode
 from django.utils.translation import ugettext_lazy as _
 from enumfields import Enum, EnumIntegerField
@@ -81,6 +82,18 @@ class ArticleListPlugin(CMSPlugin):
     def __str__(self):
         return "Article list (amount: %s)" % self.article_amount
 
+    @cached_property
+    def tag_pks(self):
+        return sorted(self.tags.values_list("pk", flat=True))
+
+    @cached_property
+    def exclude_tag_pks(self):
+        return sorted(self.exclude_tags.values_list("pk", flat=True))
+
+    @cached_property
+    def exclude_category_pks(self):
+        return sorted(self.exclude_categories.values_list("pk", flat=True))
+
     def copy_relations(self, oldinstance):
         # This makes sure that the plugin's relations are copied during draft
         # publishing. Without this tags wouldn't be copied to the published
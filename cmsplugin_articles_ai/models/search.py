@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+from django.db import models
+from django.utils.encoding import python_2_unicode_compatible
+from django.utils.translation import ugettext_lazy as _
+
+__all__ = (
+    "ArticleSearchDocument",
+)
+
+# Full-text index of the search documents on SQLite. It's an FTS5 table
+# using the documents as external content and kept in sync by triggers.
+FTS_TABLE = "cmsplugin_articles_ai_articlesearchdocument_fts"
+
+# Text search configuration of the search index on PostgreSQL. Articles
+# can be written in any language, so words are not stemmed.
+SEARCH_CONFIG = "simple"
+
+_fts_tables = {}
+
+
+def has_fts_table(connection):
+    """
+    Return whether the SQLite full-text index exists in the database. It
+    is missing if SQLite was compiled without FTS5.
+    """
+    key = (connection.alias, connection.settings_dict["NAME"])
+    if key not in _fts_tables:
+        _fts_tables[key] = FTS_TABLE in connection.introspection.table_names()
+    return _fts_tables[key]
+
+
+@python_2_unicode_compatible
+class ArticleSearchDocument(models.Model):
+    """
+    Plain text of an article indexed for full-text search. Documents are
+    updated when articles or their tags change.
+    """
+    article = models.OneToOneField(
+        "cmsplugin_articles_ai.Article",
+        verbose_name=_("article"),
+        related_name="search_document",
+        primary_key=True,
+        on_delete=models.CASCADE,
+    )
+    text = models.TextField(_("text"))
+
+    class Meta:
+        verbose_name = _("article search document")
+        verbose_name_plural = _("article search documents")
+
+    def __str__(self):
+        return self.text[:50]
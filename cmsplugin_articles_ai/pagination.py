@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+try:
+    from collections.abc import Sequence
+except ImportError:  # Python 2
+    from collections import Sequence
+
+from django.core.paginator import InvalidPage
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.encoding import force_bytes, force_text
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+NEXT = "n"
+PREVIOUS = "p"
+
+
+def get_article_key(article):
+    return article.published_from, article.pk
+
+
+class CursorPaginator(object):
+    """
+    Paginator that pages through articles by their default ordering, i.e.
+    (published_from, pk) descending, using the key of the last seen article
+    instead of an offset. That makes every page equally fast to fetch and
+    doesn't require counting the articles.
+    """
+    is_cursor_paginator = True
+
+    def __init__(self, object_list, per_page, get_key=get_article_key):
+        """
+        :params object_list: Queryset of articles with published_from set
+        :params get_key: Function returning (published_from, pk) of an item
+        """
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.get_key = get_key
+
+    def encode_cursor(self, direction, item):
+        published_from, pk = self.get_key(item)
+        value = "%s|%s|%s" % (direction, published_from.isoformat(), pk)
+        return force_text(urlsafe_base64_encode(force_bytes(value)))
+
+    def decode_cursor(self, cursor):
+        try:
+            direction, published_from, pk = force_text(urlsafe_base64_decode(cursor)).split("|")
+            published_from = parse_datetime(published_from)
+            pk = int(pk)
+        except (TypeError, ValueError, UnicodeDecodeError):
+            raise InvalidPage("Invalid cursor")
+        if direction not in (NEXT, PREVIOUS) or published_from is None:
+            raise InvalidPage("Invalid cursor")
+        return direction, published_from, pk
+
+    def page(self, cursor=None):
+        """
+        Return the page following (or preceding) the given cursor, or the
+        first page if no cursor is given.
+        """
+        if not cursor:
+            items = list(self.object_list[:self.per_page + 1])
+            return self._make_page(items[:self.per_page], len(items) > self.per_page, False)
+
+        direction, published_from, pk = self.decode_cursor(cursor)
+        if direction == NEXT:
+            items = list(self.object_list.filter(
+                Q(published_from__lt=published_from) | Q(published_from=published_from, pk__lt=pk)
+            )[:self.per_page + 1])
+            return self._make_page(items[:self.per_page], len(items) > self.per_page, True)
+
+        items = list(self.object_list.filter(
+            Q(published_from__gt=published_from) | Q(published_from=published_from, pk__gt=pk)
+        ).order_by("published_from", "pk")[:self.per_page + 1])
+        return self._make_page(list(reversed(items[:self.per_page])), True, len(items) > self.per_page)
+
+    def _make_page(self, items, has_next, has_previous):
+        return CursorPage(
+            items,
+            self,
+            next_cursor=self.encode_cursor(NEXT, items[-1]) if has_next and items else None,
+            previous_cursor=self.encode_cursor(PREVIOUS, items[0]) if has_previous and items else None,
+        )
+
+
+class CursorPage(Sequence):
+
+    def __init__(self, object_list, paginator, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return "<Cursor page of %s items>" % len(self)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_previous() or self.has_next()
@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+"""
+Surrogate keys and purging of cached pages.
+
+Pages name the articles, tags, categories and article lists they show
+in a surrogate key header, so that a reverse proxy or CDN can cache
+them for long and drop only the affected pages when something changes.
+Changes are purged through the backend set with `ARTICLES_PURGE_BACKEND`
+once their transaction has been committed.
+"""
+import logging
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+from django.utils.six.moves.urllib.request import Request, urlopen
+
+logger = logging.getLogger(__name__)
+
+# Key of all article lists, including the tag and category lists shown
+# beside them
+ARTICLE_LISTS_KEY = "articles"
+
+
+def get_surrogate_key_header():
+    return getattr(settings, "ARTICLES_SURROGATE_KEY_HEADER", "Surrogate-Key")
+
+
+def get_article_key(slug):
+    return "article-%s" % slug
+
+
+def get_tag_key(tag_pk):
+    return "tag-%s" % tag_pk
+
+
+def get_category_key(category_pk):
+    return "category-%s" % category_pk
+
+
+def get_list_keys(language=""):
+    """
+    Return the keys of a list of articles.
+    :params language: Language code the list is filtered with
+    """
+    return [ARTICLE_LISTS_KEY, "articles-lang-%s" % (language or "all")]
+
+
+def get_article_purge_keys(article):
+    """
+    Return the keys of the pages that change when the article changes:
+    the article's page and the lists that may contain it.
+    """
+    keys = [get_article_key(article.slug), "articles-lang-all"]
+    if article.language:
+        keys.append("articles-lang-%s" % article.language)
+    else:
+        # Language agnostic articles are listed in every language
+        keys.append(ARTICLE_LISTS_KEY)
+    return keys
+
+
+def patch_surrogate_keys(response, keys):
+    """
+    Add the keys to the surrogate key header of the response.
+    """
+    header = get_surrogate_key_header()
+    existing = response[header].split() if response.has_header(header) else []
+    new_keys = [key for key in keys if key not in existing]
+    if existing or new_keys:
+        response[header] = " ".join(existing + sorted(set(new_keys)))
+
+
+def add_surrogate_keys(request, keys):
+    """
+    Add keys to the response of the request, e.g. from plugins that can't
+    change the response. Requires `SurrogateKeyMiddleware`.
+    """
+    if request is not None:
+        request.__dict__.setdefault("_surrogate_keys", set()).update(keys)
+
+
+class BasePurgeBackend(object):
+    """
+    Base class of purge backends.
+    """
+
+    def purge(self, keys):
+        """
+        Purge the cached pages with any of the given surrogate keys.
+        :params keys: Sorted list of keys
+        """
+        raise NotImplementedError
+
+
+class HTTPPurgeBackend(BasePurgeBackend):
+    """
+    Sends the keys to each of `ARTICLES_PURGE_URLS` in a header of a PURGE
+    request, e.g. for Varnish with the xkey module. The header is the
+    surrogate key header unless set with `ARTICLES_PURGE_HEADER`. At most
+    `ARTICLES_PURGE_BATCH_SIZE` keys are sent per request.
+    """
+    method = "PURGE"
+    timeout = 5
+
+    def __init__(self):
+        self.urls = getattr(settings, "ARTICLES_PURGE_URLS", [])
+        self.header = getattr(settings, "ARTICLES_PURGE_HEADER", None) or get_surrogate_key_header()
+        self.batch_size = getattr(settings, "ARTICLES_PURGE_BATCH_SIZE", 100)
+
+    def purge(self, keys):
+        for start in range(0, len(keys), self.batch_size):
+            batch = " ".join(keys[start:start + self.batch_size])
+            for url in self.urls:
+                request = Request(url, headers={self.header: batch})
+                request.get_method = lambda: self.method
+                try:
+                    urlopen(request, timeout=self.timeout).close()
+                except Exception:
+                    logger.warning("Could not purge %s from %s", batch, url, exc_info=True)
+
+
+class LocMemPurgeBackend(BasePurgeBackend):
+    """
+    Collects the purged keys into `purged` list instead of sending them
+    anywhere, for tests and development.
+    """
+    purged = []
+
+    def purge(self, keys):
+        self.purged.append(keys)
+
+
+_state = threading.local()
+
+
+def get_purge_backend():
+    """
+    Return an instance of the purge backend set with `ARTICLES_PURGE_BACKEND`
+    setting, or None if purging is disabled.
+    """
+    backend = getattr(settings, "ARTICLES_PURGE_BACKEND", None)
+    return import_string(backend)() if backend else None
+
+
+def purge(keys):
+    """
+    Purge the cached pages with any of the given keys. Within
+    `batch_purges`, the keys are collected and purged at its end. Within a
+    transaction, the keys are collected and purged when it is committed,
+    so that caches don't fetch the pages before the changes are visible.
+    """
+    keys = set(keys)
+    if not keys or getattr(settings, "ARTICLES_PURGE_BACKEND", None) is None:
+        return
+    pending = getattr(_state, "pending", None)
+    if pending is None:
+        pending = _get_transaction_keys()
+    if pending is not None:
+        pending.update(keys)
+        return
+    get_purge_backend().purge(sorted(keys))
+
+
+def _get_transaction_keys():
+    """
+    Return the keys to purge when the current transaction of the default
+    database is committed, or None outside transactions.
+    """
+    connection = transaction.get_connection()
+    if not hasattr(transaction, "on_commit") or not connection.in_atomic_block:
+        return None
+    for sids, func in connection.run_on_commit:
+        # Rolling back a savepoint drops the callbacks registered within it
+        if getattr(func, "purge_keys", None) is not None:
+            return func.purge_keys
+
+    def purge_committed():
+        purge(purge_committed.purge_keys)
+
+    purge_committed.purge_keys = set()
+    transaction.on_commit(purge_committed)
+    return purge_committed.purge_keys
+
+
+def start_purge_batch():
+    """
+    Start collecting the purged keys instead of purging them right away.
+    Returns False if a batch has already been started.
+    """
+    if getattr(_state, "pending", None) is not None:
+        return False
+    _state.pending = set()
+    return True
+
+
+def end_purge_batch():
+    """
+    Purge the keys collected since `start_purge_batch`.
+    """
+    keys, _state.pending = getattr(_state, "pending", None), None
+    if keys:
+        purge(keys)
+
+
+@contextmanager
+def batch_purges():
+    """
+    Collect the purged keys and purge them all at once at the end, e.g.
+    when several objects are changed.
+    """
+    started = start_purge_batch()
+    try:
+        yield
+    finally:
+        if started:
+            end_purge_batch()
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+from django.conf import settings
+
+from .cache import get_cache, get_timeout, make_key
+from .instrumentation import record_cache_lookup
+from .models import Article
+from .routers import primary_reads
+
+
+class ArticlePkList(object):
+    """
+    List of articles given by their ids. Slicing fetches only the sliced
+    articles, so a paginator can page through a long cached result one
+    page of rows at a time.
+    """
+
+    def __init__(self, pks, articles):
+        """
+        :params pks: Ordered list of article ids
+        :params articles: Queryset the articles are fetched from
+        """
+        self.pks = pks
+        self.articles = articles
+
+    def __len__(self):
+        return len(self.pks)
+
+    def __iter__(self):
+        return iter(self[:])
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self.articles.get(pk=self.pks[index])
+        pks = self.pks[index]
+        articles = {article.pk: article for article in self.articles.filter(pk__in=pks)}
+        # Articles deleted after caching the ids are left out
+        return [articles[pk] for pk in pks if pk in articles]
+
+
+def get_tag_filter_result(articles, filters, language, draft_status):
+    """
+    Return the ids of the articles matching the tag filter in their order,
+    and the latest modification time of the articles. The result is cached
+    with the canonical filter until articles or tags change or some article
+    gets published or expires, but at most `ARTICLES_TAG_FILTER_CACHE_TIMEOUT`
+    seconds. Returns None if the cache is disabled.
+    :params articles: Queryset of the public articles matching the filter
+    :params filters: Canonical form of every filter of the queryset besides
+                     the language and the draft status, e.g. the sorted tag
+                     ids and the filter mode
+    :params language: Language code the articles are filtered with
+    :params draft_status: Whether the articles are drafts
+    """
+    max_timeout = getattr(settings, "ARTICLES_TAG_FILTER_CACHE_TIMEOUT", 3600)
+    if not max_timeout:
+        return None
+
+    cache = get_cache()
+    key = make_key("tag_filter", filters, language, draft_status)
+    result = cache.get(key)
+    record_cache_lookup(result is not None)
+    if result is None:
+        with primary_reads():
+            rows = list(articles.prefetch_related(None).values_list("pk", "modified_at"))
+            boundary = Article.objects.filter(
+                publisher_is_draft=draft_status,
+            ).in_language(language).next_publication_boundary()
+        result = {
+            "pks": [pk for pk, modified_at in rows],
+            "modified_at": max(modified_at for pk, modified_at in rows) if rows else None,
+        }
+        cache.set(key, result, get_timeout(boundary, max_timeout))
+    return result
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""
+Routing public reads of articles to read replicas.
+
+Add `ReplicaRouter` to `DATABASE_ROUTERS` and `ReplicaRouterMiddleware`
+after the authentication middleware. Reads of the apps in
+`ARTICLES_REPLICA_APP_LABELS` then go to one of `ARTICLES_REPLICA_DATABASES`
+during GET and HEAD requests of visitors that aren't staff members and
+aren't in draft mode. Everything else, including the queries filling the
+shared caches, uses the primary database. After a
+request that writes to the database, the client keeps reading from the
+primary for `ARTICLES_REPLICA_STICKY_SECONDS`, so editors see their changes
+despite replication lag.
+"""
+import random
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from publisher.middleware import get_draft_status
+
+try:
+    from django.utils.deprecation import MiddlewareMixin
+except ImportError:  # Django < 1.10
+    MiddlewareMixin = object
+
+STICKY_COOKIE = "articles_primary"
+
+_state = threading.local()
+
+
+def get_replicas():
+    return getattr(settings, "ARTICLES_REPLICA_DATABASES", [])
+
+
+def get_replica():
+    """
+    Return the replica the current thread reads from, or None if reads go
+    to the primary database.
+    """
+    if getattr(_state, "wrote", False) or get_draft_status():
+        return None
+    return getattr(_state, "replica", None)
+
+
+@contextmanager
+def replica_reads(replica=None):
+    """
+    Read from a replica within the block, e.g. in management commands that
+    only read public articles.
+    :params replica: Database alias, defaults to a random replica
+    """
+    replicas = get_replicas()
+    previous = getattr(_state, "replica", None), getattr(_state, "wrote", False)
+    _state.replica, _state.wrote = replica or (random.choice(replicas) if replicas else None), False
+    try:
+        yield
+    finally:
+        _state.replica, _state.wrote = previous
+
+
+@contextmanager
+def primary_reads():
+    """
+    Read from the primary database within the block. Used when filling
+    the shared caches, which must not keep data of a lagging replica
+    under the current cache version.
+    """
+    replica = getattr(_state, "replica", None)
+    _state.replica = None
+    try:
+        yield
+    finally:
+        _state.replica = replica
+
+
+def has_written():
+    """
+    Return whether the current thread has written to the database since
+    it started reading from a replica.
+    """
+    return getattr(_state, "wrote", False)
+
+
+class ReplicaRouter(object):
+    """
+    Routes the reads of the articles to the replica chosen for the
+    current request, see the module docstring.
+    """
+
+    def db_for_read(self, model, **hints):
+        instance = hints.get("instance")
+        if instance is not None and instance._state.db:
+            # Related objects are read from where the instance came from
+            return instance._state.db
+        if model._meta.app_label not in getattr(settings, "ARTICLES_REPLICA_APP_LABELS", ["cmsplugin_articles_ai"]):
+            return None
+        return get_replica()
+
+    def db_for_write(self, model, **hints):
+        # Reads after a write go to the primary database too
+        _state.wrote = True
+        instance = hints.get("instance")
+        if instance is not None and instance._state.db in get_replicas():
+            # Objects read from a replica are saved to the primary
+            return DEFAULT_DB_ALIAS
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS} | set(get_replicas())
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+
+class ReplicaRouterMiddleware(MiddlewareMixin):
+    """
+    Chooses whether the reads of a request go to a replica, and makes the
+    client stick to the primary database for a while after it has written.
+    """
+
+    def process_request(self, request):
+        replicas = get_replicas()
+        _state.replica, _state.wrote = None, False
+        if not replicas or request.method not in ("GET", "HEAD") or STICKY_COOKIE in request.COOKIES:
+            return
+        user = getattr(request, "user", None)
+        if user is not None and user.is_staff:
+            # Editors, the toolbar and the admin see the primary
+            return
+        _state.replica = random.choice(replicas)
+
+    def process_response(self, request, response):
+        if has_written():
+            response.set_cookie(STICKY_COOKIE, "1", max_age=getattr(settings, "ARTICLES_REPLICA_STICKY_SECONDS", 10))
+        _state.replica, _state.wrote = None, False
+        return response
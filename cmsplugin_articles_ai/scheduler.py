@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+Publication scheduler.
+
+Articles become public and expire by their `published_from` and
+`published_until` without anything being saved. The scheduler notices
+these moments: each run finds the published articles that crossed a
+publication boundary since the previous run, sends `article_became_public`
+and `article_expired` signals for them and invalidates the cached article
+data. Run it with `run_publication_scheduler --loop` and enable
+`ARTICLES_PUBLICATION_SCHEDULER` so that caches no longer expire at the
+boundaries by themselves.
+"""
+from datetime import timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+
+from .cache import bump_version, get_cache
+from .models import Article
+from .purging import ARTICLE_LISTS_KEY, batch_purges, purge
+from .signals import article_became_public, article_expired
+
+LAST_RUN_KEY = "cmsplugin_articles_ai:scheduler:last_run"
+
+# Shortest wait between runs, in seconds
+MIN_INTERVAL = 0.1
+
+
+def get_crossed_articles(since, until):
+    """
+    Return the published articles that became public and that expired
+    after `since`, at latest at `until`. Articles that both became public
+    and expired in between are in neither.
+    """
+    articles = Article.objects.filter(publisher_is_draft=False)
+    became_public = articles.filter(
+        Q(published_until__gte=until) | Q(published_until=None),
+        published_from__gt=since,
+        published_from__lte=until,
+    )
+    expired = articles.filter(
+        published_from__lte=since,
+        published_until__gte=since,
+        published_until__lt=until,
+    )
+    return list(became_public), list(expired)
+
+
+def run_scheduler(now=None):
+    """
+    Send the signals of the articles that crossed a publication boundary
+    since the previous run, and invalidate the cache if any article did.
+    The time of the run is kept in the articles' cache. If the previous run
+    isn't known, e.g. on the first run or after the time was evicted from
+    the cache, the crossed boundaries can't be found, so the cache and all
+    the article lists are invalidated instead.
+    :params now: Time of the run, defaults to the current time
+    :returns: Tuple of lists of the articles that became public and expired
+    """
+    now = now or timezone.now()
+    cache = get_cache()
+    since = cache.get(LAST_RUN_KEY)
+    if since is None:
+        bump_version()
+        purge([ARTICLE_LISTS_KEY])
+        cache.set(LAST_RUN_KEY, now, None)
+        return [], []
+
+    became_public, expired = get_crossed_articles(since, now)
+    # Draft articles crossing boundaries change the cached draft data
+    crossed = Article.objects.filter(
+        Q(published_from__gt=since, published_from__lte=now) |
+        Q(published_until__gte=since, published_until__lt=now)
+    ).exists()
+    if crossed:
+        bump_version()
+    with batch_purges():
+        for article in became_public:
+            article_became_public.send(sender=Article, instance=article)
+        for article in expired:
+            article_expired.send(sender=Article, instance=article)
+    cache.set(LAST_RUN_KEY, now, None)
+    return became_public, expired
+
+
+def get_wait_time(max_interval):
+    """
+    Return the seconds to wait until the next run: until the next
+    publication boundary has been crossed, but at most `max_interval`.
+    """
+    boundary = Article.objects.next_publication_boundary()
+    if boundary is None:
+        return max_interval
+    # Articles expire only after `published_until` has passed
+    seconds = (boundary + timedelta(microseconds=1) - timezone.now()).total_seconds()
+    return max(MIN_INTERVAL, min(max_interval, seconds))
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import Signal, receiver
+from publisher.signals import publisher_post_publish
+
+from .cache import bump_version
+from .models import Article, ArticleListPlugin, Category, Tag
+from .purging import (
+    ARTICLE_LISTS_KEY, get_article_key, get_article_purge_keys, get_category_key, get_tag_key, purge
+)
+from .thumbnails import generate_thumbnails, get_article_image_pks
+
+# Sent by the publication scheduler when a published article becomes public
+# or stops being public according to its publication dates
+article_became_public = Signal(providing_args=["instance"])
+article_expired = Signal(providing_args=["instance"])
+
+
+@receiver(post_save, sender=Article)
+@receiver(post_delete, sender=Article)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=ArticleListPlugin)
+@receiver(post_delete, sender=ArticleListPlugin)
+@receiver(m2m_changed, sender=Article.tags.through)
+@receiver(m2m_changed, sender=ArticleListPlugin.tags.through)
+@receiver(m2m_changed, sender=ArticleListPlugin.exclude_tags.through)
+@receiver(m2m_changed, sender=ArticleListPlugin.exclude_categories.through)
+def invalidate_cache(sender, **kwargs):
+    bump_version()
+
+
+@receiver(post_save, sender=get_user_model())
+def invalidate_cache_on_user_change(sender, update_fields=None, **kwargs):
+    # Authors are shown with the articles, but logins don't change them
+    if update_fields is None or set(update_fields) != {"last_login"}:
+        bump_version()
+
+
+@receiver(m2m_changed, sender=Article.tags.through)
+def update_tagged_articles(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            instance.update_tag_signature()
+            instance.update_search_document()
+        return
+
+    # Tags of articles were changed through the tag
+    if action == "pre_clear":
+        instance._cleared_article_pks = list(instance.articles.values_list("pk", flat=True))
+    elif action == "post_clear":
+        _update_tagged_articles(instance._cleared_article_pks)
+    elif action in ("post_add", "post_remove"):
+        _update_tagged_articles(pk_set)
+
+
+@receiver(pre_delete, sender=Tag)
+def remember_tagged_articles(sender, instance, **kwargs):
+    # Deleting a tag removes it from articles without m2m_changed signals
+    instance._deleted_article_pks = list(instance.articles.values_list("pk", flat=True))
+
+
+@receiver(post_delete, sender=Tag)
+def update_deleted_tag_articles(sender, instance, **kwargs):
+    _update_tagged_articles(instance._deleted_article_pks)
+
+
+def _update_tagged_articles(article_pks):
+    articles = Article.objects.filter(pk__in=article_pks)
+    articles.update_tag_signatures()
+    articles.update_search_documents()
+
+
+@receiver(pre_save, sender=Tag)
+def remember_tag_name(sender, instance, raw=False, **kwargs):
+    instance._saved_name = None
+    if not raw and instance.pk is not None:
+        instance._saved_name = Tag.objects.filter(pk=instance.pk).values_list("name", flat=True).first()
+
+
+@receiver(post_save, sender=Tag)
+def update_renamed_tag_articles(sender, instance, created, raw=False, **kwargs):
+    # The search documents contain the tag names
+    if not created and not raw and instance.name != instance.__dict__.pop("_saved_name", None):
+        instance.articles.all().update_search_documents()
+
+
+@receiver(post_save, sender=Article)
+def update_search_document(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    if update_fields is not None and not {"title", "lead_paragraph", "main_content"} & set(update_fields):
+        return
+    instance.update_search_document()
+
+
+@receiver(publisher_post_publish, sender=Article)
+def generate_published_thumbnails(sender, instance, **kwargs):
+    # Opt-in, as resizing the images makes publishing slow
+    if getattr(settings, "ARTICLES_GENERATE_THUMBNAILS_ON_PUBLISH", False):
+        generate_thumbnails(get_article_image_pks(Article.objects.filter(pk=instance.pk)))
+
+
+@receiver(pre_save, sender=Article)
+def remember_public_slug(sender, instance, raw=False, **kwargs):
+    # The page of the old slug is purged too when the slug changes
+    instance._saved_slug = None
+    if not raw and instance.pk is not None and not instance.publisher_is_draft:
+        instance._saved_slug = Article.objects.filter(pk=instance.pk).values_list("slug", flat=True).first()
+
+
+@receiver(post_save, sender=Article)
+@receiver(post_delete, sender=Article)
+@receiver(article_became_public, sender=Article)
+@receiver(article_expired, sender=Article)
+def purge_article(sender, instance, raw=False, **kwargs):
+    # Only published articles are on cached pages
+    if raw or instance.publisher_is_draft:
+        return
+    keys = get_article_purge_keys(instance)
+    saved_slug = instance.__dict__.pop("_saved_slug", None)
+    if saved_slug and saved_slug != instance.slug:
+        keys.append(get_article_key(saved_slug))
+    purge(keys)
+
+
+@receiver(m2m_changed, sender=Article.tags.through)
+def purge_tagged_articles(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == "pre_clear":
+        instance._purged_article_pks = list(
+            instance.articles.filter(publisher_is_draft=False).values_list("pk", flat=True),
+        )
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if not reverse:
+        if not instance.publisher_is_draft:
+            purge(get_article_purge_keys(instance))
+        return
+
+    article_pks = instance._purged_article_pks if action == "post_clear" else pk_set
+    keys = [get_tag_key(instance.pk), ARTICLE_LISTS_KEY]
+    for article in Article.objects.filter(pk__in=article_pks, publisher_is_draft=False).only("slug", "language"):
+        keys.extend(get_article_purge_keys(article))
+    purge(keys)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def purge_tag(sender, instance, created=False, raw=False, **kwargs):
+    # Tags are shown on the pages of their articles and beside article lists
+    if not created and not raw:
+        purge([get_tag_key(instance.pk), ARTICLE_LISTS_KEY])
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def purge_category(sender, instance, created=False, raw=False, **kwargs):
+    if not created and not raw:
+        purge([get_category_key(instance.pk), ARTICLE_LISTS_KEY])
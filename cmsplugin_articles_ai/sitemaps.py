@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.core.urlresolvers import reverse
+from django.db.models import Max
+from django.http import Http404
+from django.utils import timezone
+
+from .models import Article
+from .purging import get_list_keys
+from .views import ConditionalGetMixin, get_list_validators, StreamingView
+
+SITEMAP_NAMESPACE = "http://www.sitemaps.org/schemas/sitemap/0.9"
+
+# Amount of rows fetched from the database at a time
+CHUNK_SIZE = 1000
+
+
+def get_sitemap_size():
+    """
+    Return the maximum amount of articles in a sitemap. Sitemaps may
+    contain at most 50000 URLs.
+    """
+    return getattr(settings, "ARTICLES_SITEMAP_SIZE", 10000)
+
+
+def get_sitemap_articles():
+    """
+    Return the published articles listed in the sitemaps.
+    """
+    return Article.objects.public().filter(publisher_is_draft=False)
+
+
+def get_sitemap_end(articles, start):
+    """
+    Return the id of the first article after the sitemap starting from the
+    given id, or None if it is the last sitemap.
+    :params articles: Articles listed in the sitemaps
+    :params start: Id of the first article of the sitemap
+    """
+    pks = articles.filter(pk__gte=start).order_by("pk").values_list("pk", flat=True)
+    size = get_sitemap_size()
+    return next(iter(pks[size:size + 1]), None)
+
+
+def is_sitemap_start(articles, start):
+    """
+    Return whether a sitemap of the index starts from the given id.
+    :params articles: Articles listed in the sitemaps
+    :params start: Article id
+    """
+    if not articles.filter(pk=start).exists():
+        return False
+    return articles.filter(pk__lt=start).count() % get_sitemap_size() == 0
+
+
+def _format_lastmod(value):
+    if not value:
+        return ""
+    if timezone.is_naive(value):
+        # W3C datetimes need the time zone
+        value = timezone.make_aware(value)
+    return "<lastmod>%s</lastmod>" % value.replace(microsecond=0).isoformat()
+
+
+class ArticleSitemapIndexView(ConditionalGetMixin, StreamingView):
+    """
+    Sitemap index of the public articles. The articles are split into
+    sitemaps in the order of their ids, each sitemap containing
+    `ARTICLES_SITEMAP_SIZE` articles and named by the id of its first
+    article.
+    """
+    content_type = "application/xml; charset=utf-8"
+
+    def get_validators(self):
+        return get_list_validators(get_sitemap_articles())
+
+    def get_surrogate_keys(self):
+        return get_list_keys()
+
+    def stream(self):
+        articles = get_sitemap_articles()
+        start = articles.order_by("pk").values_list("pk", flat=True).first()
+
+        yield '<?xml version="1.0" encoding="utf-8"?>\n<sitemapindex xmlns="%s">' % SITEMAP_NAMESPACE
+        while start is not None:
+            # The sitemaps are found by skipping over the ids with the index
+            end = get_sitemap_end(articles, start)
+            sitemap_articles = articles.filter(pk__gte=start)
+            if end is not None:
+                sitemap_articles = sitemap_articles.filter(pk__lt=end)
+            lastmod = sitemap_articles.order_by().aggregate(lastmod=Max("modified_at"))["lastmod"]
+            location = self.request.build_absolute_uri(reverse("article_sitemap", kwargs={"sitemap": start}))
+            yield "<sitemap><loc>%s</loc>%s</sitemap>" % (escape(location), _format_lastmod(lastmod))
+            start = end
+        yield "</sitemapindex>\n"
+
+
+class ArticleSitemapView(ConditionalGetMixin, StreamingView):
+    """
+    Sitemap of the public articles in one part of the sitemap index.
+    The articles are fetched in chunks of their URL slug and modification
+    time only, so the memory use doesn't depend on the sitemap size.
+    """
+    content_type = "application/xml; charset=utf-8"
+
+    def get(self, request, *args, **kwargs):
+        self.start = int(self.kwargs["sitemap"])
+        articles = get_sitemap_articles()
+        # Other ids would give sitemaps overlapping the ones of the index
+        if not is_sitemap_start(articles, self.start):
+            raise Http404
+        self.end = get_sitemap_end(articles, self.start)
+        return super(ArticleSitemapView, self).get(request, *args, **kwargs)
+
+    def get_queryset(self):
+        articles = get_sitemap_articles().filter(pk__gte=self.start)
+        if self.end is not None:
+            articles = articles.filter(pk__lt=self.end)
+        return articles
+
+    def get_validators(self):
+        return get_list_validators(self.get_queryset())
+
+    def get_surrogate_keys(self):
+        return get_list_keys()
+
+    def iter_articles(self):
+        """
+        Generate the URL slugs and modification times of the articles,
+        fetching them in chunks ordered by id.
+        """
+        articles = self.get_queryset().order_by("pk").values_list("pk", "slug", "modified_at")
+        last_pk = None
+        while True:
+            chunk = articles if last_pk is None else articles.filter(pk__gt=last_pk)
+            chunk = list(chunk[:CHUNK_SIZE])
+            for pk, slug, modified_at in chunk:
+                yield slug, modified_at
+            if len(chunk) < CHUNK_SIZE:
+                return
+            last_pk = chunk[-1][0]
+
+    def stream(self):
+        yield '<?xml version="1.0" encoding="utf-8"?>\n<urlset xmlns="%s">' % SITEMAP_NAMESPACE
+        for slug, modified_at in self.iter_articles():
+            location = self.request.build_absolute_uri(reverse("article", kwargs={"slug": slug}))
+            yield "<url><loc>%s</loc>%s</url>" % (escape(location), _format_lastmod(modified_at))
+        yield "</urlset>\n"
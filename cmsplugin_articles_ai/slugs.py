@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+
+from .cache import get_cache, make_key
+from .instrumentation import record_cache_lookup
+from .models import Category, Tag
+from .routers import primary_reads
+
+# Cached in place of the id of a slug that doesn't exist
+MISSING = 0
+
+
+class LRUCache(object):
+    """
+    Thread safe in-process cache that holds at most `max_size` items,
+    dropping the least recently used ones.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self.lock:
+            try:
+                value = self.items.pop(key)
+            except KeyError:
+                return default
+            self.items[key] = value
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.items.pop(key, None)
+            self.items[key] = value
+            while len(self.items) > self.max_size:
+                self.items.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+
+
+local_cache = LRUCache(getattr(settings, "ARTICLES_SLUG_CACHE_SIZE", 1000))
+
+
+def resolve_slug(model, slug):
+    """
+    Return the id of the object with the given slug, or None if there is
+    no such object. Ids are cached in process and in the shared cache.
+    Both use the versioned keys, so saving or deleting objects
+    invalidates them.
+    :params model: Model with a unique slug field, e.g. Tag or Category
+    :params slug: URL slug
+    """
+    key = make_key("slug", model._meta.app_label, model._meta.model_name, slug)
+    pk = _get_cached(key, lambda: model.objects.filter(slug=slug).values_list("pk", flat=True).first())
+    return pk or None
+
+
+def _get_cached(key, fetch):
+    """
+    Return the value of the key from the in-process or the shared cache,
+    fetching and caching it if it isn't cached.
+    :params key: Versioned cache key
+    :params fetch: Function returning the value, or None if there is none
+    """
+    value = local_cache.get(key)
+    if value is not None:
+        record_cache_lookup(True)
+        return value
+    cache = get_cache()
+    value = cache.get(key)
+    record_cache_lookup(value is not None)
+    if value is None:
+        with primary_reads():
+            value = fetch()
+        if value is None:
+            value = MISSING
+        cache.set(key, value, getattr(settings, "ARTICLES_SLUG_CACHE_TIMEOUT", 24 * 3600))
+    local_cache.set(key, value)
+    return value
+
+
+def get_tag_pk(slug):
+    return resolve_slug(Tag, slug)
+
+
+def get_category_pk(slug):
+    return resolve_slug(Category, slug)
+
+
+def get_category(slug):
+    """
+    Return the category with the given slug, or None if there is no such
+    category. The category is cached like the ids of the slugs, so views
+    showing it don't need to query it.
+    """
+    key = make_key("category", slug)
+    return _get_cached(key, lambda: Category.objects.filter(slug=slug).first()) or None
+
+
+def get_tag(slug):
+    """
+    Return the tag with the given slug, or None if there is no such tag.
+    Cached like `get_category`.
+    """
+    key = make_key("tag", slug)
+    return _get_cached(key, lambda: Tag.objects.filter(slug=slug).first()) or None
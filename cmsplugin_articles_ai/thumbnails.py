@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+import logging
+
+from django.conf import settings
+from easy_thumbnails.files import get_thumbnailer
+from filer.models import Image
+
+from .models import ArticleAttachment
+
+logger = logging.getLogger(__name__)
+
+# Thumbnails used by the default templates
+DEFAULT_THUMBNAIL_OPTIONS = [
+    {"size": (64, 64), "crop": True},
+    {"size": (300, 150), "crop": True},
+]
+
+
+def get_thumbnail_options():
+    """
+    Return the thumbnail options of the thumbnails generated for article
+    images. These can be changed with `ARTICLES_THUMBNAIL_OPTIONS` setting
+    to match the thumbnails used in the templates.
+    """
+    return getattr(settings, "ARTICLES_THUMBNAIL_OPTIONS", DEFAULT_THUMBNAIL_OPTIONS)
+
+
+def get_article_image_pks(articles):
+    """
+    Return ids of the main images and image attachments of the articles.
+    :params articles: Article queryset
+    """
+    image_pks = set(articles.exclude(main_image=None).values_list("main_image_id", flat=True))
+    image_pks.update(
+        ArticleAttachment.objects.images().filter(
+            article__in=articles,
+        ).exclude(attachment_file=None).values_list("attachment_file_id", flat=True)
+    )
+    return sorted(image_pks)
+
+
+def generate_thumbnails(image_pks):
+    """
+    Generate the missing thumbnails of the given filer images. Thumbnails
+    that can't be generated, e.g. of images that can't be read, are
+    skipped. Returns the amount of thumbnails generated.
+    :params image_pks: Iterable of image ids
+    """
+    options = get_thumbnail_options()
+    generated = 0
+    for image in Image.objects.filter(pk__in=list(image_pks)):
+        thumbnailer = get_thumbnailer(image)
+        for thumbnail_options in options:
+            try:
+                if thumbnailer.get_existing_thumbnail(thumbnail_options):
+                    continue
+                if thumbnailer.get_thumbnail(thumbnail_options, generate=True):
+                    generated += 1
+            except Exception:
+                logger.warning(
+                    "Could not generate thumbnail %s for image %s", thumbnail_options, image.pk, exc_info=True,
+                )
+                continue
+    return generated
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import re
+
+from django.utils.encoding import force_bytes
+from django.utils.html import strip_tags
+from django.utils.text import Truncator
+
+try:
+    from html import unescape
+except ImportError:  # Python 2
+    from HTMLParser import HTMLParser
+    unescape = HTMLParser().unescape
+
+EXCERPT_LENGTH = 300
+
+# Tags that separate words even if there is no whitespace around them
+_BLOCK_TAG_RE = re.compile(r"<(/?(p|div|li|ul|ol|h[1-6]|blockquote|table|tr|td|th)\b[^>]*|br\s*/?)>", re.IGNORECASE)
+
+
+def get_tag_signature(tag_pks):
+    """
+    Return a canonical signature of the given set of tag ids. Articles
+    have equal signatures only if they have exactly the same tags.
+    Articles without tags have an empty signature.
+    """
+    tag_pks = sorted(set(int(pk) for pk in tag_pks))
+    if not tag_pks:
+        return ""
+    return hashlib.sha1(force_bytes(",".join(str(pk) for pk in tag_pks))).hexdigest()
+
+
+def html_to_text(html):
+    """
+    Return the given HTML as plain text with normalized whitespace.
+    """
+    text = unescape(strip_tags(_BLOCK_TAG_RE.sub(r" \g<0> ", html or "")))
+    return " ".join(text.split())
+
+
+def make_excerpt(html, length=EXCERPT_LENGTH):
+    """
+    Return the beginning of the given HTML as plain text, truncated to
+    at most `length` characters.
+    """
+    return Truncator(html_to_text(html)).chars(length)
+
+
+def make_search_text(title, lead_paragraph, main_content, tag_names):
+    """
+    Return the plain text indexed for searching an article.
+    """
+    parts = [title, html_to_text(lead_paragraph), html_to_text(main_content)]
+    return " ".join(part for part in parts + sorted(tag_names) if part)
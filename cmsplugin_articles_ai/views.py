@@ -1,13 +1,125 @@
 # -*- coding: utf-8 -*-
+import hashlib
 
 from django.conf import settings
+from django.core.paginator import InvalidPage
+from django.db.models import Count, Max
+from django.http import Http404, StreamingHttpResponse
+from django.utils.cache import patch_cache_control
+from django.utils.encoding import force_bytes
+from django.utils.http import urlencode
 from django.utils.translation import ugettext_lazy as _
+from django.views.decorators.http import condition
+from django.views.generic import View
+from publisher.middleware import get_draft_status
 from publisher.views import PublisherDetailView, PublisherListView
 
-from .models import Article, Category, Tag, TagFilterMode
+from .cache import get_version, get_version_changed_at
+from .counts import get_category_counts, get_tag_counts
+from .instrumentation import InstrumentedViewMixin
+from .models import Article, ArticleAttachment, TagFilterMode
+from .pagination import CursorPaginator
+from .purging import get_article_key, get_category_key, get_list_keys, get_tag_key, patch_surrogate_keys
+from .results import ArticlePkList, get_tag_filter_result
+from .slugs import get_category, get_tag_pk
 
 
-class ArticleView(PublisherDetailView):
+def make_etag(*parts):
+    """
+    Return an ETag for the given parts of a response, e.g. ids and
+    modification times.
+    """
+    return hashlib.sha1(force_bytes(repr(parts))).hexdigest()
+
+
+def get_list_validators(articles, language=""):
+    """
+    Return the ETag and the last modification time of a list of articles.
+    :params articles: Queryset of the listed articles
+    :params language: Language code the list is filtered with
+    """
+    stats = articles.order_by().aggregate(count=Count("pk"), modified_at=Max("modified_at"))
+    return _get_list_validators(stats["count"], stats["modified_at"], language)
+
+
+def get_last_modified(*times):
+    """
+    Return the latest of the given times and the time the cache version
+    changed, or None if the latter isn't known. The version changes with
+    everything shown on the pages, e.g. tags, categories and authors.
+    """
+    version_changed_at = get_version_changed_at()
+    if version_changed_at is None:
+        return None
+    return max([version_changed_at] + [value for value in times if value])
+
+
+def _get_list_validators(count, modified_at, language):
+    # Lists change also when articles are published or expire
+    boundary = Article.objects.filter(
+        publisher_is_draft=False,
+    ).in_language(language).last_publication_boundary()
+    # The cache version changes with tags and categories shown on the page
+    etag = make_etag(count, modified_at, boundary, get_version())
+    return etag, get_last_modified(modified_at, boundary)
+
+
+class ConditionalGetMixin(object):
+    """
+    Answers conditional GET requests with 304 Not Modified, without
+    rendering the page, when the client already has the current version,
+    and names the content of the page in a surrogate key header.
+    Pages are not cached in draft mode.
+    """
+
+    def get(self, request, *args, **kwargs):
+        view = super(ConditionalGetMixin, self).get
+        if get_draft_status():
+            return view(request, *args, **kwargs)
+
+        etag, last_modified = self.get_validators()
+        response = condition(
+            etag_func=lambda request, *args, **kwargs: etag,
+            last_modified_func=lambda request, *args, **kwargs: last_modified,
+        )(view)(request, *args, **kwargs)
+        if not response.has_header("Cache-Control"):
+            # Pages also change when articles are published or expire, so
+            # caches must revalidate instead of guessing their freshness.
+            patch_cache_control(response, no_cache=True)
+        patch_surrogate_keys(response, self.get_surrogate_keys())
+        return response
+
+    def get_validators(self):
+        """
+        Return the ETag and the last modification time of the page.
+        """
+        raise NotImplementedError
+
+    def get_surrogate_keys(self):
+        """
+        Return the surrogate keys of the content shown on the page.
+        """
+        return []
+
+
+class StreamingView(View):
+    """
+    Base view for responses that are generated and sent piece by piece,
+    so that their size doesn't affect the memory use.
+    """
+    content_type = None
+
+    def get(self, request, *args, **kwargs):
+        return StreamingHttpResponse(self.stream(), content_type=self.content_type)
+
+    def stream(self):
+        """
+        Return an iterable of the pieces of the response content.
+        """
+        raise NotImplementedError
+
+
+class ArticleView(InstrumentedViewMixin, ConditionalGetMixin, PublisherDetailView):
     """
     View for displaying single article.
     """
@@ -16,58 +128,130 @@ class ArticleView(PublisherDetailView):
 
     def get_queryset(self):
         articles = super(ArticleView, self).get_queryset()
-        return articles.public()
+        return articles.public().select_related("author", "main_image").prefetch_related("tags", "attachments")
+
+    def get_object(self, queryset=None):
+        # The article is already fetched for the validators
+        if getattr(self, "object", None) is None:
+            self.object = super(ArticleView, self).get_object(queryset)
+            ArticleAttachment.load_real_files(self.object.attachments.all())
+        return self.object
+
+    def get_validators(self):
+        article = self.get_object()
+        tags = [(tag.pk, tag.name) for tag in article.tags.all()]
+        attachments = [
+            (
+                attachment.pk, attachment.name, attachment.is_image, attachment.attachment_file_id,
+                attachment.attachment_file.modified_at if attachment.attachment_file_id else None,
+            )
+            for attachment in article.attachments.all()
+        ]
+        modified_at = [article.modified_at, article.published_from]
+        modified_at.extend(attachment[-1] for attachment in attachments if attachment[-1])
+        if article.main_image:
+            modified_at.append(article.main_image.modified_at)
+        # The cache version changes with the category, like Last-Modified
+        etag = make_etag(
+            article.pk, max(modified_at), article.author.get_full_name(), article.main_image_id, tags, attachments,
+            get_version(),
+        )
+        return etag, get_last_modified(*modified_at)
+
+    def get_surrogate_keys(self):
+        article = self.get_object()
+        keys = [get_article_key(article.slug)]
+        keys.extend(get_tag_key(tag.pk) for tag in article.tags.all())
+        if article.category_id:
+            keys.append(get_category_key(article.category_id))
+        return keys
 
     def get_context_data(self, **kwargs):
         context = super(ArticleView, self).get_context_data(**kwargs)
         article = self.object
-        attachments = article.attachments.select_related("attachment_file")
         images = []
         non_images = []
 
-        for attachment in article.attachments.select_related('attachment_file').all():
+        # Tags and attachments with their files are prefetched
+        for attachment in article.attachments.all():
             (images if attachment.is_image else non_images).append(attachment)
 
         context.update({
             "attachments": non_images,
             "image_attachments": images,
-            "tags": article.tags.select_related(),
+            "tags": article.tags.all(),
         })
         return context
 
 
-class ArticleListView(PublisherListView):
+class ArticleListView(InstrumentedViewMixin, ConditionalGetMixin, PublisherListView):
     """
     View for listing all public articles or a list of public articles
     per tag. By default the list is language agnostic, but you can pass
     optional language parameter to get a filtered list.
-    Lists are paginated according to settings value.
+    Lists are paginated according to settings value, either by page
+    numbers or by cursors if `ARTICLES_CURSOR_PAGINATION` is set.
     """
     model = Article
     context_object_name = "articles"
     paginate_by = getattr(settings, "ARTICLES_PER_PAGE", 10)
+    cursor_pagination = getattr(settings, "ARTICLES_CURSOR_PAGINATION", False)
+    # Get parameters filtering the list, kept by the pagination links
+    filter_params = ("lang",)
     tag_filter = ""
     template_name = "cmsplugin_articles_ai/app_index.html"
 
     def get(self, request, *args, **kwargs):
         self.tag_filter = self.kwargs.get("tag", "")
         self.lang_filter = request.GET.get("lang", "")
+        self.tag_pk = None
+        if self.tag_filter:
+            self.tag_pk = get_tag_pk(self.tag_filter)
+            if self.tag_pk is None:
+                raise Http404(_("No tag found matching the query"))
         return super(ArticleListView, self).get(request, *args, **kwargs)
 
     def get_queryset(self):
         articles = super(ArticleListView, self).get_queryset()
-        articles = articles.public(language=self.lang_filter)
-        if self.tag_filter:
-            return articles.filter(tags__slug=self.tag_filter)
+        articles = articles.public(language=self.lang_filter).for_listing()
+        if self.tag_pk:
+            return articles.with_any_of_tags([self.tag_pk])
         return articles
 
+    def paginate_queryset(self, queryset, page_size):
+        if not self.cursor_pagination:
+            return super(ArticleListView, self).paginate_queryset(queryset, page_size)
+
+        paginator = CursorPaginator(queryset, page_size)
+        try:
+            page = paginator.page(self.request.GET.get("cursor"))
+        except InvalidPage as e:
+            raise Http404(_("Invalid page (%(cursor)s): %(message)s") % {
+                "cursor": self.request.GET.get("cursor"),
+                "message": str(e),
+            })
+        return (paginator, page, page.object_list, page.has_other_pages())
+
+    def get_validators(self):
+        return get_list_validators(self.get_queryset(), self.lang_filter)
+
+    def get_surrogate_keys(self):
+        keys = get_list_keys(self.lang_filter)
+        if self.tag_pk:
+            keys.append(get_tag_key(self.tag_pk))
+        return keys
+
     def get_context_data(self, **kwargs):
         context = super(ArticleListView, self).get_context_data(**kwargs)
         context.update({
-            "all_tags": Tag.objects.all(),
-            "all_categories": Category.objects.all(),
+            "all_tags": get_tag_counts(self.lang_filter),
+            "all_categories": get_category_counts(self.lang_filter),
             "page_title": self.tag_filter or _("All articles"),
             "tag_filter": self.tag_filter,
+            "pagination_params": "".join(
+                "%s&" % urlencode({param: self.request.GET[param]})
+                for param in self.filter_params if self.request.GET.get(param)
+            ),
         })
         return context
 
@@ -79,13 +263,19 @@ class CategoryView(ArticleListView):
     """
 
     def get(self, request, *args, **kwargs):
-        category_slug = self.kwargs.get("category", "")
-        self.category = Category.objects.get(slug=category_slug)
+        self.category = get_category(self.kwargs.get("category", ""))
+        if self.category is None:
+            raise Http404(_("No category found matching the query"))
+        self.category_pk = self.category.pk
         return super(CategoryView, self).get(request, *args, **kwargs)
 
     def get_queryset(self):
         articles = super(CategoryView, self).get_queryset()
-        return articles.filter(category=self.category)
+        return articles.filter(category_id=self.category_pk)
+
+    def get_surrogate_keys(self):
+        keys = super(CategoryView, self).get_surrogate_keys()
+        return keys + [get_category_key(self.category_pk)]
 
     def get_context_data(self, **kwargs):
         context = super(CategoryView, self).get_context_data(**kwargs)
@@ -102,6 +292,7 @@ class TagFilteredArticleView(ArticleListView):
     with get parameters. This view is handy for creating cms plugins
     where the user can select the wanted filtering mode and relevant tags.
     """
+    filter_params = ("filter_tags", "filter_mode", "lang")
 
     def get(self, request, *args, **kwargs):
         self.filter_tags = request.GET.get("filter_tags", [])
@@ -114,6 +305,73 @@ class TagFilteredArticleView(ArticleListView):
         )
         return super(TagFilteredArticleView, self).get(request, *args, **kwargs)
 
-    def get_queryset(self):
+    def get_filtered_articles(self):
         articles = super(TagFilteredArticleView, self).get_queryset()
         return articles.tag_filter(self.filter_mode, self.filter_tags)
+
+    def get_queryset(self):
+        articles = self.get_filtered_articles()
+        result = self.get_cached_result(articles)
+        if result is None:
+            return articles
+        # Pages are fetched by the cached ids, without the tag filter
+        return ArticlePkList(result["pks"], Article.objects.for_listing())
+
+    def get_cached_result(self, articles):
+        """
+        Return the cached ids of the matching articles, or None if the
+        result isn't cached. Cursor pagination needs the queryset.
+        """
+        if self.cursor_pagination:
+            return None
+        if not hasattr(self, "_cached_result"):
+            self._cached_result = get_tag_filter_result(
+                articles, self.get_canonical_filters(), self.lang_filter, get_draft_status(),
+            )
+        return self._cached_result
+
+    def get_canonical_filters(self):
+        """
+        Return the filters of the listed articles in a form that is the
+        same for every URL listing the same articles.
+        """
+        return (self.tag_pk, sorted(set(self.filter_tags)), self.filter_mode.value)
+
+    def get_validators(self):
+        articles = self.get_filtered_articles()
+        result = self.get_cached_result(articles)
+        if result is None:
+            return get_list_validators(articles, self.lang_filter)
+        return _get_list_validators(len(result["pks"]), result["modified_at"], self.lang_filter)
+
+    def get_surrogate_keys(self):
+        keys = super(TagFilteredArticleView, self).get_surrogate_keys()
+        return keys + [get_tag_key(tag_pk) for tag_pk in self.filter_tags]
+
+
+class ArticleSearchView(ArticleListView):
+    """
+    View for searching public articles with `q` get parameter. The search
+    can be limited to a category with `category` get parameter and to
+    a language with `lang` get parameter.
+    """
+    filter_params = ("q", "category", "lang")
+
+    def get(self, request, *args, **kwargs):
+        self.query = request.GET.get("q", "").strip()
+        self.category_filter = request.GET.get("category", "")
+        return super(ArticleSearchView, self).get(request, *args, **kwargs)
+
+    def get_queryset(self):
+        articles = super(ArticleSearchView, self).get_queryset().search(self.query)
+        if self.category_filter:
+            return articles.filter(category__slug=self.category_filter)
+        return articles
+
+    def get_context_data(self, **kwargs):
+        context = super(ArticleSearchView, self).get_context_data(**kwargs)
+        context.update({
+            "page_title": _("Search results for \"%(query)s\"") % {"query": self.query},
+            "search_query": self.query,
+        })
+        return context
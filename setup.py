@@ -8,6 +8,7 @@ setup(
     author_email='info@anders.fi',
     packages=find_packages(
         exclude=[
+            "benchmarks",
             "tests",
         ],
     ),
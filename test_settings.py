@@ -17,7 +17,12 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': 'test_db',
-    }
+    },
+    # For testing routing reads to a replica
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': 'test_replica_db',
+    },
 }
 
 INSTALLED_APPS = [
@@ -60,4 +65,7 @@ TEMPLATES = [
 ROOT_URLCONF = 'urls'
 SITE_ID = 1
 STATIC_ROOT = os.path.join(VAR_ROOT, 'static')
+STATIC_URL = '/static/'
+MEDIA_ROOT = os.path.join(VAR_ROOT, 'media')
+MEDIA_URL = '/media/'
 WSGI_APPLICATION = 'test_wsgi.application'
@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+import pytest
+from easy_thumbnails.storage import thumbnail_default_storage
+from filer.models import File
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmpdir, monkeypatch):
+    """
+    Store the files created by the tests, e.g. images and their thumbnails,
+    in a temporary directory instead of the checkout. The storages of filer
+    and easy-thumbnails are created on import, so they are moved there too.
+    """
+    settings.MEDIA_ROOT = str(tmpdir.mkdir("media"))
+    field = File._meta.get_field("file")
+    storages = [field.storage, field.storages["public"], field.thumbnail_storages["public"], thumbnail_default_storage]
+    for storage in storages:
+        monkeypatch.setattr(storage, "base_location", settings.MEDIA_ROOT)
+        monkeypatch.setattr(storage, "location", settings.MEDIA_ROOT)
+    return settings.MEDIA_ROOT
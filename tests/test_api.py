@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+import json
+from datetime import timedelta
+
+import pytest
+
+from cmsplugin_articles_ai.api import API_FIELDS, ArticleDetailAPIView
+from cmsplugin_articles_ai.cache import VERSION_CHANGED_KEY, get_cache
+from cmsplugin_articles_ai.factories import CategoryFactory, PublicArticleFactory, TagFactory
+from cmsplugin_articles_ai.models import Article, TagFilterMode
+from django.core.urlresolvers import reverse
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+
+def get_json(client, url, **params):
+    response = client.get(url, params)
+    assert response.status_code == 200
+    assert response["Content-Type"] == "application/json"
+    return json.loads(b"".join(response.streaming_content).decode("utf-8"))
+
+
+def publish_article(**kwargs):
+    article = PublicArticleFactory(**kwargs)
+    article.publish()
+    return Article.objects.get(slug=article.slug, publisher_is_draft=False)
+
+
+@pytest.mark.urls("cmsplugin_articles_ai.article_urls")
+@pytest.mark.django_db
+def test_article_list_api(client):
+    tag = TagFactory()
+    articles = [publish_article(tags=[tag]) for _ in range(3)]
+    PublicArticleFactory()  # Draft
+    articles.sort(key=lambda article: (article.published_from, article.pk), reverse=True)
+
+    data = get_json(client, reverse("api_articles"), page_size=2)
+    assert [item["slug"] for item in data["results"]] == [article.slug for article in articles[:2]]
+    item = data["results"][0]
+    assert item["tags"] == [tag.slug]
+    assert item["url"] == "http://testserver%s" % articles[0].get_absolute_url()
+    assert item["author"] == articles[0].author.get_full_name()
+    assert "main_content" not in item
+    assert data["previous"] is None
+
+    data = get_json(client, data["next"])
+    assert [item["slug"] for item in data["results"]] == [articles[2].slug]
+    assert data["next"] is None
+    assert data["previous"]
+
+
+@pytest.mark.urls("cmsplugin_articles_ai.article_urls")
+@pytest.mark.django_db
+def test_article_list_api_fields(client):
+    publish_article()
+    with CaptureQueriesContext(connection) as queries:
+        data = get_json(client, reverse("api_articles"), fields="id,title,excerpt")
+    assert list(data["results"][0]) == ["id", "title", "excerpt"]
+    assert not any("main_content" in query["sql"] for query in queries)
+
+    data = get_json(client, reverse("api_articles"), fields="title,main_content")
+    assert data["results"][0]["main_content"]
+
+    response = client.get(reverse("api_articles"), {"fields": "title,password"})
+    assert response.status_code == 400
+    assert "password" in json.loads(response.content.decode("utf-8"))["error"]
+    assert client.get(reverse("api_articles"), {"cursor": "invalid"}).status_code == 404
+
+
+@pytest.mark.urls("cmsplugin_articles_ai.article_urls")
+@pytest.mark.django_db
+def test_article_list_api_filters(client):
+    tag1 = TagFactory()
+    tag2 = TagFactory()
+    category = CategoryFactory()
+    article1 = publish_article(tags=[tag1, tag2], category=category, language="fi")
+    article2 = publish_article(tags=[tag1], language="en")
+
+    def get_slugs(url, **params):
+        return {item["slug"] for item in get_json(client, url, **params)["results"]}
+
+    assert get_slugs(reverse("api_articles"), lang="fi") == {article1.slug}
+    assert get_slugs(reverse("api_tagged_articles", kwargs={"tag": tag2.slug})) == {article1.slug}
+    assert get_slugs(reverse("api_articles_in_category", kwargs={"category": category.slug})) == {article1.slug}
+    url = reverse("api_tag_filtered_articles")
+    tags = "%s,%s" % (tag1.pk, tag2.pk)
+    assert get_slugs(url, filter_tags=tags, filter_mode=TagFilterMode.ANY.value) == {article1.slug, article2.slug}
+    assert get_slugs(url, filter_tags=tags, filter_mode=TagFilterMode.ALL.value) == {article1.slug}
+    assert client.get(url, {"filter_mode": 100}).status_code == 400
+    assert client.get(reverse("api_tagged_articles", kwargs={"tag": "missing"})).status_code == 404
+
+
+@pytest.mark.urls("cmsplugin_articles_ai.article_urls")
+@pytest.mark.django_db
+def test_article_detail_api(client):
+    tag = TagFactory()
+    article = publish_article(tags=[tag])
+    url = reverse("api_article", kwargs={"slug": article.slug})
+    response = client.get(url)
+    assert response.status_code == 200
+    data = json.loads(b"".join(response.streaming_content).decode("utf-8"))
+    assert data["main_content"] == article.main_content
+    assert data["tags"] == [tag.slug]
+    assert client.get(url, HTTP_IF_NONE_MATCH=response["ETag"]).status_code == 304
+
+    assert list(get_json(client, url, fields="title")) == ["title"]
+    assert client.get(reverse("api_article", kwargs={"slug": "missing"})).status_code == 404
+
+
+@pytest.mark.urls("cmsplugin_articles_ai.article_urls")
+@pytest.mark.django_db
+def test_article_detail_api_last_modified(client):
+    tag = TagFactory()
+    article = publish_article(tags=[tag])
+    hour_ago = timezone.now() - timedelta(hours=1)
+    Article.objects.update(modified_at=hour_ago, published_from=hour_ago)
+    get_cache().set(VERSION_CHANGED_KEY, hour_ago, None)
+    url = reverse("api_article", kwargs={"slug": article.slug})
+
+    last_modified = client.get(url)["Last-Modified"]
+    assert client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code == 304
+    tag.slug = "renamed"
+    tag.save()
+    assert client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code == 200
+
+
+@pytest.mark.parametrize("fields", [list(API_FIELDS), ["title"]])
+def test_article_detail_api_columns(fields):
+    view = ArticleDetailAPIView()
+    view.fields = fields
+    columns = view.get_columns()
+    assert columns == sorted(set(columns))
+    assert {"modified_at", "slug"} <= set(columns)
@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+from datetime import timedelta
+
+from cmsplugin_articles_ai.cache import bump_version, get_cache, get_timeout, make_key
+from django.utils import timezone
+
+
+def test_bump_version_invalidates_keys():
+    cache = get_cache()
+    key = make_key("test", 1)
+    cache.set(key, "value")
+    assert make_key("test", 1) == key
+    bump_version()
+    assert make_key("test", 1) != key
+    assert cache.get(make_key("test", 1)) is None
+
+
+def test_bump_version_after_eviction():
+    cache = get_cache()
+    key = make_key("test")
+    cache.clear()
+    bump_version()
+    assert make_key("test") != key
+
+
+def test_get_timeout():
+    now = timezone.now()
+    assert get_timeout(None, 300) == 300
+    assert get_timeout(now + timedelta(days=1), 300) == 300
+    assert 0 < get_timeout(now + timedelta(seconds=60), 300) <= 60
+    assert get_timeout(now - timedelta(seconds=60), 300) == 1
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+import pytest
+from cmsplugin_articles_ai.factories import ArticleFactory, TagFactory
+from cmsplugin_articles_ai.models import Article, ArticleSearchDocument
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.utils.six import StringIO
+
+
+@pytest.mark.django_db
+def test_rebuild_tag_signatures():
+    """
+    Test the consistency check finds outdated tag signatures and
+    rebuilding fixes them.
+    """
+    tag = TagFactory()
+    article = ArticleFactory(tags=[tag])
+    call_command("rebuild_tag_signatures", check=True, stdout=StringIO())
+
+    Article.objects.filter(pk=article.pk).update(tag_count=0, tag_signature="")
+    with pytest.raises(CommandError):
+        call_command("rebuild_tag_signatures", check=True, stdout=StringIO())
+
+    call_command("rebuild_tag_signatures", stdout=StringIO())
+    call_command("rebuild_tag_signatures", check=True, stdout=StringIO())
+    assert Article.objects.with_exact_tags([tag]).get() == article
+
+
+@pytest.mark.django_db
+def test_publish_test_articles_bulk():
+    """
+    Test bulk mode creates linked draft and published versions with
+    valid tag signatures.
+    """
+    call_command(
+        "publish_test_articles", bulk=True, number_of_articles=25, batch_size=7,
+        languages="en,fi", draft_only_ratio=0.2, seed=1, stdout=StringIO(),
+    )
+    drafts = Article.objects.filter(publisher_is_draft=True)
+    published = Article.objects.filter(publisher_is_draft=False)
+    assert drafts.count() == 25
+    assert 0 < published.count() < 25
+    assert drafts.filter(publisher_linked__isnull=False).count() == published.count()
+    assert set(Article.objects.values_list("language", flat=True)) <= {"en", "fi"}
+    assert Article.tags.through.objects.exists()
+    assert not list(Article.objects.iter_tag_signatures(stale_only=True))
+    assert ArticleSearchDocument.objects.count() == Article.objects.count()
+    for draft in drafts.filter(publisher_linked__isnull=False).prefetch_related("tags"):
+        assert set(draft.tags.all()) == set(draft.publisher_linked.tags.all())
+
+
+@pytest.mark.django_db
+def test_rebuild_excerpts():
+    article = ArticleFactory(lead_paragraph="<p>Lead</p>")
+    Article.objects.filter(pk=article.pk).update(excerpt="")
+    call_command("rebuild_excerpts", stdout=StringIO())
+    assert Article.objects.get(pk=article.pk).excerpt == "Lead"
+
+
+@pytest.mark.django_db
+def test_rebuild_search_index():
+    article = ArticleFactory(title="Tulips")
+    ArticleSearchDocument.objects.all().delete()
+    assert not Article.objects.search("tulips").exists()
+    call_command("rebuild_search_index", stdout=StringIO())
+    assert list(Article.objects.search("tulips")) == [article]
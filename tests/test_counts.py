@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+from datetime import timedelta
+
+import pytest
+from cmsplugin_articles_ai.cache import get_cache
+from cmsplugin_articles_ai.counts import get_category_counts, get_tag_counts
+from cmsplugin_articles_ai.factories import CategoryFactory, PublicArticleFactory, TagFactory
+from cmsplugin_articles_ai.models import Article
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+
+def publish_article(**kwargs):
+    article = PublicArticleFactory(**kwargs)
+    article.publish()
+    return article
+
+
+def get_counts(objects):
+    return {obj.pk: obj.article_count for obj in objects}
+
+
+@pytest.mark.django_db
+def test_tag_and_category_counts():
+    tag1 = TagFactory()
+    tag2 = TagFactory()
+    TagFactory()
+    category = CategoryFactory()
+    CategoryFactory()
+    publish_article(tags=[tag1, tag2], category=category, language="fi")
+    publish_article(tags=[tag1], category=category, language="en")
+    publish_article(tags=[tag2], published_from=timezone.now() + timedelta(hours=1))
+    PublicArticleFactory(tags=[tag2])  # Draft
+
+    assert get_counts(get_tag_counts()) == {tag1.pk: 2, tag2.pk: 1}
+    assert get_counts(get_tag_counts("en")) == {tag1.pk: 1}
+    assert get_counts(get_category_counts()) == {category.pk: 2}
+    assert get_counts(get_category_counts("fi")) == {category.pk: 1}
+
+
+@pytest.mark.django_db
+def test_counts_are_cached(settings):
+    get_cache().clear()
+    tag = TagFactory()
+    article = publish_article(tags=[tag])
+    assert get_counts(get_tag_counts()) == {tag.pk: 1}
+    with CaptureQueriesContext(connection) as queries:
+        assert get_counts(get_tag_counts()) == {tag.pk: 1}
+    assert len(queries) == 0
+
+    # Changing articles invalidates the counts
+    publish_article(tags=[tag])
+    assert get_counts(get_tag_counts()) == {tag.pk: 2}
+    tag.delete()
+    assert get_tag_counts() == []
+
+    settings.ARTICLES_COUNTS_CACHE_TIMEOUT = 0
+    Article.objects.filter(slug=article.slug).update(published_from=timezone.now() + timedelta(hours=1))
+    assert get_counts(get_category_counts()) == {}
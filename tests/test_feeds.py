@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+from xml.etree import ElementTree
+
+import pytest
+
+from cmsplugin_articles_ai.factories import CategoryFactory, PublicArticleFactory, TagFactory
+from cmsplugin_articles_ai.models import Article
+from django.core.urlresolvers import reverse
+
+ATOM = "{http://www.w3.org/2005/Atom}"
+SITEMAP = "{http://www.sitemaps.org/schemas/sitemap/0.9}"
+
+
+def get_xml(client, url, **extra):
+    response = client.get(url, **extra)
+    assert response.status_code == 200
+    assert response.streaming
+    return ElementTree.fromstring(b"".join(response.streaming_content))
+
+
+def publish_article(**kwargs):
+    article = PublicArticleFactory(**kwargs)
+    article.publish()
+    return Article.objects.get(slug=article.slug, publisher_is_draft=False)
+
+
+@pytest.mark.urls("cmsplugin_articles_ai.article_urls")
+@pytest.mark.django_db
+def test_rss_feed(client, settings):
+    settings.ARTICLES_FEED_SIZE = 2
+    category = CategoryFactory()
+    tag = TagFactory()
+    article = publish_article(category=category, tags=[tag], language="fi", main_content="<p>Tulips & roses</p>")
+    publish_article()
+    publish_article()
+    PublicArticleFactory()  # Draft
+
+    rss = get_xml(client, reverse("article_feed", kwargs={"feed_type": "rss"}))
+    assert len(rss.findall("channel/item")) == 2
+
+    rss = get_xml(client, reverse("category_feed", kwargs={"category": category.slug, "feed_type": "rss"}))
+    assert rss.find("channel/title").text == category.title
+    items = rss.findall("channel/item")
+    assert len(items) == 1
+    assert items[0].find("title").text == article.title
+    assert items[0].find("description").text == "Tulips & roses"
+    assert items[0].find("link").text == "http://testserver%s" % article.get_absolute_url()
+
+    rss = get_xml(client, reverse("tag_feed", kwargs={"tag": tag.slug, "feed_type": "rss"}))
+    assert [item.find("title").text for item in rss.findall("channel/item")] == [article.title]
+
+    rss = get_xml(client, reverse("article_feed", kwargs={"feed_type": "rss"}) + "?lang=fi")
+    assert rss.find("channel/language").text == "fi"
+    assert article.title in [item.find("title").text for item in rss.findall("channel/item")]
+
+    url = reverse("tag_feed", kwargs={"tag": "missing", "feed_type": "rss"})
+    assert client.get(url).status_code == 404
+
+
+@pytest.mark.urls("cmsplugin_articles_ai.article_urls")
+@pytest.mark.django_db
+def test_atom_feed_conditional_get(client):
+    article = publish_article()
+    url = reverse("article_feed", kwargs={"feed_type": "atom"})
+    response = client.get(url)
+    etag = response["ETag"]
+    feed = ElementTree.fromstring(b"".join(response.streaming_content))
+    entries = feed.findall("%sentry" % ATOM)
+    assert [entry.find("%stitle" % ATOM).text for entry in entries] == [article.title]
+
+    assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+    publish_article()
+    assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+
+@pytest.mark.urls("cmsplugin_articles_ai.article_urls")
+@pytest.mark.django_db
+def test_sitemap(client, settings, monkeypatch):
+    settings.ARTICLES_SITEMAP_SIZE = 3
+    monkeypatch.setattr("cmsplugin_articles_ai.sitemaps.CHUNK_SIZE", 2)
+    articles = [publish_article() for _ in range(8)]
+    PublicArticleFactory()  # Draft
+    # Gaps in the ids don't leave sitemaps short or empty
+    Article.objects.filter(slug=articles.pop(2).slug).delete()
+
+    index = get_xml(client, reverse("article_sitemap_index"))
+    locations = [sitemap.find("%sloc" % SITEMAP).text for sitemap in index]
+    assert all(sitemap.find("%slastmod" % SITEMAP) is not None for sitemap in index)
+
+    urls = []
+    sizes = []
+    for location in locations:
+        sitemap = get_xml(client, location.replace("http://testserver", ""))
+        sizes.append(len(sitemap))
+        urls.extend(url.find("%sloc" % SITEMAP).text for url in sitemap)
+    assert sizes == [3, 3, 1]
+    assert sorted(urls) == sorted("http://testserver%s" % article.get_absolute_url() for article in articles)
+
+    url = reverse("article_sitemap", kwargs={"sitemap": 1000})
+    assert client.get(url).status_code == 404
+    # Only the ids starting the sitemaps of the index are sitemaps
+    url = reverse("article_sitemap", kwargs={"sitemap": articles[1].pk})
+    assert client.get(url).status_code == 404
+    url = reverse("article_sitemap_index")
+    etag = client.get(url)["ETag"]
+    assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
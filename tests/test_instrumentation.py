@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+import json
+import logging
+from collections import deque
+
+import pytest
+from cms.api import add_plugin
+from cms.models import Placeholder
+from cmsplugin_articles_ai.cms_plugins import ArticleList, TagList
+from cmsplugin_articles_ai.factories import PublicArticleFactory, TagFactory
+from cmsplugin_articles_ai.instrumentation import (
+    Component, InstrumentationStatsView, Stats, get_components, stats
+)
+from cmsplugin_articles_ai.models import Tag
+from cmsplugin_articles_ai.views import ArticleListView
+from django.contrib.auth.models import AnonymousUser
+from django.core.exceptions import PermissionDenied
+from django.core.urlresolvers import resolve, reverse
+from django.db import connection
+from tests.test_plugins import init_content_renderer
+from tests.test_views import publish_articles_with_publisher
+
+
+@pytest.fixture
+def instrumentation(settings):
+    settings.ARTICLES_INSTRUMENTATION = True
+    settings.MIDDLEWARE_CLASSES = settings.MIDDLEWARE_CLASSES + [
+        "cmsplugin_articles_ai.middleware.InstrumentationMiddleware",
+    ]
+    stats.clear()
+
+
+@pytest.mark.urls("cmsplugin_articles_ai.article_urls")
+@pytest.mark.django_db
+def test_view_instrumentation(client, instrumentation, caplog):
+    publish_articles_with_publisher([PublicArticleFactory()])
+    with caplog.at_level(logging.INFO, logger="cmsplugin_articles_ai.instrumentation"):
+        response = client.get(reverse("articles"))
+    assert response.status_code == 200
+    metrics = [metric.split(";")[0] for metric in response["Server-Timing"].split(", ")]
+    assert 'desc="queries=' in response["Server-Timing"]
+    assert metrics == ["ArticleListView", "ArticleListView-db", "ArticleListView-template"]
+
+    record = json.loads(caplog.records[-1].getMessage())
+    assert record["path"] == reverse("articles")
+    assert record["status"] == 200
+    component = record["components"][0]
+    assert component["name"] == "ArticleListView"
+    assert component["query_count"] > 0
+    assert component["cache_misses"] > 0
+
+    client.get(reverse("articles"))
+    summary = stats.summary()["ArticleListView"]
+    assert summary["count"] == 2
+    assert summary["cache_hits"] > 0
+    assert set(summary["duration"]) == {"p50", "p95", "p99"}
+
+
+@pytest.mark.urls("cmsplugin_articles_ai.article_urls")
+@pytest.mark.django_db
+def test_view_instrumentation_keeps_template_response(rf, instrumentation):
+    """
+    Test the template of a view is measured when it is rendered, so that
+    middleware can still change the template response.
+    """
+    request = rf.get(reverse("articles"))
+    request.user = AnonymousUser()
+    response = ArticleListView.as_view()(request)
+    assert not response.is_rendered
+    component = get_components(request)[0]
+    assert component.template_time == 0
+    response.render()
+    assert 0 < component.template_time <= component.duration
+
+
+@pytest.mark.django_db
+def test_component_counts_queries_with_full_log(monkeypatch):
+    TagFactory()
+    monkeypatch.setattr(connection, "queries_log", deque([{"sql": "", "time": "0"}] * 3, maxlen=3))
+    component = Component("View")
+    with component.measure():
+        list(Tag.objects.all())
+        list(Tag.objects.all())
+    assert component.query_count == 2
+
+
+@pytest.mark.django_db
+def test_component_counts_queries_of_every_database():
+    component = Component("View")
+    with component.measure():
+        list(Tag.objects.all())
+        list(Tag.objects.using("replica").all())
+    assert component.query_count == 2
+
+
+@pytest.mark.urls("cmsplugin_articles_ai.article_urls")
+@pytest.mark.django_db
+def test_plugin_instrumentation(rf, settings):
+    placeholder = Placeholder.objects.create(slot="test")
+    plugins = [add_plugin(placeholder, ArticleList, "en"), add_plugin(placeholder, TagList, "en")]
+    PublicArticleFactory()
+
+    def render():
+        request = rf.get("/")
+        renderer = init_content_renderer(request)
+        for plugin in plugins:
+            renderer.render_plugin(instance=plugin, context={"request": request}, placeholder=placeholder)
+        return request
+
+    settings.ARTICLES_INSTRUMENTATION = False
+    assert not get_components(render())
+
+    settings.ARTICLES_INSTRUMENTATION = True
+    request = render()
+    components = get_components(request)
+    assert [component.name for component in components] == ["ArticleList", "TagList"]
+    for component in components:
+        assert 0 < component.template_time <= component.duration
+    assert components[0].query_count > 0
+    # The tag counts were cached by the first render
+    assert components[1].query_count == 0
+    assert components[1].cache_hits == 1
+
+
+@pytest.mark.urls("cmsplugin_articles_ai.article_urls")
+def test_instrumentation_stats_url_leaves_article_slugs():
+    assert resolve(reverse("article_instrumentation_stats")).func.view_class is InstrumentationStatsView
+    assert resolve(reverse("article", kwargs={"slug": "_stats"})).url_name == "article"
+
+
+@pytest.mark.django_db
+def test_instrumentation_stats_view(rf, admin_user):
+    request = rf.get("/")
+    request.user = AnonymousUser()
+    with pytest.raises(PermissionDenied):
+        InstrumentationStatsView.as_view()(request)
+    request.user = admin_user
+    response = InstrumentationStatsView.as_view()(request)
+    assert response.status_code == 200
+    assert "components" in json.loads(response.content.decode("utf-8"))
+
+
+def test_stats_percentiles():
+    component_stats = Stats(max_samples=100)
+    for duration in range(1, 201):
+        component = Component("View")
+        component.duration = duration / 1000.0
+        component_stats.add(component)
+    summary = component_stats.summary()["View"]
+    assert summary["count"] == 100
+    assert summary["duration"] == {"p50": 150, "p95": 195, "p99": 199}
@@ -1,5 +1,10 @@
 # -*- coding: utf-8 -*-
-from cmsplugin_articles_ai.factories import TagFactory
+import pytest
+from cmsplugin_articles_ai.factories import ArticleFactory, FileFactory, ImageFactory, TagFactory
+from cmsplugin_articles_ai.models import Article, ArticleAttachment
+from cmsplugin_articles_ai.utils import get_tag_signature
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 
 def test_tag_factory_slug():
@@ -10,3 +15,125 @@ def test_tag_factory_slug():
     """
     tag = TagFactory.build(name="United States")
     assert tag.slug == "united-states"
+
+
+def assert_tag_signature(article, tags):
+    article = Article.objects.get(pk=article.pk)
+    assert article.tag_count == len(tags)
+    assert article.tag_signature == get_tag_signature(tag.pk for tag in tags)
+
+
+@pytest.mark.django_db
+def test_article_tag_signature():
+    """
+    Test article's tag signature is kept up to date when its tags are
+    changed either through the article or through the tag.
+    """
+    tag1 = TagFactory()
+    tag2 = TagFactory()
+    article = ArticleFactory(tags=[tag1])
+    assert_tag_signature(article, [tag1])
+
+    article.tags.add(tag2)
+    assert_tag_signature(article, [tag1, tag2])
+    article.tags.remove(tag1)
+    assert_tag_signature(article, [tag2])
+    article.tags.clear()
+    assert_tag_signature(article, [])
+
+    tag1.articles.add(article)
+    assert_tag_signature(article, [tag1])
+    tag1.articles.clear()
+    assert_tag_signature(article, [])
+
+    article.tags.add(tag1, tag2)
+    tag2.delete()
+    assert_tag_signature(article, [tag1])
+
+
+@pytest.mark.django_db
+def test_published_article_tag_signature():
+    tag = TagFactory()
+    article = ArticleFactory(tags=[tag])
+    article.publish()
+    assert_tag_signature(Article.publisher_manager.published().get(), [tag])
+
+
+@pytest.mark.django_db
+def test_saving_stale_article_keeps_tag_signature():
+    """
+    Test saving all fields of an article loaded before its tags changed,
+    e.g. in an admin form or when publishing, doesn't restore the old tag
+    count and signature.
+    """
+    tag = TagFactory()
+    article = ArticleFactory()
+    stale_article = Article.objects.get(pk=article.pk)
+    tag.articles.add(article)
+    stale_article.title = "Changed"
+    stale_article.save()
+    assert_tag_signature(article, [tag])
+
+    stale_article.publish()
+    assert_tag_signature(article, [tag])
+    assert_tag_signature(Article.publisher_manager.published().get(), [tag])
+
+
+@pytest.mark.django_db
+def test_clone_relations():
+    """
+    Test publishing copies the tags and attachments of an article with
+    the same amount of queries regardless of their amount.
+    """
+    def clone_relations(tag_count, attachment_count):
+        article = ArticleFactory(tags=[TagFactory() for _ in range(tag_count)])
+        for index in range(attachment_count):
+            file_factory = FileFactory if index % 2 else ImageFactory
+            ArticleAttachment.objects.create(article=article, attachment_file=file_factory(), name=str(index))
+        copy = ArticleFactory(slug=article.slug + "-copy", tags=[TagFactory()])
+        with CaptureQueriesContext(connection) as queries:
+            article.clone_relations(article, copy)
+        query_count = len(queries)
+
+        assert set(copy.tags.all()) == set(article.tags.all())
+        assert sorted(copy.attachments.values_list("name", "attachment_file", "is_image")) == sorted(
+            article.attachments.values_list("name", "attachment_file", "is_image")
+        )
+        assert copy.attachments.images().count() == (attachment_count + 1) // 2
+        return query_count
+
+    assert clone_relations(1, 1) == clone_relations(10, 50)
+
+    tag = TagFactory(name="Gardening")
+    article = ArticleFactory(tags=[tag])
+    article.publish()
+    published = Article.objects.search("gardening").get(publisher_is_draft=False)
+    assert list(published.tags.all()) == [tag]
+
+
+@pytest.mark.django_db
+def test_article_excerpt():
+    """
+    Test the excerpt is plain text of the lead paragraph, or of the main
+    content when there is no lead paragraph.
+    """
+    article = ArticleFactory(lead_paragraph="", main_content="<p>First&nbsp;<b>para</b></p><p>Second</p>")
+    assert article.excerpt == "First para Second"
+    article.lead_paragraph = "<p>Lead &amp; more</p>"
+    article.save(update_fields=["lead_paragraph"])
+    assert Article.objects.get(pk=article.pk).excerpt == "Lead & more"
+
+    article.main_content = "<p>%s</p>" % ("word " * 100)
+    article.lead_paragraph = ""
+    article.save()
+    assert len(article.excerpt) == 300
+    assert article.excerpt.endswith("...")
+
+
+@pytest.mark.django_db
+def test_update_excerpts():
+    article = ArticleFactory(lead_paragraph="", main_content="<p>Content</p>")
+    Article.objects.filter(pk=article.pk).update(excerpt="")
+    assert Article.objects.update_excerpts() == 1
+    assert Article.objects.get(pk=article.pk).excerpt == "Content"
+    assert Article.objects.update_excerpts() == 0
@@ -3,10 +3,13 @@ import pytest
 from cms.api import add_plugin
 from cms.models import Placeholder
 from cms.plugin_rendering import ContentRenderer
-from cmsplugin_articles_ai.cms_plugins import ArticleList, TagFilterArticleList, TagList
+from cmsplugin_articles_ai.cache import get_cache
+from cmsplugin_articles_ai.cms_plugins import ArticleList, CategoryLiftPlugin, TagFilterArticleList, TagList
 from cmsplugin_articles_ai.factories import PublicArticleFactory, TagFactory, CategoryFactory
-from cmsplugin_articles_ai.models import Article
-from tests.test_views import publish_articles_with_publisher
+from cmsplugin_articles_ai.models import Article, ArticleListPlugin, TagFilterMode
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from tests.test_views import create_listed_articles, publish_articles_with_publisher
 
 
 def create_articles(amount):
@@ -14,6 +17,12 @@ def create_articles(amount):
         PublicArticleFactory()
 
 
+@pytest.fixture
+def plugin_cache(settings):
+    settings.ARTICLES_PLUGIN_CACHE_TIMEOUT = 3600
+    get_cache().clear()
+
+
 def init_content_renderer(request=None):
     """
     Create and return `ContentRenderer` instance initiated with request.
@@ -153,6 +162,107 @@ def test_tag_list_plugin_html():
     """
     plugin = init_plugin(TagList)
     tag = TagFactory()
+    empty_tag = TagFactory()
+    article = PublicArticleFactory(tags=[tag])
+    article.publish()
     renderer = init_content_renderer()
     html = renderer.render_plugin(instance=plugin, context={}, placeholder=plugin.placeholder)
     assert tag.name in html
+    assert empty_tag.name not in html
+
+
+@pytest.mark.urls("cmsplugin_articles_ai.article_urls")
+@pytest.mark.django_db
+def test_article_list_plugin_query_count():
+    """
+    Test the amount of queries made while rendering article list plugin
+    does not depend on the amount of listed articles.
+    """
+    plugin = init_plugin(ArticleList, article_amount=10)
+    renderer = init_content_renderer()
+
+    def count_queries():
+        instance = ArticleListPlugin.objects.get(pk=plugin.pk)
+        with CaptureQueriesContext(connection) as queries:
+            renderer.render_plugin(instance=instance, context={}, placeholder=plugin.placeholder)
+        return len(queries)
+
+    create_listed_articles(1)
+    query_count = count_queries()
+    create_listed_articles(5)
+    assert count_queries() == query_count
+
+
+@pytest.mark.django_db
+def test_article_list_plugin_cache(plugin_cache):
+    """
+    Test article list plugin serves articles from cache and publishing
+    an article invalidates the cached articles.
+    """
+    create_listed_articles(2)
+    plugin = init_plugin(ArticleList, article_amount=5)
+    plugin_instance = plugin.get_plugin_class_instance()
+    articles = plugin_instance.render({}, plugin, None)["articles"]
+    assert len(articles) == 2
+
+    with CaptureQueriesContext(connection) as queries:
+        cached_articles = plugin_instance.render({}, plugin, None)["articles"]
+    assert len(queries) == 0
+    assert [article.pk for article in cached_articles] == [article.pk for article in articles]
+
+    create_listed_articles(1)
+    assert len(plugin_instance.render({}, plugin, None)["articles"]) == 3
+
+
+def render_placeholder_plugins(placeholder, request=None):
+    """
+    Render the article list plugins of the placeholder like they are
+    rendered on a page, returning their html and the amount of queries.
+    """
+    renderer = init_content_renderer(request)
+    plugins = list(ArticleListPlugin.objects.filter(placeholder=placeholder).order_by("pk"))
+    with CaptureQueriesContext(connection) as queries:
+        html = [
+            renderer.render_plugin(instance=plugin, context={"request": request}, placeholder=placeholder)
+            for plugin in plugins
+        ]
+    return html, len(queries)
+
+
+@pytest.mark.urls("cmsplugin_articles_ai.article_urls")
+@pytest.mark.django_db
+def test_article_list_plugins_are_batched(rf):
+    """
+    Test the article list plugins of a page fetch their articles together,
+    with the same result as fetching them separately.
+    """
+    tag1 = TagFactory()
+    tag2 = TagFactory()
+    category = CategoryFactory()
+    PublicArticleFactory(tags=[tag1], category=category, language="fi")
+    PublicArticleFactory(tags=[tag1, tag2], language="en")
+    PublicArticleFactory(tags=[tag2], category=category)
+    create_articles(5)
+    publish_articles_with_publisher(Article.objects.all())
+
+    placeholder = Placeholder.objects.create(slot="test")
+    add_plugin(placeholder, ArticleList, "en", article_amount=4)
+    add_plugin(placeholder, ArticleList, "en", language_filter="fi").exclude_tags.add(tag2)
+    add_plugin(placeholder, CategoryLiftPlugin, "en", category=category)
+    plugin = add_plugin(placeholder, ArticleList, "en", article_amount=10)
+    plugin.exclude_categories.add(category)
+    for filter_mode in TagFilterMode:
+        add_plugin(placeholder, TagFilterArticleList, "en", filter_mode=filter_mode).tags.add(tag1, tag2)
+    add_plugin(placeholder, TagFilterArticleList, "en", filter_mode=TagFilterMode.EXACT)
+
+    separate_html, separate_query_count = render_placeholder_plugins(placeholder)
+    batched_html, batched_query_count = render_placeholder_plugins(placeholder, rf.get("/"))
+    assert batched_html == separate_html
+    assert [html.count("<h3") for html in batched_html] == [4, 1, 2, 6, 3, 1, 1, 5]
+    assert batched_query_count < separate_query_count
+
+    # Adding plugins doesn't add queries
+    for _ in range(3):
+        add_plugin(placeholder, TagFilterArticleList, "en").tags.add(tag2)
+        add_plugin(placeholder, CategoryLiftPlugin, "en", category=category)
+    assert render_placeholder_plugins(placeholder, rf.get("/"))[1] == batched_query_count
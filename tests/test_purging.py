@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+import threading
+
+import pytest
+from cms.api import add_plugin
+from cms.models import Placeholder
+from cmsplugin_articles_ai.cms_plugins import CategoryLiftPlugin, TagList
+from cmsplugin_articles_ai.factories import CategoryFactory, PublicArticleFactory, TagFactory
+from cmsplugin_articles_ai.middleware import SurrogateKeyMiddleware
+from cmsplugin_articles_ai.models import Article
+from cmsplugin_articles_ai.purging import HTTPPurgeBackend, LocMemPurgeBackend, batch_purges, purge
+from django.core.urlresolvers import reverse
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.six.moves.BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from tests.test_plugins import init_content_renderer
+
+
+class PurgeHandler(BaseHTTPRequestHandler):
+    def do_PURGE(self):
+        self.server.purged.append((self.path, self.headers["xkey"]))
+        self.send_response(200)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def purge_server():
+    """
+    Local HTTP server standing in for a cache that accepts PURGE requests.
+    """
+    server = HTTPServer(("127.0.0.1", 0), PurgeHandler)
+    server.purged = []
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def purged(settings):
+    settings.ARTICLES_PURGE_BACKEND = "cmsplugin_articles_ai.purging.LocMemPurgeBackend"
+    LocMemPurgeBackend.purged = []
+    return LocMemPurgeBackend.purged
+
+
+def test_http_purge_backend(settings, purge_server):
+    settings.ARTICLES_PURGE_URLS = ["http://127.0.0.1:%s/purge/" % purge_server.server_port]
+    settings.ARTICLES_PURGE_HEADER = "xkey"
+    settings.ARTICLES_PURGE_BATCH_SIZE = 2
+    HTTPPurgeBackend().purge(["a", "b", "c"])
+    assert purge_server.purged == [("/purge/", "a b"), ("/purge/", "c")]
+
+    # Unreachable caches don't break saving
+    settings.ARTICLES_PURGE_URLS = ["http://127.0.0.1:1/"]
+    HTTPPurgeBackend().purge(["a"])
+
+
+def test_purges_are_batched(purged):
+    purge(["a", "b"])
+    with batch_purges():
+        purge(["b", "c"])
+        with batch_purges():
+            purge(["d"])
+        purge(["a"])
+        assert purged == [["a", "b"]]
+    assert purged == [["a", "b"], ["a", "b", "c", "d"]]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_publishing_purges_article(purged):
+    tag = TagFactory()
+    article = PublicArticleFactory(language="fi", tags=[tag])
+    assert not purged
+
+    with batch_purges():
+        article.publish()
+    assert purged == [["article-%s" % article.slug, "articles-lang-all", "articles-lang-fi"]]
+
+    published = Article.objects.get(slug=article.slug, publisher_is_draft=False)
+    del purged[:]
+    tag.name = "Renamed"
+    tag.save()
+    assert purged == [["articles", "tag-%s" % tag.pk]]
+
+    del purged[:]
+    tag.articles.remove(published)
+    assert purged == [[
+        "article-%s" % article.slug, "articles", "articles-lang-all", "articles-lang-fi", "tag-%s" % tag.pk,
+    ]]
+
+    tag.articles.add(published)
+    del purged[:]
+    tag.articles.clear()
+    assert purged == [[
+        "article-%s" % article.slug, "articles", "articles-lang-all", "articles-lang-fi", "tag-%s" % tag.pk,
+    ]]
+
+    # The page of the old slug is purged too
+    del purged[:]
+    old_slug = published.slug
+    published.slug = "new-slug"
+    published.save()
+    assert purged == [sorted(["article-%s" % old_slug, "article-new-slug", "articles-lang-all", "articles-lang-fi"])]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_purges_wait_for_commit(purged):
+    article = PublicArticleFactory(language="")
+    with transaction.atomic():
+        article.publish()
+        TagFactory().articles.add(Article.objects.get(slug=article.slug, publisher_is_draft=False))
+        assert not purged
+    assert len(purged) == 1
+    assert "article-%s" % article.slug in purged[0]
+
+    del purged[:]
+    with transaction.atomic():
+        article.publish()
+        transaction.set_rollback(True)
+    assert not purged
+
+
+@pytest.mark.django_db(transaction=True)
+def test_middleware_batches_purges(rf, purged):
+    articles = [PublicArticleFactory(language="") for _ in range(2)]
+    middleware = SurrogateKeyMiddleware()
+    request = rf.post("/")
+    middleware.process_request(request)
+    for article in articles:
+        article.publish()
+    assert not purged
+    middleware.process_response(request, HttpResponse())
+    assert purged == [sorted(
+        ["articles", "articles-lang-all"] + ["article-%s" % article.slug for article in articles]
+    )]
+
+
+@pytest.mark.urls("cmsplugin_articles_ai.article_urls")
+@pytest.mark.django_db
+def test_view_surrogate_keys(client):
+    tag = TagFactory()
+    category = CategoryFactory()
+    article = PublicArticleFactory(tags=[tag], category=category)
+    article.publish()
+
+    url = reverse("article", kwargs={"slug": article.slug})
+    response = client.get(url)
+    keys = sorted(["article-%s" % article.slug, "category-%s" % category.pk, "tag-%s" % tag.pk])
+    assert response["Surrogate-Key"].split() == keys
+    # Not modified responses replace the headers of the cached page
+    response = client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+    assert response.status_code == 304
+    assert response["Surrogate-Key"].split() == keys
+
+    response = client.get(reverse("articles"), {"lang": "fi"})
+    assert response["Surrogate-Key"].split() == ["articles", "articles-lang-fi"]
+    response = client.get(reverse("articles_in_category", kwargs={"category": category.slug}))
+    assert response["Surrogate-Key"].split() == ["articles", "articles-lang-all", "category-%s" % category.pk]
+
+
+@pytest.mark.urls("cmsplugin_articles_ai.article_urls")
+@pytest.mark.django_db
+def test_plugin_surrogate_keys(rf):
+    category = CategoryFactory()
+    placeholder = Placeholder.objects.create(slot="test")
+    plugins = [
+        add_plugin(placeholder, CategoryLiftPlugin, "en", category=category, language_filter="en"),
+        add_plugin(placeholder, TagList, "en"),
+    ]
+    request = rf.get("/")
+    renderer = init_content_renderer(request)
+    for plugin in plugins:
+        renderer.render_plugin(instance=plugin, context={"request": request}, placeholder=placeholder)
+    response = SurrogateKeyMiddleware().process_response(request, HttpResponse())
+    assert response["Surrogate-Key"].split() == ["articles", "articles-lang-en", "category-%s" % category.pk]
@@ -3,7 +3,9 @@ from datetime import timedelta
 
 import pytest
 from cmsplugin_articles_ai.factories import ArticleFactory, TagFactory
-from cmsplugin_articles_ai.models import Article
+from cmsplugin_articles_ai.models import Article, TagFilterMode
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 
 
@@ -83,6 +85,10 @@ def test_with_exact_tags_query():
     assert article4 not in articles
     assert article5 not in articles
 
+    articles = Article.objects.with_exact_tags(tags=[])
+    assert article1 not in articles
+    assert article5 in articles
+
 
 @pytest.mark.django_db
 def test_with_any_of_tags_query():
@@ -97,6 +103,50 @@ def test_with_any_of_tags_query():
     assert article1 not in Article.objects.with_any_of_tags(tags=[tag3])
     assert article1 in Article.objects.with_any_of_tags(tags=[tag1, tag3])
     assert article2 not in Article.objects.with_any_of_tags(tags=[tag2, tag3])
+    assert article1 not in Article.objects.with_any_of_tags(tags=[])
+
+
+@pytest.mark.django_db
+def test_without_any_of_tags_query():
+    """Test articles with any of given tags are excluded"""
+    tag1 = TagFactory()
+    tag2 = TagFactory()
+    tag3 = TagFactory()
+    article1 = ArticleFactory(tags=[tag1, tag2])
+    article2 = ArticleFactory(tags=[tag1])
+    article3 = ArticleFactory(tags=[])
+    articles = Article.objects.without_any_of_tags(tags=[tag2, tag3])
+    assert article1 not in articles
+    assert article2 in articles
+    assert article3 in articles
+    assert article3 in Article.objects.without_any_of_tags(tags=[])
+
+
+@pytest.mark.django_db
+def test_any_of_tags_query_as_subquery():
+    """
+    Test tag filtering keeps working when the filtered queryset is used
+    as a subquery of another query.
+    """
+    tag1 = TagFactory()
+    tag2 = TagFactory()
+    article1 = ArticleFactory(tags=[tag1])
+    article2 = ArticleFactory(tags=[tag2])
+    tagged = Article.objects.with_any_of_tags(tags=[tag1]).values("pk")
+    articles = Article.objects.filter(pk__in=tagged)
+    assert article1 in articles
+    assert article2 not in articles
+    not_tagged = Article.objects.without_any_of_tags(tags=[tag1]).values("pk")
+    articles = Article.objects.filter(pk__in=not_tagged)
+    assert article1 not in articles
+    assert article2 in articles
+
+
+def test_any_of_tags_query_is_not_distinct():
+    """Test filtering with any of tags does not join tags nor use DISTINCT"""
+    sql = str(Article.objects.with_any_of_tags(tags=[1, 2, 3]).query)
+    assert "DISTINCT" not in sql
+    assert "JOIN" not in sql
 
 
 @pytest.mark.django_db
@@ -111,3 +161,124 @@ def test_with_all_tags_query():
     assert article1 in Article.objects.with_all_tags(tags=[tag2])
     assert article2 not in Article.objects.with_all_tags(tags=[tag1, tag3])
     assert article2 in Article.objects.with_all_tags(tags=[])
+
+
+@pytest.mark.parametrize("filter_mode", [TagFilterMode.ALL, TagFilterMode.EXACT])
+def test_tag_filter_join_count(filter_mode):
+    """
+    Test the amount of joins made by tag filtering does not depend on
+    the amount of tags filtered with.
+    """
+    def count_joins(tag_pks):
+        return str(Article.objects.tag_filter(filter_mode, tag_pks).query).count("JOIN")
+
+    assert count_joins(range(1, 3)) == count_joins(range(1, 11))
+
+
+@pytest.mark.django_db
+def test_next_publication_boundary():
+    now = timezone.now()
+    ArticleFactory(published_from=now - timedelta(hours=1), published_until=now + timedelta(hours=3))
+    assert Article.objects.next_publication_boundary() == now + timedelta(hours=3)
+    ArticleFactory(published_from=now + timedelta(hours=2))
+    assert Article.objects.next_publication_boundary() == now + timedelta(hours=2)
+    assert Article.objects.filter(published_from__gt=now + timedelta(hours=2)).next_publication_boundary() is None
+
+
+@pytest.mark.django_db
+def test_last_publication_boundary():
+    now = timezone.now()
+    assert Article.objects.last_publication_boundary() is None
+    ArticleFactory(published_from=now - timedelta(hours=3), published_until=now + timedelta(hours=1))
+    assert Article.objects.last_publication_boundary() == now - timedelta(hours=3)
+    ArticleFactory(published_from=now - timedelta(hours=4), published_until=now - timedelta(hours=2))
+    assert Article.objects.last_publication_boundary() == now - timedelta(hours=2)
+
+
+@pytest.mark.skipif(connection.vendor != "sqlite", reason="Checks SQLite query plans")
+@pytest.mark.django_db
+@pytest.mark.parametrize("language, filters, index_columns", [
+    (None, {}, "publisher_is_draft=? AND published_from<?"),
+    # Language agnostic articles are listed too, so the language isn't indexed
+    ("en", {}, "publisher_is_draft=? AND published_from<?"),
+    (None, {"category_id": 1}, "publisher_is_draft=? AND category_id=? AND published_from<?"),
+    ("en", {"category_id": 1}, "publisher_is_draft=? AND category_id=? AND published_from<?"),
+])
+def test_public_query_uses_index(language, filters, index_columns):
+    """
+    Test listing public articles uses the indexes made for the purpose
+    instead of scanning and sorting the whole table.
+    """
+    articles = Article.objects.public(language=language).filter(publisher_is_draft=False, **filters)
+    sql, params = articles.query.sql_with_params()
+    cursor = connection.cursor()
+    cursor.execute("EXPLAIN QUERY PLAN %s" % sql, params)
+    query_plan = " ".join(row[-1] for row in cursor.fetchall())
+    assert "(%s)" % index_columns in query_plan
+    assert "TEMP B-TREE" not in query_plan
+
+
+@pytest.mark.django_db
+def test_for_listing_defers_content():
+    ArticleFactory()
+    article = Article.objects.for_listing().get()
+    assert {"lead_paragraph", "main_content"} <= article.get_deferred_fields()
+    assert article.excerpt
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("use_fts", [True, False])
+def test_search(monkeypatch, use_fts):
+    """
+    Test search matches all words in title, content and tag names, also
+    without the full-text index.
+    """
+    if not use_fts:
+        monkeypatch.setattr("cmsplugin_articles_ai.models.articles.has_fts_table", lambda connection: False)
+    tag = TagFactory(name="Gardening")
+    article = ArticleFactory(
+        title="Spring news", lead_paragraph="", main_content="<p>Tulips&nbsp;and <b>roses</b></p>", tags=[tag],
+    )
+    ArticleFactory(title="Autumn news", main_content="<p>Leaves</p>")
+
+    assert ("MATCH" in str(Article.objects.search("tulips").query)) == use_fts
+    assert list(Article.objects.search("tulips")) == [article]
+    assert list(Article.objects.search("ROSES spring")) == [article]
+    assert list(Article.objects.search("gardening")) == [article]
+    assert Article.objects.search("news").count() == 2
+    assert not Article.objects.search("tulips leaves").exists()
+    assert not Article.objects.search("<b>").exists()
+    assert not Article.objects.search('"roses" OR*').exists()
+    assert not Article.objects.search("  ").exists()
+    assert list(Article.objects.public(language="en-us").search("roses")) == [article]
+    assert not Article.objects.public(language="fi").search("roses").exists()
+
+
+@pytest.mark.django_db
+def test_search_index_is_updated():
+    tag = TagFactory(name="Gardening")
+    article = ArticleFactory(title="Spring news", main_content="<p>Tulips</p>")
+    assert not Article.objects.search("gardening").exists()
+
+    article.tags.add(tag)
+    assert list(Article.objects.search("gardening")) == [article]
+    tag.name = "Farming"
+    tag.save()
+    assert list(Article.objects.search("farming")) == [article]
+    # Saving without renaming the tag doesn't rebuild the documents
+    with CaptureQueriesContext(connection) as queries:
+        tag.save()
+    assert not any("articlesearchdocument" in query["sql"] for query in queries)
+    tag.delete()
+    assert not Article.objects.search("farming").exists()
+
+    article.title = "Summer"
+    article.save()
+    assert list(Article.objects.search("summer")) == [article]
+    assert not Article.objects.search("spring").exists()
+
+    article.publish()
+    published = Article.objects.search("summer").filter(publisher_is_draft=False).get()
+    assert published.pk != article.pk
+    article.delete()
+    assert not Article.objects.filter(pk=article.pk).search("summer").exists()
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+import pytest
+from cmsplugin_articles_ai import routers
+from cmsplugin_articles_ai.cache import get_cache
+from cmsplugin_articles_ai.counts import get_tag_counts
+from cmsplugin_articles_ai.factories import PublicArticleFactory, TagFactory
+from cmsplugin_articles_ai.models import Article, Tag
+from cmsplugin_articles_ai.routers import STICKY_COOKIE, ReplicaRouterMiddleware, replica_reads
+from cmsplugin_articles_ai.slugs import get_tag_pk, local_cache
+from django.contrib.auth.models import AnonymousUser
+from django.core.urlresolvers import reverse
+from django.http import HttpResponse
+
+
+@pytest.fixture
+def replica_router(settings):
+    """
+    Route reads to the replica database of the test settings. The
+    replica isn't replicated, so articles are found only on the primary.
+    """
+    settings.DATABASE_ROUTERS = ["cmsplugin_articles_ai.routers.ReplicaRouter"]
+    settings.ARTICLES_REPLICA_DATABASES = ["replica"]
+    settings.MIDDLEWARE_CLASSES = settings.MIDDLEWARE_CLASSES + [
+        "cmsplugin_articles_ai.routers.ReplicaRouterMiddleware",
+    ]
+
+
+def count_articles(request):
+    middleware = ReplicaRouterMiddleware()
+    middleware.process_request(request)
+    try:
+        return Article.objects.count()
+    finally:
+        middleware.process_response(request, HttpResponse())
+
+
+@pytest.mark.urls("cmsplugin_articles_ai.article_urls")
+@pytest.mark.django_db
+def test_public_reads_go_to_replica(client, replica_router):
+    PublicArticleFactory().publish()
+    url = reverse("articles")
+    assert list(client.get(url).context["articles"]) == []
+
+    client.cookies[STICKY_COOKIE] = "1"
+    assert len(client.get(url).context["articles"]) == 1
+
+
+@pytest.mark.django_db
+def test_editor_reads_go_to_primary(rf, admin_user, replica_router, monkeypatch):
+    PublicArticleFactory()
+    request = rf.get("/")
+    request.user = AnonymousUser()
+    assert count_articles(request) == 0
+    request.user = admin_user
+    assert count_articles(request) == 1
+    assert count_articles(rf.post("/")) == 1
+
+    monkeypatch.setattr(routers, "get_draft_status", lambda: True)
+    request.user = AnonymousUser()
+    assert count_articles(request) == 1
+
+
+@pytest.mark.django_db
+def test_writes_stick_to_primary(rf, settings, replica_router):
+    settings.ARTICLES_REPLICA_STICKY_SECONDS = 30
+    PublicArticleFactory()
+    middleware = ReplicaRouterMiddleware()
+    request = rf.get("/")
+    middleware.process_request(request)
+    assert Article.objects.count() == 0
+    Tag.objects.create(name="Tag", slug="tag")
+    # The write is read from the primary
+    assert Article.objects.count() == 1
+    response = middleware.process_response(request, HttpResponse())
+    assert response.cookies[STICKY_COOKIE]["max-age"] == 30
+
+    request = rf.get("/")
+    request.COOKIES[STICKY_COOKIE] = "1"
+    assert count_articles(request) == 1
+
+
+@pytest.mark.django_db
+def test_objects_read_from_replica_are_saved_to_primary(replica_router):
+    Tag.objects.using("replica").create(name="Tag", slug="tag")
+    with replica_reads():
+        tag = Tag.objects.get(slug="tag")
+    assert tag._state.db == "replica"
+    tag.name = "Renamed"
+    tag.save()
+    assert Tag.objects.get(slug="tag").name == "Renamed"
+    Tag.objects.using("replica").all().delete()
+
+
+@pytest.mark.django_db
+def test_replica_reads_outside_requests(settings, replica_router):
+    PublicArticleFactory()
+    assert Article.objects.count() == 1
+    with replica_reads():
+        assert Article.objects.count() == 0
+    assert Article.objects.count() == 1
+
+    settings.ARTICLES_REPLICA_DATABASES = []
+    with replica_reads():
+        assert Article.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_shared_caches_are_filled_from_primary(replica_router):
+    """
+    Test data that hasn't replicated yet isn't cached for all visitors.
+    """
+    get_cache().clear()
+    tag = TagFactory()
+    PublicArticleFactory(tags=[tag]).publish()
+    with replica_reads():
+        assert Article.objects.count() == 0
+        assert get_tag_pk(tag.slug) == tag.pk
+        assert [counted.article_count for counted in get_tag_counts()] == [1]
+    local_cache.clear()
+    assert get_tag_pk(tag.slug) == tag.pk
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+from datetime import timedelta
+
+import pytest
+from cmsplugin_articles_ai.cache import get_cache, get_timeout, get_version
+from cmsplugin_articles_ai.factories import PublicArticleFactory
+from cmsplugin_articles_ai.models import Article
+from cmsplugin_articles_ai.purging import LocMemPurgeBackend
+from cmsplugin_articles_ai.scheduler import get_wait_time, LAST_RUN_KEY, run_scheduler
+from cmsplugin_articles_ai.signals import article_became_public, article_expired
+from django.core.management import call_command
+from django.utils import timezone
+from django.utils.six import StringIO
+
+
+@pytest.fixture
+def signals():
+    sent = []
+
+    def receiver(signal, instance, **kwargs):
+        sent.append((signal, instance.slug))
+
+    article_became_public.connect(receiver, sender=Article)
+    article_expired.connect(receiver, sender=Article)
+    yield sent
+    article_became_public.disconnect(receiver, sender=Article)
+    article_expired.disconnect(receiver, sender=Article)
+
+
+def publish_article(**kwargs):
+    article = PublicArticleFactory(**kwargs)
+    article.publish()
+    return article
+
+
+@pytest.mark.django_db(transaction=True)
+def test_scheduler_sends_signals(settings, signals):
+    settings.ARTICLES_PURGE_BACKEND = "cmsplugin_articles_ai.purging.LocMemPurgeBackend"
+    LocMemPurgeBackend.purged = []
+    get_cache().clear()
+    now = timezone.now()
+    upcoming = publish_article(published_from=now + timedelta(minutes=1), language="fi")
+    expiring = publish_article(published_until=now + timedelta(minutes=2))
+    # Public only between the runs
+    publish_article(published_from=now + timedelta(seconds=70), published_until=now + timedelta(seconds=80))
+    PublicArticleFactory(published_from=now + timedelta(minutes=1))  # Draft
+
+    del LocMemPurgeBackend.purged[:]
+    assert run_scheduler(now) == ([], [])
+    # Without a previous run all the lists may have changed
+    assert LocMemPurgeBackend.purged == [["articles"]]
+    version = get_version()
+    assert run_scheduler(now + timedelta(seconds=30)) == ([], [])
+    assert get_version() == version
+    assert not signals
+
+    became_public, expired = run_scheduler(now + timedelta(minutes=1))
+    assert [article.slug for article in became_public] == [upcoming.slug]
+    assert not expired
+    assert signals == [(article_became_public, upcoming.slug)]
+    assert get_version() != version
+    assert LocMemPurgeBackend.purged[-1] == ["article-%s" % upcoming.slug, "articles-lang-all", "articles-lang-fi"]
+
+    del signals[:]
+    run_scheduler(now + timedelta(minutes=3))
+    assert signals == [(article_expired, expiring.slug)]
+
+    # The lists are purged also when the previous run was evicted
+    get_cache().delete(LAST_RUN_KEY)
+    del LocMemPurgeBackend.purged[:]
+    run_scheduler(now + timedelta(minutes=4))
+    assert LocMemPurgeBackend.purged == [["articles"]]
+
+
+@pytest.mark.django_db
+def test_scheduler_wait_time():
+    assert get_wait_time(5) == 5
+    publish_article(published_from=timezone.now() + timedelta(seconds=2))
+    assert 1 < get_wait_time(5) <= 2
+    assert get_wait_time(0.5) == 0.5
+
+
+@pytest.mark.django_db
+def test_run_publication_scheduler_command():
+    get_cache().clear()
+    call_command("run_publication_scheduler", stdout=StringIO())
+    publish_article(published_from=timezone.now() + timedelta(microseconds=1))
+    stdout = StringIO()
+    call_command("run_publication_scheduler", stdout=stdout)
+    assert "1 articles became public" in stdout.getvalue()
+
+
+def test_scheduler_disables_boundary_timeouts(settings):
+    boundary = timezone.now() + timedelta(seconds=10)
+    assert get_timeout(boundary, 3600) <= 10
+    settings.ARTICLES_PUBLICATION_SCHEDULER = True
+    assert get_timeout(boundary, 3600) == 3600
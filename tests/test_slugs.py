@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+import pytest
+from cmsplugin_articles_ai.cache import get_cache
+from cmsplugin_articles_ai.factories import CategoryFactory, TagFactory
+from cmsplugin_articles_ai.models import Category, Tag
+from cmsplugin_articles_ai.slugs import (
+    get_category, get_category_pk, get_tag, get_tag_pk, local_cache, LRUCache, resolve_slug
+)
+from django.core.urlresolvers import reverse
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+def test_lru_cache():
+    cache = LRUCache(2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+@pytest.mark.django_db
+def test_resolve_slug():
+    tag = TagFactory()
+    category = CategoryFactory(slug=tag.slug)
+    assert get_tag_pk(tag.slug) == tag.pk
+    assert get_category_pk(tag.slug) == category.pk
+    assert get_tag_pk("missing") is None
+
+    with CaptureQueriesContext(connection) as queries:
+        assert get_tag_pk(tag.slug) == tag.pk
+        assert get_tag_pk("missing") is None
+    assert len(queries) == 0
+
+    # Another process only has the shared cache
+    local_cache.clear()
+    with CaptureQueriesContext(connection) as queries:
+        assert resolve_slug(Tag, tag.slug) == tag.pk
+    assert len(queries) == 0
+    get_cache().clear()
+    with CaptureQueriesContext(connection) as queries:
+        assert resolve_slug(Category, tag.slug) == category.pk
+    assert len(queries) == 1
+
+
+@pytest.mark.django_db
+def test_resolve_slug_is_invalidated():
+    tag = TagFactory(slug="old")
+    assert get_tag_pk("old") == tag.pk
+    assert get_tag_pk("new") is None
+    tag.slug = "new"
+    tag.save()
+    assert get_tag_pk("old") is None
+    assert get_tag_pk("new") == tag.pk
+    tag.delete()
+    assert get_tag_pk("new") is None
+
+
+@pytest.mark.django_db
+def test_get_category():
+    category = CategoryFactory(title="Old")
+    assert get_category(category.slug).title == "Old"
+    assert get_category("missing") is None
+    with CaptureQueriesContext(connection) as queries:
+        assert get_category(category.slug).pk == category.pk
+        assert get_category("missing") is None
+    assert len(queries) == 0
+
+    category.title = "New"
+    category.save()
+    assert get_category(category.slug).title == "New"
+    category.delete()
+    assert get_category(category.slug) is None
+
+    tag = TagFactory()
+    assert get_tag(tag.slug).pk == tag.pk
+    with CaptureQueriesContext(connection) as queries:
+        assert get_tag(tag.slug).name == tag.name
+    assert len(queries) == 0
+
+
+@pytest.mark.urls("cmsplugin_articles_ai.article_urls")
+@pytest.mark.django_db
+@pytest.mark.parametrize("url_name, kwargs", [
+    ("tagged_articles", {"tag": "missing"}),
+    ("articles_in_category", {"category": "missing"}),
+    ("api_tagged_articles", {"tag": "missing"}),
+    ("api_articles_in_category", {"category": "missing"}),
+    ("tag_feed", {"tag": "missing", "feed_type": "rss"}),
+    ("category_feed", {"category": "missing", "feed_type": "atom"}),
+])
+def test_unknown_slug_is_not_found(client, url_name, kwargs):
+    assert client.get(reverse(url_name, kwargs=kwargs)).status_code == 404
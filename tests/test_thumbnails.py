@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+import pytest
+from cmsplugin_articles_ai.factories import ArticleFactory, ImageFactory
+from cmsplugin_articles_ai.models import Article, ArticleAttachment
+from cmsplugin_articles_ai.thumbnails import generate_thumbnails, get_article_image_pks, get_thumbnail_options
+from django.core.management import call_command
+from django.utils.six import StringIO
+from easy_thumbnails.files import get_thumbnailer
+
+
+def assert_thumbnails_exist(image):
+    thumbnailer = get_thumbnailer(image)
+    for options in get_thumbnail_options():
+        assert thumbnailer.get_existing_thumbnail(options)
+
+
+@pytest.mark.django_db
+def test_generate_thumbnails_is_incremental(settings):
+    settings.ARTICLES_GENERATE_THUMBNAILS_ON_PUBLISH = False
+    main_image = ImageFactory()
+    attachment_image = ImageFactory()
+    article = ArticleFactory(main_image=main_image)
+    ArticleAttachment.objects.create(article=article, attachment_file=attachment_image, is_image=True)
+    assert get_article_image_pks(Article.objects.all()) == sorted([main_image.pk, attachment_image.pk])
+
+    assert generate_thumbnails([main_image.pk]) == len(get_thumbnail_options())
+    assert_thumbnails_exist(main_image)
+    assert generate_thumbnails([main_image.pk]) == 0
+
+    output = StringIO()
+    call_command("generate_article_thumbnails", stdout=output)
+    assert "Generated %s thumbnails." % len(get_thumbnail_options()) in output.getvalue()
+    assert_thumbnails_exist(attachment_image)
+
+
+@pytest.mark.django_db
+def test_thumbnails_are_generated_on_publish(settings):
+    image = ImageFactory()
+    article = ArticleFactory(main_image=image)
+    article.publish()
+    assert not get_thumbnailer(image).get_existing_thumbnail(get_thumbnail_options()[0])
+
+    settings.ARTICLES_GENERATE_THUMBNAILS_ON_PUBLISH = True
+    article.title = "Changed"
+    article.save()
+    article.publish()
+    assert_thumbnails_exist(image)
+
+
+@pytest.mark.django_db
+def test_failing_thumbnail_options_are_skipped(settings):
+    settings.ARTICLES_THUMBNAIL_OPTIONS = [{"size": "invalid"}, {"size": (40, 30)}]
+    image = ImageFactory()
+    assert generate_thumbnails([image.pk]) == 1
+    assert get_thumbnailer(image).get_existing_thumbnail({"size": (40, 30)})
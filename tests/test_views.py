@@ -1,12 +1,19 @@
 # -*- coding: utf-8 -*-
+from datetime import timedelta
+
 import pytest
 
+from cmsplugin_articles_ai.cache import VERSION_CHANGED_KEY, get_cache
 from cmsplugin_articles_ai.factories import (
-    CategoryFactory, NotPublicArticleFactory, PublicArticleFactory,
-    TagFactory
+    CategoryFactory, FileFactory, ImageFactory, NotPublicArticleFactory,
+    PublicArticleFactory, TagFactory
 )
-from cmsplugin_articles_ai.models import Article, Tag, TagFilterMode
+from cmsplugin_articles_ai.models import Article, ArticleAttachment, Tag, TagFilterMode
+from cmsplugin_articles_ai.views import ArticleListView
 from django.core.urlresolvers import reverse
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 
 
 def create_articles(amount):
@@ -19,6 +26,28 @@ def publish_articles_with_publisher(articles):
         article.publish()
 
 
+def create_listed_articles(amount, category=None):
+    """
+    Create published articles that have all the relations shown in
+    the article lists.
+    """
+    for _ in range(amount):
+        article = PublicArticleFactory(category=category, tags=[TagFactory(), TagFactory()])
+        article.publish()
+
+
+@pytest.fixture
+def cursor_pagination(monkeypatch):
+    monkeypatch.setattr(ArticleListView, "cursor_pagination", True)
+
+
+def count_queries(client, url):
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(url)
+    assert response.status_code == 200
+    return len(queries)
+
+
 @pytest.mark.urls("cmsplugin_articles_ai.article_urls")
 @pytest.mark.django_db
 @pytest.mark.parametrize("article_factory, status_code", [
@@ -40,6 +69,38 @@ def test_article_detail_view(client, article_factory, status_code):
         assert response.context["article"].pk == published_article.pk
 
 
+@pytest.mark.urls("cmsplugin_articles_ai.article_urls")
+@pytest.mark.django_db
+def test_article_detail_view_query_count(settings, client):
+    """
+    Test rendering an article with its tags and attachments costs the same
+    amount of queries regardless of the amount of attachments.
+    """
+    settings.ARTICLES_GENERATE_THUMBNAILS_ON_PUBLISH = False
+
+    def count_article_queries(attachment_count):
+        article = PublicArticleFactory(main_image=ImageFactory(), tags=[TagFactory(), TagFactory()])
+        for index in range(attachment_count):
+            file_factory = FileFactory if index % 2 else ImageFactory
+            ArticleAttachment.objects.create(article=article, attachment_file=file_factory())
+        article.publish()
+
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(reverse("article", kwargs={"slug": article.slug}))
+            assert response.status_code == 200
+            for attachment in response.context["attachments"]:
+                assert attachment.icon_url
+                assert attachment.title
+            for attachment in response.context["image_attachments"]:
+                assert attachment.attachment_file.get_real_instance().width
+                assert attachment.url
+            assert len(response.context["tags"]) == 2
+        assert len(response.context["attachments"]) + len(response.context["image_attachments"]) == attachment_count
+        return len(queries)
+
+    assert count_article_queries(1) == count_article_queries(50)
+
+
 @pytest.mark.urls("cmsplugin_articles_ai.article_urls")
 @pytest.mark.django_db
 def test_article_list_view_pagination(settings, client):
@@ -134,6 +195,74 @@ def test_tag_filtered_article_list_view(admin_client):
     assert published_article2 not in articles
 
 
+@pytest.mark.urls("cmsplugin_articles_ai.article_urls")
+@pytest.mark.django_db
+def test_tag_filtered_article_list_view_result_cache(client, monkeypatch):
+    """
+    Test the matching articles of a tag filter are cached with the
+    canonical filter, and pages are fetched by the cached ids.
+    """
+    monkeypatch.setattr(ArticleListView, "paginate_by", 2)
+    get_cache().clear()
+    news = TagFactory()
+    tech = TagFactory()
+    for _ in range(3):
+        PublicArticleFactory(tags=[news, tech])
+    PublicArticleFactory(tags=[news])
+    publish_articles_with_publisher(Article.objects.all())
+    expected = list(Article.objects.public().filter(publisher_is_draft=False).with_all_tags([news, tech]))
+
+    def filters_tags(query):
+        # Listed articles get their tags with a prefetch query
+        return "article_tags" in query["sql"] and "_prefetch_related_val" not in query["sql"]
+
+    def get_articles(tags, page=1):
+        url = reverse("tag_filtered_articles")
+        params = {"filter_tags": tags, "filter_mode": TagFilterMode.ALL.value, "page": page}
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url, params)
+        assert response.status_code == 200
+        return list(response.context["articles"]), queries
+
+    articles, queries = get_articles("%s,%s" % (news.pk, tech.pk))
+    assert articles == expected[:2]
+    assert any(filters_tags(query) for query in queries)
+    articles, queries = get_articles("%s,%s" % (tech.pk, news.pk), page=2)
+    assert articles == expected[2:]
+    # The filter doesn't run again
+    assert not any(filters_tags(query) for query in queries)
+
+    # Changing tags of articles invalidates the results
+    article = Article.objects.get(publisher_is_draft=False, tag_count=1)
+    article.tags.add(tech)
+    articles, queries = get_articles("%s,%s" % (news.pk, tech.pk), page=2)
+    assert len(articles) == 2
+
+
+@pytest.mark.urls("cmsplugin_articles_ai.article_urls")
+@pytest.mark.django_db
+def test_tag_filtered_article_list_view_result_cache_key(client):
+    """
+    Test URLs listing different articles don't share cached results.
+    """
+    get_cache().clear()
+    aaa = TagFactory(slug="aaa")
+    bbb = TagFactory(slug="bbb")
+    PublicArticleFactory(tags=[aaa])
+    PublicArticleFactory(tags=[bbb])
+    PublicArticleFactory(tags=[bbb])
+    publish_articles_with_publisher(Article.objects.all())
+
+    def count_articles(url):
+        return len(client.get(url).context["articles"])
+
+    assert count_articles(reverse("tagged_articles", kwargs={"tag": "aaa"})) == 1
+    assert count_articles(reverse("tagged_articles", kwargs={"tag": "bbb"})) == 2
+    assert count_articles(reverse("tag_filtered_articles")) == 3
+    assert count_articles("%s?lang=fi" % reverse("tag_filtered_articles")) == 0
+    assert count_articles("%s?filter_tags=%s" % (reverse("tag_filtered_articles"), aaa.pk)) == 1
+
+
 @pytest.mark.urls("cmsplugin_articles_ai.article_urls")
 @pytest.mark.django_db
 def test_category_detail_view(client):
@@ -157,3 +286,231 @@ def test_category_detail_view(client):
     assert len(articles) == 1
     assert published_article1 in articles
     assert published_article2 not in articles
+
+
+@pytest.mark.urls("cmsplugin_articles_ai.article_urls")
+@pytest.mark.django_db
+@pytest.mark.parametrize("url_name", ["articles", "articles_in_category"])
+def test_article_list_view_query_count(settings, client, url_name):
+    """
+    Test the amount of queries made by the list views does not depend
+    on the amount of listed articles.
+    """
+    category = CategoryFactory()
+    kwargs = {"category": category.slug} if url_name == "articles_in_category" else {}
+    url = reverse(url_name, kwargs=kwargs)
+
+    create_listed_articles(1, category=category)
+    query_count = count_queries(client, url)
+    create_listed_articles(settings.ARTICLES_PER_PAGE - 1, category=category)
+    assert count_queries(client, url) == query_count
+
+
+@pytest.mark.urls("cmsplugin_articles_ai.article_urls")
+@pytest.mark.django_db
+def test_article_list_view_cursor_pagination(settings, client, cursor_pagination):
+    """
+    Test article list view pages through all articles with cursors in
+    both directions.
+    """
+    create_articles(settings.ARTICLES_PER_PAGE * 2 + 2)
+    publish_articles_with_publisher(Article.objects.all())
+    published_pks = list(Article.publisher_manager.published().values_list("pk", flat=True))
+
+    url = reverse("articles")
+    response = client.get(url)
+    listed_pks = []
+    while True:
+        page = response.context["page_obj"]
+        assert len(page) <= settings.ARTICLES_PER_PAGE
+        listed_pks.extend(article.pk for article in page)
+        if not page.has_next():
+            break
+        response = client.get(url, {"cursor": page.next_cursor})
+    assert listed_pks == published_pks
+
+    response = client.get(url, {"cursor": page.previous_cursor})
+    page = response.context["page_obj"]
+    assert [article.pk for article in page] == published_pks[settings.ARTICLES_PER_PAGE:settings.ARTICLES_PER_PAGE * 2]
+    assert page.has_next()
+    assert page.has_previous()
+
+    response = client.get(url, {"cursor": page.previous_cursor})
+    page = response.context["page_obj"]
+    assert [article.pk for article in page] == published_pks[:settings.ARTICLES_PER_PAGE]
+    assert not page.has_previous()
+
+
+@pytest.mark.urls("cmsplugin_articles_ai.article_urls")
+@pytest.mark.django_db
+def test_cursor_pagination_keeps_filters(client, cursor_pagination, monkeypatch):
+    """
+    Test the cursor pagination links keep the filters of the list.
+    """
+    monkeypatch.setattr(ArticleListView, "paginate_by", 2)
+    tag = TagFactory()
+    for _ in range(3):
+        PublicArticleFactory(language="", tags=[tag]).publish()
+    PublicArticleFactory(language="").publish()
+
+    url = reverse("tag_filtered_articles")
+    params = {"filter_tags": str(tag.pk), "filter_mode": TagFilterMode.ANY.value, "lang": "en"}
+    response = client.get(url, params)
+    pagination_params = response.context["pagination_params"]
+    assert "filter_tags=%s&" % tag.pk in pagination_params
+    assert "filter_mode=%s&" % TagFilterMode.ANY.value in pagination_params
+    assert "lang=en&" in pagination_params
+
+    next_url = "%s?%scursor=%s" % (url, pagination_params, response.context["page_obj"].next_cursor)
+    page = client.get(next_url).context["page_obj"]
+    assert len(page) == 1
+    assert not page.has_next()
+
+
+@pytest.mark.urls("cmsplugin_articles_ai.article_urls")
+@pytest.mark.django_db
+def test_article_list_view_cursor_pagination_query_count(settings, client, cursor_pagination):
+    """
+    Test fetching a later page with a cursor costs the same as fetching
+    the first page.
+    """
+    create_listed_articles(settings.ARTICLES_PER_PAGE * 3)
+    url = reverse("articles")
+    next_cursor = client.get(url).context["page_obj"].next_cursor
+    next_cursor = client.get(url, {"cursor": next_cursor}).context["page_obj"].next_cursor
+    first_page_query_count = count_queries(client, url)
+    assert count_queries(client, "%s?cursor=%s" % (url, next_cursor)) == first_page_query_count
+
+
+@pytest.mark.urls("cmsplugin_articles_ai.article_urls")
+@pytest.mark.django_db
+def test_article_list_view_invalid_cursor(client, cursor_pagination):
+    response = client.get(reverse("articles"), {"cursor": "invalid"})
+    assert response.status_code == 404
+
+
+@pytest.mark.urls("cmsplugin_articles_ai.article_urls")
+@pytest.mark.django_db
+def test_article_search_view(settings, client):
+    """
+    Test search view lists only matching public articles and keeps the
+    search parameters in pagination links.
+    """
+    category = CategoryFactory()
+    for _ in range(settings.ARTICLES_PER_PAGE + 1):
+        PublicArticleFactory(title="Tulips", category=category).publish()
+    PublicArticleFactory(title="Tulips").publish()
+    NotPublicArticleFactory(title="Tulips", category=category).publish()
+    PublicArticleFactory(title="Roses", category=category).publish()
+
+    url = reverse("article_search")
+    response = client.get(url, {"q": "tulips", "category": category.slug})
+    assert response.status_code == 200
+    assert response.context["paginator"].count == settings.ARTICLES_PER_PAGE + 1
+    assert all(article.title == "Tulips" for article in response.context["articles"])
+    assert 'href="?q=tulips&amp;category=%s&amp;page=2"' % category.slug in response.content.decode("utf-8")
+
+    response = client.get(url, {"q": "tulips"})
+    assert response.context["paginator"].count == settings.ARTICLES_PER_PAGE + 2
+    response = client.get(url)
+    assert response.context["paginator"].count == 0
+
+
+@pytest.mark.urls("cmsplugin_articles_ai.article_urls")
+@pytest.mark.django_db
+def test_article_view_conditional_get(client):
+    """
+    Test article view answers 304 Not Modified without rendering when
+    the client has the current version, which changes with tags and categories.
+    """
+    tag = TagFactory()
+    category = CategoryFactory()
+    article = PublicArticleFactory(tags=[tag], category=category)
+    article.publish()
+    url = reverse("article", kwargs={"slug": article.slug})
+
+    response = client.get(url)
+    assert response.status_code == 200
+    etag = response["ETag"]
+    last_modified = response["Last-Modified"]
+    assert "no-cache" in response["Cache-Control"]
+
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+    assert not response.templates
+    assert client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code == 304
+
+    tag.name = "Renamed"
+    tag.save()
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response["ETag"] != etag
+
+    etag = response["ETag"]
+    category.title = "Renamed"
+    category.save()
+    assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+
+@pytest.mark.urls("cmsplugin_articles_ai.article_urls")
+@pytest.mark.django_db
+def test_article_view_last_modified(client):
+    """
+    Test Last-Modified changes with the cache version, e.g. when a tag of
+    the article is renamed, and is left out when the change time is lost.
+    """
+    tag = TagFactory()
+    article = PublicArticleFactory(tags=[tag])
+    article.publish()
+    hour_ago = timezone.now() - timedelta(hours=1)
+    Article.objects.update(modified_at=hour_ago, published_from=hour_ago)
+    get_cache().set(VERSION_CHANGED_KEY, hour_ago, None)
+    url = reverse("article", kwargs={"slug": article.slug})
+
+    last_modified = client.get(url)["Last-Modified"]
+    assert client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code == 304
+    tag.name = "Renamed"
+    tag.save()
+    response = client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+    assert response.status_code == 200
+    assert response["Last-Modified"] != last_modified
+
+    get_cache().delete(VERSION_CHANGED_KEY)
+    response = client.get(url)
+    assert response.has_header("ETag")
+    assert not response.has_header("Last-Modified")
+
+
+@pytest.mark.urls("cmsplugin_articles_ai.article_urls")
+@pytest.mark.django_db
+def test_article_list_view_conditional_get(client):
+    """
+    Test list view ETag changes when articles are published and when
+    an article becomes public at its publication time.
+    """
+    create_listed_articles(2)
+    url = reverse("articles")
+    etag = client.get(url)["ETag"]
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+    assert not response.templates
+
+    future_article = PublicArticleFactory(published_from=timezone.now() + timedelta(hours=1))
+    future_article.publish()
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    etag = response["ETag"]
+    assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+    # The article becomes public without being modified
+    Article.objects.filter(slug=future_article.slug).update(published_from=timezone.now() - timedelta(seconds=1))
+    assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+
+@pytest.mark.urls("cmsplugin_articles_ai.article_urls")
+@pytest.mark.django_db
+def test_conditional_get_is_skipped_in_draft_mode(client, monkeypatch):
+    monkeypatch.setattr("cmsplugin_articles_ai.views.get_draft_status", lambda: True)
+    response = client.get(reverse("articles"))
+    assert response.status_code == 200
+    assert not response.has_header("ETag")